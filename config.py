@@ -14,6 +14,52 @@ DB_CONNECTOR = os.getenv("DB_CONNECTOR", "psycopg2")
 
 DATABASE_URL = f"postgresql+{DB_CONNECTOR}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# DB_POOL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or 5)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or 10)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or 30)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or -1)
+DB_POOL_PRE_PING = (os.getenv("DB_POOL_PRE_PING") or "false").lower() in ("1", "true", "yes")
+# Postgres statement_timeout in milliseconds, 0 disables it
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT") or 0)
+
+# Number of subcategory levels eagerly loaded together with a Category
+CATEGORY_TREE_DEPTH = int(os.getenv("CATEGORY_TREE_DEPTH") or 10)
+
+# Number of rows fetched from the server-side cursor per chunk of streamed exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE") or 1000)
+
+# Per-process LRU cache of Products and Categories read by ID, size 0 disables it
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE") or 1024)
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL") or 60)
+# Postgres NOTIFY channel the workers evict each other's cache entries through
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL") or "cache_invalidation"
+# Seconds between NOTIFYs publishing the coalesced invalidations of stock writes, see `invalidate_on_commit`
+CACHE_INVALIDATION_COALESCE_INTERVAL = float(os.getenv("CACHE_INVALIDATION_COALESCE_INTERVAL") or 0.1)
+
+# Seconds between checks of Discount windows, and Products repriced per transaction when a Discount changes
+DISCOUNT_SCHEDULER_INTERVAL = float(os.getenv("DISCOUNT_SCHEDULER_INTERVAL") or 10)
+DISCOUNT_REPRICE_BATCH_SIZE = int(os.getenv("DISCOUNT_REPRICE_BATCH_SIZE") or 1000)
+
+# Most lines a batch reservation, sale or fulfilment may contain, each line locks rows until the transaction ends
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS") or 100)
+
+# Seconds an unpaid Reservation holds stock, 0 keeps Reservations until cancelled,
+# and how often and how many expired Reservations at a time the sweeper releases
+RESERVATION_TTL = int(os.getenv("RESERVATION_TTL") or 900)
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL") or 30)
+RESERVATION_SWEEP_BATCH_SIZE = int(os.getenv("RESERVATION_SWEEP_BATCH_SIZE") or 500)
+
+# Seconds the first response of a request with an Idempotency-Key is replayed to its retries,
+# and how often and how many expired keys at a time are purged
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL") or 86400)
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL") or 300)
+IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE") or 1000)
+
+# Directory the workers exchange metrics through, so /metrics reports all of them; empty reports only one worker
+METRICS_DIR = os.getenv("METRICS_DIR") or ""
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL") or 5)
+
 
 # DB_TABLES
 CATEGORY_TABLE = os.getenv("CATEGORY_TABLE")
@@ -22,4 +68,6 @@ PRODUCT_TABLE = os.getenv("PRODUCT_TABLE")
 DISCOUNT_TABLE = os.getenv("DISCOUNT_TABLE")
 PRODUCT_DISCOUNT_TABLE = os.getenv("PRODUCT_DISCOUNT_TABLE")
 RESERVATION_TABLE = os.getenv("RESERVATION_TABLE")
-SALE_TABLE = os.getenv("SALE_TABLE")
\ No newline at end of file
+SALE_TABLE = os.getenv("SALE_TABLE")
+SALE_DAILY_ROLLUP_TABLE = os.getenv("SALE_DAILY_ROLLUP_TABLE")
+IDEMPOTENCY_KEY_TABLE = os.getenv("IDEMPOTENCY_KEY_TABLE")
\ No newline at end of file
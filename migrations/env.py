@@ -0,0 +1,37 @@
+"""Run migrations against DATABASE_URL of config.py, always through the synchronous psycopg2 driver."""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from config import DATABASE_URL
+from src.db import models
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name)
+
+# Migrations don't need the event loop, use psycopg2 even when the app runs on asyncpg
+MIGRATION_URL = context.config.get_main_option("sqlalchemy.url") or DATABASE_URL.replace("+asyncpg", "+psycopg2")
+target_metadata = models.Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Print SQL of the migrations instead of running them: `alembic upgrade head --sql`."""
+    context.configure(url=MIGRATION_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    engine = create_engine(MIGRATION_URL)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
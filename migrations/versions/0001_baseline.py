@@ -0,0 +1,106 @@
+"""Baseline schema, as created by `create_all` before migrations were introduced
+
+Databases created by the application before migrations already have these tables, mark them with
+`alembic stamp 0001` once instead of running this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from config import (
+    CATEGORY_RELATIONS_TABLE,
+    CATEGORY_TABLE,
+    DISCOUNT_TABLE,
+    PRODUCT_DISCOUNT_TABLE,
+    PRODUCT_TABLE,
+    RESERVATION_TABLE,
+    SALE_TABLE,
+)
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        CATEGORY_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String, nullable=False),
+        sa.Column("parent_id", sa.Integer, sa.ForeignKey(f"{CATEGORY_TABLE}.id"), nullable=True),
+    )
+    op.create_index(f"ix_{CATEGORY_TABLE}_id", CATEGORY_TABLE, ["id"])
+
+    op.create_table(
+        CATEGORY_RELATIONS_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("ancestor_id", sa.Integer, sa.ForeignKey(f"{CATEGORY_TABLE}.id"), nullable=False),
+        sa.Column("descendant_id", sa.Integer, sa.ForeignKey(f"{CATEGORY_TABLE}.id"), nullable=False),
+        sa.Column("depth", sa.Integer, nullable=False),
+    )
+    op.create_index(f"ix_{CATEGORY_RELATIONS_TABLE}_id", CATEGORY_RELATIONS_TABLE, ["id"])
+
+    op.create_table(
+        PRODUCT_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String, nullable=False),
+        sa.Column("price", sa.Float, nullable=False),
+        sa.Column("stock", sa.Integer, nullable=False),
+        sa.Column("reserved_stock", sa.Integer),
+        sa.Column("category_id", sa.Integer, sa.ForeignKey(f"{CATEGORY_TABLE}.id")),
+    )
+    op.create_index(f"ix_{PRODUCT_TABLE}_id", PRODUCT_TABLE, ["id"])
+
+    op.create_table(
+        DISCOUNT_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("percentage", sa.Float, nullable=False),
+        sa.Column("description", sa.String, nullable=True),
+        sa.Column("active", sa.Boolean),
+    )
+    op.create_index(f"ix_{DISCOUNT_TABLE}_id", DISCOUNT_TABLE, ["id"])
+
+    op.create_table(
+        PRODUCT_DISCOUNT_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey(f"{PRODUCT_TABLE}.id"), nullable=False),
+        sa.Column("discount_id", sa.Integer, sa.ForeignKey(f"{DISCOUNT_TABLE}.id"), nullable=False),
+    )
+    op.create_index(f"ix_{PRODUCT_DISCOUNT_TABLE}_id", PRODUCT_DISCOUNT_TABLE, ["id"])
+
+    op.create_table(
+        RESERVATION_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey(f"{PRODUCT_TABLE}.id"), nullable=False),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("status", sa.String, nullable=False),
+    )
+    op.create_index(f"ix_{RESERVATION_TABLE}_id", RESERVATION_TABLE, ["id"])
+
+    op.create_table(
+        SALE_TABLE,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey(f"{PRODUCT_TABLE}.id"), nullable=False),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("sale_price", sa.Float, nullable=False),
+    )
+    op.create_index(f"ix_{SALE_TABLE}_id", SALE_TABLE, ["id"])
+
+
+def downgrade() -> None:
+    for table in (
+        SALE_TABLE,
+        RESERVATION_TABLE,
+        PRODUCT_DISCOUNT_TABLE,
+        DISCOUNT_TABLE,
+        PRODUCT_TABLE,
+        CATEGORY_RELATIONS_TABLE,
+        CATEGORY_TABLE,
+    ):
+        op.drop_table(table)
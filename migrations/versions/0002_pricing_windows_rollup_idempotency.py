@@ -0,0 +1,199 @@
+"""Versions, effective prices, Discount windows, Reservation expiry, Sales rollup and Idempotency-Keys
+
+Adds every column, table and index introduced since the baseline and backfills them from existing rows.
+Duplicate closure rows and duplicate Product-Discount links are removed before their unique indexes are built.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from config import (
+    CATEGORY_RELATIONS_TABLE,
+    CATEGORY_TABLE,
+    DISCOUNT_TABLE,
+    IDEMPOTENCY_KEY_TABLE,
+    PRODUCT_DISCOUNT_TABLE,
+    PRODUCT_TABLE,
+    RESERVATION_TABLE,
+    RESERVATION_TTL,
+    SALE_DAILY_ROLLUP_TABLE,
+    SALE_TABLE,
+)
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def delete_duplicates(table: str, *columns: str) -> None:
+    """Keep only the oldest row of every group of rows with equal `columns`."""
+    same = " AND ".join(f"newer.{column} = older.{column}" for column in columns)
+    op.execute(f"DELETE FROM {table} AS newer USING {table} AS older WHERE {same} AND newer.id > older.id")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Categories
+    op.add_column(CATEGORY_TABLE, sa.Column("version", sa.Integer, nullable=False, server_default="1"))
+    op.add_column(
+        CATEGORY_TABLE,
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    delete_duplicates(CATEGORY_RELATIONS_TABLE, "ancestor_id", "descendant_id")
+    op.create_index(
+        f"ix_{CATEGORY_RELATIONS_TABLE}_ancestor_id_descendant_id",
+        CATEGORY_RELATIONS_TABLE,
+        ["ancestor_id", "descendant_id"],
+        unique=True,
+    )
+
+    # Discounts, Discounts of the baseline have no window, so the active ones are in effect
+    op.add_column(DISCOUNT_TABLE, sa.Column("starts_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column(DISCOUNT_TABLE, sa.Column("ends_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column(DISCOUNT_TABLE, sa.Column("in_effect", sa.Boolean, nullable=False, server_default="false"))
+    op.add_column(DISCOUNT_TABLE, sa.Column("reprice_after_product_id", sa.Integer, nullable=True))
+    op.execute(f"UPDATE {DISCOUNT_TABLE} SET in_effect = coalesce(active, true)")
+    op.create_index(
+        f"ix_{DISCOUNT_TABLE}_reprice_pending",
+        DISCOUNT_TABLE,
+        ["id"],
+        postgresql_where=sa.text("reprice_after_product_id IS NOT NULL"),
+    )
+
+    delete_duplicates(PRODUCT_DISCOUNT_TABLE, "product_id", "discount_id")
+    op.create_index(
+        f"ix_{PRODUCT_DISCOUNT_TABLE}_product_id_discount_id",
+        PRODUCT_DISCOUNT_TABLE,
+        ["product_id", "discount_id"],
+        unique=True,
+    )
+    op.create_index(
+        f"ix_{PRODUCT_DISCOUNT_TABLE}_discount_id_product_id", PRODUCT_DISCOUNT_TABLE, ["discount_id", "product_id"]
+    )
+
+    # Products, effective prices are computed like `reprice_products` does
+    op.add_column(PRODUCT_TABLE, sa.Column("effective_price", sa.Float, nullable=True))
+    op.add_column(PRODUCT_TABLE, sa.Column("version", sa.Integer, nullable=False, server_default="1"))
+    op.add_column(
+        PRODUCT_TABLE,
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute(
+        f"""
+        UPDATE {PRODUCT_TABLE} AS product SET effective_price = round(
+            (product.price * coalesce((
+                SELECT CASE WHEN bool_or(discount.percentage >= 100) THEN 0.0
+                    ELSE exp(sum(ln(greatest(1 - discount.percentage / 100.0, 1e-9)))) END
+                FROM {DISCOUNT_TABLE} AS discount
+                JOIN {PRODUCT_DISCOUNT_TABLE} AS link ON link.discount_id = discount.id
+                WHERE link.product_id = product.id AND discount.in_effect
+            ), 1.0))::numeric,
+            2
+        )
+        """
+    )
+    op.alter_column(PRODUCT_TABLE, "effective_price", nullable=False)
+    op.create_index(
+        f"ix_{PRODUCT_TABLE}_category_id_stock",
+        PRODUCT_TABLE,
+        ["category_id", "stock"],
+        postgresql_where=sa.text("stock > 0"),
+    )
+    op.create_index(f"ix_{PRODUCT_TABLE}_name", PRODUCT_TABLE, ["name"])
+    op.create_index(f"ix_{PRODUCT_TABLE}_effective_price", PRODUCT_TABLE, ["effective_price"])
+    op.create_index(
+        f"ix_{PRODUCT_TABLE}_name_trgm",
+        PRODUCT_TABLE,
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+    # Reservations, open ones made before expiry get a full TTL from now. Their price stays NULL,
+    # they are sold at the current effective price.
+    op.add_column(RESERVATION_TABLE, sa.Column("price", sa.Float, nullable=True))
+    op.add_column(RESERVATION_TABLE, sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True))
+    if RESERVATION_TTL > 0:
+        op.execute(
+            f"UPDATE {RESERVATION_TABLE} SET expires_at = now() + interval '{RESERVATION_TTL} seconds'"
+            " WHERE status = 'reserved'"
+        )
+    op.create_index(
+        f"ix_{RESERVATION_TABLE}_expires_at_reserved",
+        RESERVATION_TABLE,
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'reserved'"),
+    )
+
+    # Sales, the time of existing Sales is unknown, they are dated to the migration
+    op.add_column(
+        SALE_TABLE,
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(f"ix_{SALE_TABLE}_created_at_brin", SALE_TABLE, ["created_at"], postgresql_using="brin")
+    op.create_index(f"ix_{SALE_TABLE}_product_id_created_at", SALE_TABLE, ["product_id", "created_at"])
+
+    op.create_table(
+        SALE_DAILY_ROLLUP_TABLE,
+        sa.Column("product_id", sa.Integer, sa.ForeignKey(f"{PRODUCT_TABLE}.id"), primary_key=True),
+        sa.Column("day", sa.Date, primary_key=True),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("revenue", sa.Float, nullable=False),
+        sa.Column("sale_count", sa.Integer, nullable=False),
+    )
+    op.execute(
+        f"""
+        INSERT INTO {SALE_DAILY_ROLLUP_TABLE} (product_id, day, quantity, revenue, sale_count)
+        SELECT product_id, timezone('UTC', created_at)::date, sum(quantity), sum(quantity * sale_price), count(*)
+        FROM {SALE_TABLE}
+        GROUP BY 1, 2
+        """
+    )
+
+    op.create_table(
+        IDEMPOTENCY_KEY_TABLE,
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("fingerprint", sa.String(64), nullable=False),
+        sa.Column("status_code", sa.Integer, nullable=True),
+        sa.Column("content_type", sa.String, nullable=True),
+        sa.Column("body", sa.LargeBinary, nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(f"ix_{IDEMPOTENCY_KEY_TABLE}_expires_at", IDEMPOTENCY_KEY_TABLE, ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table(IDEMPOTENCY_KEY_TABLE)
+    op.drop_table(SALE_DAILY_ROLLUP_TABLE)
+
+    op.drop_index(f"ix_{SALE_TABLE}_product_id_created_at", SALE_TABLE)
+    op.drop_index(f"ix_{SALE_TABLE}_created_at_brin", SALE_TABLE)
+    op.drop_column(SALE_TABLE, "created_at")
+
+    op.drop_index(f"ix_{RESERVATION_TABLE}_expires_at_reserved", RESERVATION_TABLE)
+    op.drop_column(RESERVATION_TABLE, "expires_at")
+    op.drop_column(RESERVATION_TABLE, "price")
+
+    for index in ("name_trgm", "effective_price", "name", "category_id_stock"):
+        op.drop_index(f"ix_{PRODUCT_TABLE}_{index}", PRODUCT_TABLE)
+    op.drop_column(PRODUCT_TABLE, "updated_at")
+    op.drop_column(PRODUCT_TABLE, "version")
+    op.drop_column(PRODUCT_TABLE, "effective_price")
+
+    op.drop_index(f"ix_{PRODUCT_DISCOUNT_TABLE}_discount_id_product_id", PRODUCT_DISCOUNT_TABLE)
+    op.drop_index(f"ix_{PRODUCT_DISCOUNT_TABLE}_product_id_discount_id", PRODUCT_DISCOUNT_TABLE)
+
+    op.drop_index(f"ix_{DISCOUNT_TABLE}_reprice_pending", DISCOUNT_TABLE)
+    for column in ("reprice_after_product_id", "in_effect", "ends_at", "starts_at"):
+        op.drop_column(DISCOUNT_TABLE, column)
+
+    op.drop_index(f"ix_{CATEGORY_RELATIONS_TABLE}_ancestor_id_descendant_id", CATEGORY_RELATIONS_TABLE)
+    op.drop_column(CATEGORY_TABLE, "updated_at")
+    op.drop_column(CATEGORY_TABLE, "version")
@@ -0,0 +1,25 @@
+"""Mark Discounts being deleted in the background
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from config import DISCOUNT_TABLE
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(DISCOUNT_TABLE, sa.Column("deleted", sa.Boolean, nullable=False, server_default="false"))
+
+
+def downgrade() -> None:
+    op.drop_column(DISCOUNT_TABLE, "deleted")
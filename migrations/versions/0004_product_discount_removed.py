@@ -0,0 +1,25 @@
+"""Mark Product Discount links being removed in the background
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:00:00
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from config import PRODUCT_DISCOUNT_TABLE
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(PRODUCT_DISCOUNT_TABLE, sa.Column("removed", sa.Boolean, nullable=False, server_default="false"))
+
+
+def downgrade() -> None:
+    op.drop_column(PRODUCT_DISCOUNT_TABLE, "removed")
@@ -0,0 +1,14 @@
+"""Recompute the daily Sales rollup from all Sales: `python -m src.commands.rebuild_sales_rollup`."""
+import asyncio
+
+from ..db.database import run_in_session
+from ..db.sqlalchemy_db.db_sail import SqlalchemySaleDatabase
+
+
+async def main() -> None:
+    rows = await run_in_session(SqlalchemySaleDatabase().rebuild_sales_rollup)
+    print(f"Sales rollup rebuilt: {rows} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,6 +9,16 @@ class AbstractCategoryDatabase(ABC):
         """Retrieve all Categories from database with pagination support."""
         pass
 
+    @abstractmethod
+    def get_all_categories_versions(self, db, pagination):
+        """Retrieve version columns of the Categories on a page of `get_all_categories`."""
+        pass
+
+    @abstractmethod
+    def get_category_versions(self, db, category_id):
+        """Retrieve version columns of Category by ID."""
+        pass
+
     @abstractmethod
     def get_category_by_id(self, db, category_id):
         """Retrieve Category by ID from database."""
@@ -26,15 +26,35 @@ class AbstractDiscountDatabase(ABC):
 
     @abstractmethod
     def delete_discount(self, db, discount_id):
-        """Delete existing Discount by ID from the database."""
+        """Delete existing Discount by ID from the database, its Products are unlinked in the background."""
         pass
 
     @abstractmethod
     def add_discount_to_product(self, db, product_id, discount_id):
-        """Add Discount to Product and update Product price."""
+        """Link Discount to Product and recompute its effective price."""
         pass
 
     @abstractmethod
     def remove_discount_from_product(self, db, product_id, discount_id):
-        """Remove Discount from Product and update Product price."""
+        """Unlink Discount from Product and recompute its effective price."""
+        pass
+
+    @abstractmethod
+    def add_discount_to_category(self, db, category_id, discount_id):
+        """Link Discount to all Products of Category subtree and queue repricing of its Products."""
+        pass
+
+    @abstractmethod
+    def remove_discount_from_category(self, db, category_id, discount_id):
+        """Unlink Discount from all Products of Category subtree and queue repricing of its Products."""
+        pass
+
+    @abstractmethod
+    def apply_discount_schedule(self, db):
+        """Switch Discounts whose window started or ended on or off and queue repricing of their Products."""
+        pass
+
+    @abstractmethod
+    def reprice_discount_batch(self, db, batch_size):
+        """Recompute effective prices of the next batch of Products of a Discount queued for repricing."""
         pass
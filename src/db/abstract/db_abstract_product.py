@@ -9,6 +9,21 @@ class AbstractProductDatabase(ABC):
         """Get all Products from the database with pagination support."""
         pass
 
+    @abstractmethod
+    def get_products_export(self, db):
+        """Get statement selecting all Products for streaming export."""
+        pass
+
+    @abstractmethod
+    def get_all_products_versions(self, db, pagination):
+        """Get version columns of the Products on a page of `get_all_products`."""
+        pass
+
+    @abstractmethod
+    def get_product_versions(self, db, product_id):
+        """Get version columns of Product by ID."""
+        pass
+
     @abstractmethod
     def get_product_by_id(self, db, product_id):
         """Get product by ID from the database."""
@@ -29,6 +44,11 @@ class AbstractProductDatabase(ABC):
         """Remove Product by ID from the database."""
         pass
 
+    @abstractmethod
+    def search_products(self, db, query, pagination, category_id, in_stock):
+        """Search Products by name prefix or fuzzy match, optionally within Category subtree and in stock."""
+        pass
+
     @abstractmethod
     def update_product(self, db, product_id, product_data):
         """Update Product by ID in database."""
@@ -24,7 +24,27 @@ class AbstractReservationDatabase(ABC):
         """Reserve Product by ID in the database."""
         pass
 
+    @abstractmethod
+    def reserve_products(self, db, items):
+        """Reserve several Products at once, all or nothing."""
+        pass
+
     @abstractmethod
     def cancel_reservation(self, db, reservation_id):
         """Cancel Reservation by ID in the database."""
         pass
+
+    @abstractmethod
+    def fulfil_reservation(self, db, reservation_id):
+        """Sell reserved stock of Reservation by ID at its locked-in price and mark it fulfilled."""
+        pass
+
+    @abstractmethod
+    def fulfil_reservations(self, db, reservation_ids):
+        """Fulfil several Reservations in one transaction, all or nothing."""
+        pass
+
+    @abstractmethod
+    def release_expired_reservations(self, db, batch_size):
+        """Expire a batch of overdue Reservations and return their quantities to the Product stock."""
+        pass
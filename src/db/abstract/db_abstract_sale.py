@@ -10,6 +10,36 @@ class AbstractSaleDatabase(ABC):
         pass
 
     @abstractmethod
-    def get_sales_report(self, db, pagination, category_id, product_id):
-        """Get Sales report, optionally filtered by Category or Product."""
+    def sell_products(self, db, items):
+        """Sell several Products at once, all or nothing, and create their Sale records in the database."""
+        pass
+
+    @abstractmethod
+    def fulfil_reservation(self, db, reservation_id):
+        """Sell reserved stock of Reservation by ID at its locked-in price and mark it fulfilled."""
+        pass
+
+    @abstractmethod
+    def fulfil_reservations(self, db, reservation_ids):
+        """Fulfil several Reservations in one transaction, all or nothing."""
+        pass
+
+    @abstractmethod
+    def get_sales_report(self, db, pagination, category_id, product_id, date_from, date_to):
+        """Get Sales report, optionally filtered by Category, Product or time range."""
+        pass
+
+    @abstractmethod
+    def get_sales_export(self, db, category_id, product_id, date_from, date_to):
+        """Get statement selecting Sales for streaming export, filtered like the Sales report."""
+        pass
+
+    @abstractmethod
+    def get_sales_summary(self, db, group_by, category_id, product_id, date_from, date_to):
+        """Get Sales totals aggregated by Product, Category or Category subtree."""
+        pass
+
+    @abstractmethod
+    def rebuild_sales_rollup(self, db):
+        """Recompute the daily Sales rollup from all Sales records."""
         pass
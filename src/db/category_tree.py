@@ -0,0 +1,78 @@
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .models import DbCategoryRelation
+
+
+class CategoryTreeSnapshot:
+    """Immutable in-memory copy of the Category closure table."""
+
+    def __init__(self, version: int, relations: List[tuple]):
+        self.version = version
+        self.descendants: Dict[int, Dict[int, int]] = {}
+        for ancestor_id, descendant_id, depth in relations:
+            self.descendants.setdefault(ancestor_id, {})[descendant_id] = depth
+
+    def get_descendants(self, category_id: int) -> Dict[int, int]:
+        """Get `{descendant_id: depth}` of Category, including Category itself at depth 0."""
+        return self.descendants.get(category_id, {})
+
+
+class CategoryTreeCache:
+    """
+    Versioned snapshot of the Category closure table shared by all repositories of the process.
+
+    The snapshot is loaded lazily with a single query and kept until `invalidate` is called after
+    a Category write commits, so subtree lookups don't touch the database on the hot path.
+    The lock only guards publishing a loaded snapshot and is never held across database I/O.
+    """
+
+    name = "category_tree"
+
+    def __init__(self):
+        self._publish_lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[CategoryTreeSnapshot] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get_snapshot(self, db: Session) -> CategoryTreeSnapshot:
+        """Get current snapshot, loading it from the database if it was invalidated."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._build(db)
+        return snapshot
+
+    def get_descendants(self, db: Session, category_id: int) -> List[int]:
+        """Get IDs of Category and all its Subcategories."""
+        return list(self.get_snapshot(db).get_descendants(category_id))
+
+    def invalidate(self, keys: Optional[List[int]] = None) -> None:
+        """Drop current snapshot, next lookup rebuilds it from the database. Whole tree is dropped for any `keys`."""
+        with self._publish_lock:
+            self._version += 1
+            self._snapshot = None
+
+    def _build(self, db: Session) -> CategoryTreeSnapshot:
+        # Load without holding the lock: under asyncpg concurrent requests run on the same thread,
+        # so a request waiting for the lock would block the event loop of the one loading the tree.
+        # Concurrent misses may load the tree more than once, only right after an invalidation.
+        version = self._version
+        relations = db.query(
+            DbCategoryRelation.ancestor_id,
+            DbCategoryRelation.descendant_id,
+            DbCategoryRelation.depth,
+        ).all()
+        snapshot = CategoryTreeSnapshot(version, relations)
+        with self._publish_lock:
+            # Don't publish a snapshot that was invalidated while it was loading
+            if version == self._version:
+                self._snapshot = snapshot
+        return snapshot
+
+
+category_tree = CategoryTreeCache()
@@ -1,11 +1,23 @@
-from typing import AsyncGenerator, Generator
+import asyncio
+from typing import AsyncGenerator, AsyncIterator, Callable, Generator, Iterator, Union
 
-from sqlalchemy import create_engine
+from sqlalchemy import Select, create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from config import DATABASE_URL, DB_CONNECTOR
+from config import (
+    DATABASE_URL,
+    DB_CONNECTOR,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_TIMEOUT,
+)
+
+from .pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
 
 Base = declarative_base()
 
@@ -14,14 +26,33 @@ class DatabaseFactory:
     """
     Factory to create synchronous or asynchronous engine and session for psycopg2 and asyncpg connectors.
     """
+    @staticmethod
+    def pool_options() -> dict:
+        """Connection pool settings shared by both engines."""
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+        }
+
     @staticmethod
     def create_engine_and_session():
         if DB_CONNECTOR == "psycopg2":
             # Creating synchronous engine and session for psycopg2
-            sync_engine = create_engine(DATABASE_URL, echo=False)
+            connect_args = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"} if DB_STATEMENT_TIMEOUT else {}
+            sync_engine = create_engine(
+                DATABASE_URL,
+                echo=False,
+                poolclass=InstrumentedQueuePool,
+                connect_args=connect_args,
+                **DatabaseFactory.pool_options(),
+            )
             SyncSessionLocal = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=sync_engine,
             )
 
@@ -36,10 +67,21 @@ class DatabaseFactory:
 
         elif DB_CONNECTOR == "asyncpg":
             # Creating asynchronous engine and session for asyncpg
-            async_engine = create_async_engine(DATABASE_URL, echo=False)
+            connect_args = (
+                {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}} if DB_STATEMENT_TIMEOUT else {}
+            )
+            async_engine = create_async_engine(
+                DATABASE_URL,
+                echo=False,
+                poolclass=InstrumentedAsyncAdaptedQueuePool,
+                connect_args=connect_args,
+                **DatabaseFactory.pool_options(),
+            )
+            # Objects must stay usable after commit, async sessions can't lazy load expired attributes
             AsyncSessionLocal = async_sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=async_engine,
                 class_=AsyncSession,
             )
@@ -56,3 +98,45 @@ class DatabaseFactory:
 
 # Creating instances based on DB_CONNECTOR
 SessionLocal, get_db, engine = DatabaseFactory.create_engine_and_session()
+IS_ASYNC = DB_CONNECTOR == "asyncpg"
+
+
+async def run_in_session(func: Callable, *args, **kwargs):
+    """Run `func(session, *args, **kwargs)` in a new session outside of a request, e.g. from commands and jobs."""
+    if IS_ASYNC:
+        async with SessionLocal() as session:
+            return await session.run_sync(func, *args, **kwargs)
+
+    def run():
+        with SessionLocal() as session:
+            return func(session, *args, **kwargs)
+
+    return await asyncio.to_thread(run)
+
+
+def stream_in_session(statement: Select, batch_size: int) -> Union[Iterator, AsyncIterator]:
+    """
+    Execute `statement` on a server-side cursor in a new session and iterate over its result.
+
+    Yields column names first and then lists of at most `batch_size` rows, so memory stays constant
+    regardless of the result size. The session lives as long as the iteration, not the request.
+    """
+    statement = statement.execution_options(yield_per=batch_size)
+
+    if IS_ASYNC:
+        async def stream():
+            async with SessionLocal() as session:
+                result = await session.stream(statement)
+                yield list(result.keys())
+                async for rows in result.partitions():
+                    yield rows
+
+        return stream()
+
+    def stream():
+        with SessionLocal() as session:
+            result = session.execute(statement)
+            yield list(result.keys())
+            yield from result.partitions()
+
+    return stream()
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence
+
+from config import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
+
+
+class EntityCache:
+    """
+    Bounded LRU cache with TTL for single entities read by ID, shared by all sessions of the process.
+
+    Entries are evicted after the transaction that changed them commits. A load that overlaps with any
+    eviction is returned but not stored, so a value read before a commit can't outlive it in the cache.
+    """
+
+    def __init__(self, name: str, maxsize: int = ENTITY_CACHE_SIZE, ttl: float = ENTITY_CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any], cacheable: Callable[[Any], bool] = None) -> Any:
+        """Get entity from the cache or load it with `load` and cache it unless `cacheable` rejects it."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        if self.maxsize <= 0 or (cacheable is not None and not cacheable(value)):
+            return value
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, keys: Optional[Sequence[Hashable]] = None) -> None:
+        """Drop entries of `keys`, or all entries when `keys` is None."""
+        with self._lock:
+            self._generation += 1
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        """Get size and hit/miss/eviction counters of the cache."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+product_cache = EntityCache("product")
+category_cache = EntityCache("category")
+ENTITY_CACHES = {cache.name: cache for cache in (product_cache, category_cache)}
+
+
+def get_cache_stats() -> Dict:
+    """Get statistics of all entity caches."""
+    return {name: cache.stats() for name, cache in ENTITY_CACHES.items()}
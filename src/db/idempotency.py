@@ -0,0 +1,86 @@
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import Row, delete, exists, false, func, literal, null, select, true, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from config import IDEMPOTENCY_KEY_TTL
+
+from .models import DbIdempotencyKey
+
+
+def claim_idempotency_key(db: Session, key: str, fingerprint: str) -> Optional[Row]:
+    """
+    Claim `key` for a new request, or get the response stored for it, in a single statement.
+
+    A new or expired key is (re)inserted and the row comes back with `claimed` true. Otherwise the stored
+    row comes back with `claimed` false and `status_code` NULL while the first request is still running.
+    Returns None when a concurrent request claimed the key after this statement took its snapshot.
+    """
+    excluded = pg_insert(DbIdempotencyKey).excluded
+    claimed = (
+        pg_insert(DbIdempotencyKey)
+        .values(key=key, fingerprint=fingerprint, expires_at=func.now() + timedelta(seconds=IDEMPOTENCY_KEY_TTL))
+        .on_conflict_do_update(
+            index_elements=[DbIdempotencyKey.key],
+            set_={
+                "fingerprint": excluded.fingerprint,
+                "expires_at": excluded.expires_at,
+                "status_code": None,
+                "content_type": None,
+                "body": None,
+            },
+            where=DbIdempotencyKey.expires_at <= func.now(),
+        )
+        .returning(DbIdempotencyKey.key)
+        .cte("claimed_key")
+    )
+    statement = union_all(
+        select(
+            true().label("claimed"),
+            literal(fingerprint).label("fingerprint"),
+            null().label("status_code"),
+            null().label("content_type"),
+            null().label("body"),
+        ).select_from(claimed),
+        select(
+            false(),
+            DbIdempotencyKey.fingerprint,
+            DbIdempotencyKey.status_code,
+            DbIdempotencyKey.content_type,
+            DbIdempotencyKey.body,
+        ).where(DbIdempotencyKey.key == key, ~exists(claimed.select())),
+    )
+    row = db.execute(statement).first()
+    db.commit()
+    return row
+
+
+def store_idempotent_response(db: Session, key: str, status_code: int, content_type: str, body: bytes) -> None:
+    """Store the response of the request that claimed `key`, to be replayed to its retries."""
+    db.execute(
+        update(DbIdempotencyKey)
+        .where(DbIdempotencyKey.key == key)
+        .values(status_code=status_code, content_type=content_type, body=body)
+    )
+    db.commit()
+
+
+def release_idempotency_key(db: Session, key: str) -> None:
+    """Forget `key` of a request that failed without a response worth replaying, so a retry runs it again."""
+    db.execute(delete(DbIdempotencyKey).where(DbIdempotencyKey.key == key, DbIdempotencyKey.status_code.is_(None)))
+    db.commit()
+
+
+def purge_expired_idempotency_keys(db: Session, batch_size: int) -> int:
+    """Delete at most `batch_size` expired keys, skipping rows locked by concurrent purges. Returns their number."""
+    expired = (
+        select(DbIdempotencyKey.key)
+        .where(DbIdempotencyKey.expires_at <= func.now())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    deleted = db.execute(delete(DbIdempotencyKey).where(DbIdempotencyKey.key.in_(expired)))
+    db.commit()
+    return deleted.rowcount
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+from typing import Dict, Hashable, Optional, Sequence
+
+import psycopg2
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from config import (
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_INVALIDATION_COALESCE_INTERVAL,
+    DB_HOST,
+    DB_NAME,
+    DB_PASSWORD,
+    DB_PORT,
+    DB_USER,
+)
+
+from .category_tree import category_tree
+from .entity_cache import category_cache, product_cache
+
+logger = logging.getLogger(__name__)
+
+# Session.info key collecting cache entries to evict once the transaction commits
+PENDING_INVALIDATIONS = "cache_invalidations"
+# Identifies invalidations published by this process, which are applied locally on commit already
+PROCESS_ID = f"{os.getpid()}-{uuid.uuid4().hex}"
+# Keeps NOTIFY payloads well below the 8000 bytes limit of Postgres
+MAX_KEYS_PER_NOTIFICATION = 500
+# Larger invalidations drop the whole cache instead of publishing thousands of keys
+MAX_INVALIDATED_KEYS = 5000
+NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+# All payloads of a coalesced publish are sent by one statement, i.e. one notifying transaction
+NOTIFY_MANY_SQL = "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload"
+
+CACHES = {cache.name: cache for cache in (product_cache, category_cache, category_tree)}
+
+# Committed invalidations waiting for the listener to publish them, `{cache name: keys}`, None drops the whole cache
+_coalesced: Dict[str, Optional[set]] = {}
+_coalesced_lock = threading.Lock()
+
+
+def invalidate_on_commit(
+    db: Session, cache, keys: Optional[Sequence[Hashable]] = None, coalesce: bool = False
+) -> None:
+    """
+    Schedule eviction of `keys`, or of the whole `cache` when None, once the transaction of `db` commits.
+
+    The eviction is also published with NOTIFY in the same transaction, so caches of the other workers
+    drop the entries when the write becomes visible to them. Postgres serializes the commits of all
+    transactions that sent a NOTIFY, so hot writes, such as stock moved by every reserve, sell and cancel,
+    pass `coalesce` instead: their keys are queued after commit and the listener publishes everything
+    queued by the process with one NOTIFY every CACHE_INVALIDATION_COALESCE_INTERVAL seconds. The other
+    workers may then serve the old entries up to that much longer.
+    """
+    if keys is not None and len(keys) > MAX_INVALIDATED_KEYS:
+        keys = None
+    db.info.setdefault(PENDING_INVALIDATIONS, []).append(
+        (cache.name, None if keys is None else list(keys), coalesce)
+    )
+
+
+def invalidate_all() -> None:
+    """Drop every cached entry of this process."""
+    for cache in CACHES.values():
+        cache.invalidate()
+
+
+def _notification_payloads(name: str, keys: Optional[list]):
+    if keys is None:
+        yield json.dumps({"cache": name, "keys": None, "origin": PROCESS_ID})
+        return
+    for start in range(0, len(keys), MAX_KEYS_PER_NOTIFICATION):
+        chunk = keys[start:start + MAX_KEYS_PER_NOTIFICATION]
+        yield json.dumps({"cache": name, "keys": chunk, "origin": PROCESS_ID})
+
+
+def _queue_coalesced(name: str, keys: Optional[list]) -> None:
+    with _coalesced_lock:
+        if name in _coalesced and _coalesced[name] is None:
+            return
+        if keys is None:
+            _coalesced[name] = None
+            return
+        queued = _coalesced.setdefault(name, set())
+        queued.update(keys)
+        if len(queued) > MAX_INVALIDATED_KEYS:
+            _coalesced[name] = None
+
+
+def take_coalesced_invalidations() -> Dict[str, Optional[list]]:
+    """Remove and return invalidations queued for publishing, `{cache name: keys}`."""
+    with _coalesced_lock:
+        pending = dict(_coalesced)
+        _coalesced.clear()
+    return {name: None if keys is None else sorted(keys) for name, keys in pending.items()}
+
+
+def publish_coalesced_invalidations(connection, channel: str = CACHE_INVALIDATION_CHANNEL) -> int:
+    """
+    Publish all queued invalidations of the process with a single NOTIFY statement on an autocommit
+    psycopg2 `connection`. They are queued again if publishing fails. Returns number of payloads sent.
+    """
+    pending = take_coalesced_invalidations()
+    payloads = [payload for name, keys in pending.items() for payload in _notification_payloads(name, keys)]
+    if not payloads:
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(NOTIFY_MANY_SQL, (channel, payloads))
+    except psycopg2.Error:
+        for name, keys in pending.items():
+            _queue_coalesced(name, keys)
+        raise
+    return len(payloads)
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_invalidations(session: Session) -> None:
+    pending = session.info.get(PENDING_INVALIDATIONS)
+    if not pending or session.get_bind().dialect.name != "postgresql":
+        return
+    for name, keys, coalesce in pending:
+        if coalesce:
+            continue
+        for payload in _notification_payloads(name, keys):
+            session.execute(NOTIFY_STATEMENT, {"channel": CACHE_INVALIDATION_CHANNEL, "payload": payload})
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    for name, keys, coalesce in session.info.pop(PENDING_INVALIDATIONS, ()):
+        CACHES[name].invalidate(keys)
+        if coalesce:
+            _queue_coalesced(name, keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_INVALIDATIONS, None)
+
+
+def handle_notification(payload: str) -> None:
+    """Evict entries named by an invalidation published by another process."""
+    try:
+        message = json.loads(payload)
+        cache = CACHES[message["cache"]]
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Ignoring malformed cache invalidation: %r", payload)
+        return
+    if message.get("origin") != PROCESS_ID:
+        cache.invalidate(message.get("keys"))
+
+
+class InvalidationListener:
+    """
+    Background thread listening to cache invalidations published by the other workers
+    and publishing the coalesced invalidations of this one every `publish_interval` seconds.
+
+    Uses its own autocommit psycopg2 connection, independent of the connector of the application engine.
+    Whenever the connection is (re)established the local caches are dropped, since invalidations sent
+    while nobody was listening are lost.
+    """
+
+    def __init__(
+        self,
+        channel: str = CACHE_INVALIDATION_CHANNEL,
+        publish_interval: float = CACHE_INVALIDATION_COALESCE_INTERVAL,
+        retry_delay: float = 5.0,
+    ):
+        self.channel = channel
+        self.publish_interval = publish_interval
+        self.retry_delay = retry_delay
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.publish_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except psycopg2.Error:
+                logger.exception("Cache invalidation listener disconnected, retrying in %s s", self.retry_delay)
+                self._stopped.wait(self.retry_delay)
+
+    def _listen(self) -> None:
+        connection = psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            invalidate_all()
+
+            next_publish = time.monotonic()
+            while not self._stopped.is_set():
+                timeout = max(next_publish - time.monotonic(), 0)
+                if select.select([connection], [], [], timeout)[0]:
+                    connection.poll()
+                    while connection.notifies:
+                        handle_notification(connection.notifies.pop(0).payload)
+                if time.monotonic() >= next_publish:
+                    publish_coalesced_invalidations(connection, self.channel)
+                    next_publish = time.monotonic() + self.publish_interval
+        finally:
+            connection.close()
+
+
+invalidation_listener = InvalidationListener()
@@ -1,25 +1,66 @@
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String
+from datetime import timedelta
+
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    event,
+    func,
+    literal_column,
+)
 from sqlalchemy.orm import relationship
 
 from config import (
     CATEGORY_RELATIONS_TABLE,
     CATEGORY_TABLE,
     DISCOUNT_TABLE,
+    IDEMPOTENCY_KEY_TABLE,
     PRODUCT_DISCOUNT_TABLE,
     PRODUCT_TABLE,
     RESERVATION_TABLE,
+    RESERVATION_TTL,
+    SALE_DAILY_ROLLUP_TABLE,
     SALE_TABLE,
 )
 
 from .database import Base
 
+# Trigram operator classes used by the Product name search index
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 
 class DbCategory(Base):
     __tablename__ = CATEGORY_TABLE
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     parent_id = Column(Integer, ForeignKey('categories.id'), nullable=True)
-    parent = relationship("DbCategory", remote_side=[id], backref="children")
+    parent = relationship("DbCategory", remote_side=[id], back_populates="children")
+    children = relationship("DbCategory", back_populates="parent")
+    # Bumped by every UPDATE, including Core statements, and on ancestors when the subtree changes
+    version = Column(
+        Integer, nullable=False, default=1, server_default="1", onupdate=literal_column(f"{CATEGORY_TABLE}.version") + 1
+    )
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    # Fetch bumped version with RETURNING instead of expiring it after flush
+    __mapper_args__ = {"eager_defaults": True}
+
+    @property
+    def etag_key(self) -> tuple:
+        """Values the rendered Category depends on, in the order of CATEGORY_VERSION_COLUMNS."""
+        return self.id, self.version, self.updated_at
 
 
 class DbCategoryRelation(Base):
@@ -29,21 +70,56 @@ class DbCategoryRelation(Base):
     descendant_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
     depth = Column(Integer, nullable=False)
 
+    __table_args__ = (
+        Index(f"ix_{CATEGORY_RELATIONS_TABLE}_ancestor_id_descendant_id", "ancestor_id", "descendant_id", unique=True),
+    )
+
 
 class DbProduct(Base):
     __tablename__ = PRODUCT_TABLE
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     price = Column(Float, nullable=False)
+    # Price after all active Discounts, maintained by `reprice_products` whenever Discounts change
+    effective_price = Column(
+        Float, nullable=False, default=lambda context: context.get_current_parameters()["price"]
+    )
     stock = Column(Integer, nullable=False)
     reserved_stock = Column(Integer, default=0)
     category_id = Column(Integer, ForeignKey('categories.id'))
-    category = relationship("DbCategory", backref="products")
+    category = relationship("DbCategory", backref="products", lazy="joined")
+    # Bumped by every UPDATE, including the Core statements moving stock
+    version = Column(
+        Integer, nullable=False, default=1, server_default="1", onupdate=literal_column(f"{PRODUCT_TABLE}.version") + 1
+    )
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index(f"ix_{PRODUCT_TABLE}_category_id_stock", "category_id", "stock", postgresql_where=stock > 0),
+        Index(f"ix_{PRODUCT_TABLE}_name", "name"),
+        Index(f"ix_{PRODUCT_TABLE}_effective_price", "effective_price"),
+        # Trigram index serves prefix ILIKE and typo-tolerant similarity search on names
+        Index(
+            f"ix_{PRODUCT_TABLE}_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+    # Fetch bumped version with RETURNING instead of expiring it after flush
+    __mapper_args__ = {"eager_defaults": True}
 
     @property
     def category_name(self):
         return self.category.name if self.category else None
 
+    @property
+    def etag_key(self) -> tuple:
+        """Values the rendered Product depends on, in the order of PRODUCT_VERSION_COLUMNS."""
+        category_key = (self.category.version, self.category.updated_at) if self.category else (None, None)
+        return self.id, self.version, self.updated_at, *category_key
+
 
 class DbDiscount(Base):
     __tablename__ = DISCOUNT_TABLE
@@ -51,6 +127,22 @@ class DbDiscount(Base):
     percentage = Column(Float, nullable=False)
     description = Column(String, nullable=True)
     active = Column(Boolean, default=True)
+    starts_at = Column(DateTime(timezone=True), nullable=True)
+    ends_at = Column(DateTime(timezone=True), nullable=True)
+    # Whether effective prices include the Discount, i.e. it is active and inside its window
+    in_effect = Column(Boolean, nullable=False, default=False, server_default="false")
+    # Products of the Discount with ID above this one still need repricing, NULL when nothing is pending
+    reprice_after_product_id = Column(Integer, nullable=True)
+    # Deleted Discounts stay until the scheduler has repriced and unlinked all their Products
+    deleted = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    __table_args__ = (
+        Index(
+            f"ix_{DISCOUNT_TABLE}_reprice_pending",
+            "id",
+            postgresql_where=reprice_after_product_id.isnot(None),
+        ),
+    )
 
 
 class DbProductDiscount(Base):
@@ -58,9 +150,16 @@ class DbProductDiscount(Base):
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
     discount_id = Column(Integer, ForeignKey('discounts.id'), nullable=False)
+    # Unlinked by a Category-wide removal, no longer priced in and deleted by the scheduler in batches
+    removed = Column(Boolean, nullable=False, default=False, server_default="false")
     product = relationship("DbProduct", backref="product_discounts")
     discount = relationship("DbDiscount", backref="product_discounts")
 
+    __table_args__ = (
+        Index(f"ix_{PRODUCT_DISCOUNT_TABLE}_product_id_discount_id", "product_id", "discount_id", unique=True),
+        Index(f"ix_{PRODUCT_DISCOUNT_TABLE}_discount_id_product_id", "discount_id", "product_id"),
+    )
+
 
 class DbReservation(Base):
     __tablename__ = RESERVATION_TABLE
@@ -68,8 +167,20 @@ class DbReservation(Base):
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
     quantity = Column(Integer, nullable=False)
     status = Column(String, nullable=False, default='reserved')
+    # Effective price the Product is sold at when the Reservation is fulfilled
+    price = Column(Float, nullable=True)
+    # Reservations still 'reserved' at this time are released by the sweeper, never when RESERVATION_TTL is 0
+    expires_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        default=func.now() + timedelta(seconds=RESERVATION_TTL) if RESERVATION_TTL > 0 else None,
+    )
     product = relationship("DbProduct", backref="reservations")
 
+    __table_args__ = (
+        Index(f"ix_{RESERVATION_TABLE}_expires_at_reserved", "expires_at", postgresql_where=status == 'reserved'),
+    )
+
 
 class DbSale(Base):
     __tablename__ = SALE_TABLE
@@ -77,4 +188,38 @@ class DbSale(Base):
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
     quantity = Column(Integer, nullable=False)
     sale_price = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     product = relationship("DbProduct", backref="sales")
+
+    __table_args__ = (
+        # Sales are append-only, so rows are physically ordered by time and a tiny BRIN index covers time ranges
+        Index(f"ix_{SALE_TABLE}_created_at_brin", "created_at", postgresql_using="brin"),
+        Index(f"ix_{SALE_TABLE}_product_id_created_at", "product_id", "created_at"),
+    )
+
+
+class DbSaleDailyRollup(Base):
+    """Per-Product, per-day (UTC) Sales totals maintained together with every Sale."""
+    __tablename__ = SALE_DAILY_ROLLUP_TABLE
+    product_id = Column(Integer, ForeignKey('products.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    sale_count = Column(Integer, nullable=False, default=0)
+
+
+class DbIdempotencyKey(Base):
+    """First response of a mutating request, replayed to retries sending the same Idempotency-Key."""
+    __tablename__ = IDEMPOTENCY_KEY_TABLE
+    key = Column(String(255), primary_key=True)
+    # Hash of the request, a key reused for a different request is rejected
+    fingerprint = Column(String(64), nullable=False)
+    # NULL while the first request is still running
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index(f"ix_{IDEMPOTENCY_KEY_TABLE}_expires_at", "expires_at"),
+    )
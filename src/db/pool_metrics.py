@@ -0,0 +1,61 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..metrics import Histogram
+
+
+class PoolMetrics:
+    """Connection checkout statistics collected by the instrumented pools."""
+
+    def __init__(self):
+        self.wait_time = Histogram()
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def observe_checkout(self, started: float, timed_out: bool = False) -> None:
+        self.wait_time.observe(time.perf_counter() - started)
+        if timed_out:
+            with self._lock:
+                self.timeouts += 1
+
+
+pool_metrics = PoolMetrics()
+
+
+class _CheckoutTimingMixin:
+    """Measure how long each checkout waits for a free connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.observe_checkout(started, timed_out=True)
+            raise
+        pool_metrics.observe_checkout(started)
+        return connection
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool recording checkout wait time."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording checkout wait time."""
+
+
+def get_pool_stats(engine) -> Dict:
+    """Get live statistics of the engine connection pool."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "timeouts": pool_metrics.timeouts,
+        "checkout_wait_seconds": pool_metrics.wait_time.snapshot(),
+    }
@@ -0,0 +1,56 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..metrics import Counter, LabeledHistogram, registry
+
+# Connection.info key holding start times of the statements running on the connection
+QUERY_STARTED = "query_started"
+
+db_queries = registry.register(Counter("db_queries_total", "Database statements executed by all workers."))
+db_query_duration = registry.register(
+    LabeledHistogram("db_query_duration_seconds", "Time spent executing a single database statement.")
+)
+
+
+class QueryStats:
+    """Number of statements and time spent in the database by one request."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Set by the metrics middleware for the duration of a request, statements outside requests are only counted globally
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(QUERY_STARTED, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    _observe_query(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _record_failed_query(exception_context) -> None:
+    if exception_context.connection is not None and exception_context.connection.info.get(QUERY_STARTED):
+        _observe_query(exception_context.connection)
+
+
+def _observe_query(conn) -> None:
+    duration = time.perf_counter() - conn.info[QUERY_STARTED].pop()
+    db_queries.inc()
+    db_query_duration.observe((), duration)
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
@@ -0,0 +1,54 @@
+import functools
+from abc import ABC
+from typing import Callable, Set, Type
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _interface_methods(cls: Type) -> Set[str]:
+    """Collect names of the abstract methods declared by the Abstract*Database interfaces of the class."""
+    return {
+        name
+        for base in cls.__mro__
+        if ABC in base.__bases__
+        for name, attr in vars(base).items()
+        if getattr(attr, "__isabstractmethod__", False)
+    }
+
+
+def _run_on_async_session(method: Callable) -> Callable:
+    """Wrap sync repository method into a coroutine running it on the sync Session behind an AsyncSession."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        async_session = next(value for value in (*args, *kwargs.values()) if isinstance(value, AsyncSession))
+
+        def call(sync_session):
+            def swap(value):
+                return sync_session if value is async_session else value
+
+            return method(self, *map(swap, args), **{key: swap(value) for key, value in kwargs.items()})
+
+        return await async_session.run_sync(call)
+
+    return wrapper
+
+
+def run_on_async_session(cls: Type) -> Type:
+    """
+    Class decorator turning a sync SQLAlchemy repository into an async one.
+
+    Every interface method becomes a coroutine that runs the sync implementation through `AsyncSession.run_sync`,
+    so all statements go through the asyncpg driver without occupying a thread.
+
+    The sync code runs on the event loop thread in a greenlet, not in a worker thread. While it runs, no other
+    request of the worker makes progress, so sync repository code must:
+
+    - load everything it returns inside the call, a lazy load after `run_sync` returns raises `MissingGreenlet`;
+    - never wait on a `threading.Lock` or other blocking primitive, the holder may be another request parked
+      on the same thread waiting for its own I/O, and the whole event loop deadlocks;
+    - avoid CPU heavy work between statements, it stalls all requests of the worker.
+    """
+    for name in _interface_methods(cls):
+        setattr(cls, name, _run_on_async_session(getattr(cls, name)))
+    return cls
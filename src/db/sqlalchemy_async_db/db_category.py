@@ -0,0 +1,7 @@
+from ..sqlalchemy_db.db_category import SqlalchemyCategoryDatabase
+from .async_utils import run_on_async_session
+
+
+@run_on_async_session
+class AsyncSqlalchemyCategoryDatabase(SqlalchemyCategoryDatabase):
+    """Async SQLAlchemy implementation of the AbstractCategoryDatabase running on asyncpg AsyncSession."""
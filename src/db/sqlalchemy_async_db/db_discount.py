@@ -0,0 +1,7 @@
+from ..sqlalchemy_db.db_discount import SqlalchemyDiscountDatabase
+from .async_utils import run_on_async_session
+
+
+@run_on_async_session
+class AsyncSqlalchemyDiscountDatabase(SqlalchemyDiscountDatabase):
+    """Async SQLAlchemy implementation of the AbstractDiscountDatabase running on asyncpg AsyncSession."""
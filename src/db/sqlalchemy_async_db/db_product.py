@@ -0,0 +1,7 @@
+from ..sqlalchemy_db.db_product import SqlalchemyProductDatabase
+from .async_utils import run_on_async_session
+
+
+@run_on_async_session
+class AsyncSqlalchemyProductDatabase(SqlalchemyProductDatabase):
+    """Async SQLAlchemy implementation of the AbstractProductDatabase running on asyncpg AsyncSession."""
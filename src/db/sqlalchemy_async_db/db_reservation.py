@@ -0,0 +1,7 @@
+from ..sqlalchemy_db.db_reservation import SqlalchemyReservationDatabase
+from .async_utils import run_on_async_session
+
+
+@run_on_async_session
+class AsyncSqlalchemyReservationDatabase(SqlalchemyReservationDatabase):
+    """Async SQLAlchemy implementation of the AbstractReservationDatabase running on asyncpg AsyncSession."""
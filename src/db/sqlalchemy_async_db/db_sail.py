@@ -0,0 +1,7 @@
+from ..sqlalchemy_db.db_sail import SqlalchemySaleDatabase
+from .async_utils import run_on_async_session
+
+
+@run_on_async_session
+class AsyncSqlalchemySaleDatabase(SqlalchemySaleDatabase):
+    """Async SQLAlchemy implementation of the AbstractSaleDatabase running on asyncpg AsyncSession."""
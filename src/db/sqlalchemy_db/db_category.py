@@ -1,29 +1,52 @@
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from config import CATEGORY_TREE_DEPTH
 
 from ...enums import FilterField
 from ...request_utils import PaginationParams, apply_pagination, get_object_or_404
 from ...schemas.category_schemes import CategoryCreate, CategoryUpdate
 from ..abstract.db_abstract_category import AbstractCategoryDatabase
+from ..category_tree import category_tree
+from ..entity_cache import category_cache, product_cache
+from ..invalidation import invalidate_on_commit
 from ..models import DbCategory, DbCategoryRelation
 
+# Category schema renders subcategories recursively, load them level by level instead of row by row
+CATEGORY_TREE_LOADER = selectinload(DbCategory.children, recursion_depth=CATEGORY_TREE_DEPTH)
+# Columns the ETag of a rendered Category is computed from, matches `DbCategory.etag_key`
+CATEGORY_VERSION_COLUMNS = (DbCategory.id, DbCategory.version, DbCategory.updated_at)
+
 
 class SqlalchemyCategoryDatabase(AbstractCategoryDatabase):
     """SQLAlchemy implementation of the AbstractCategoryDatabase for managing Categories in the database."""
 
     def get_all_categories(self, db: Session, pagination: PaginationParams) -> List[DbCategory]:
         """Retrieve all categories from the database with pagination."""
-        db_categories = db.query(DbCategory)
-        return apply_pagination(db_categories, pagination)
+        db_categories = db.query(DbCategory).options(CATEGORY_TREE_LOADER)
+        return apply_pagination(db_categories, pagination, keyset=(DbCategory.id,))
+
+    def get_all_categories_versions(self, db: Session, pagination: PaginationParams) -> List[Row]:
+        """Get version columns of the Categories on the same page as `get_all_categories`, without loading them."""
+        return apply_pagination(db.query(*CATEGORY_VERSION_COLUMNS), pagination, keyset=(DbCategory.id,))
+
+    def get_category_versions(self, db: Session, category_id: int) -> List[Row]:
+        """Get version columns of Category by ID without loading it, empty if it doesn't exist."""
+        return db.query(*CATEGORY_VERSION_COLUMNS).filter(DbCategory.id == category_id).all()
 
     def get_category_by_id(self, category_id: int, db: Session) -> DbCategory:
-        """Retrieve a category by its ID."""
-        return get_object_or_404(DbCategory, FilterField.ID, category_id, db)
+        """Retrieve a category by its ID, served from the entity cache when possible."""
+        return category_cache.get_or_load(
+            category_id,
+            lambda: self._load_detached_category(db, category_id),
+            cacheable=lambda db_category: self._is_tree_loaded(db, db_category),
+        )
 
     def get_category_by_name(self, category_name: str, db: Session) -> DbCategory:
         """Retrieve a category by its name."""
-        return get_object_or_404(DbCategory, FilterField.NAME, category_name, db)
+        return get_object_or_404(DbCategory, FilterField.NAME, category_name, db, options=(CATEGORY_TREE_LOADER,))
 
     def update_category(self, db: Session, category_id: int, category_data: CategoryUpdate) -> DbCategory:
         """Update a category's details."""
@@ -32,8 +55,10 @@ class SqlalchemyCategoryDatabase(AbstractCategoryDatabase):
         if db_category:
             for key, value in category_data.dict(exclude_unset=True).items():
                 setattr(db_category, key, value)
+            self._bump_ancestor_versions(db, db_category.parent_id)
+            self._invalidate_caches(db)
             db.commit()
-            db.refresh(db_category)
+            db_category = self._load_category_tree(db, category_id)
 
         return db_category
 
@@ -51,21 +76,65 @@ class SqlalchemyCategoryDatabase(AbstractCategoryDatabase):
         if category.parent_id:
             self._update_category_relations(db, new_category, category.parent_id)
         self._add_self_relation(db, new_category)
+        self._bump_ancestor_versions(db, parent_id)
+        self._invalidate_caches(db)
 
         db.commit()
-        db.refresh(new_category)
-        return new_category
+        return self._load_category_tree(db, new_category.id)
 
     def remove_category(self, db: Session, category_id: int) -> DbCategory:
         """Remove a category by its ID and its relations."""
-        db_category = get_object_or_404(DbCategory, FilterField.ID, category_id, db)
+        db_category = get_object_or_404(DbCategory, FilterField.ID, category_id, db, options=(CATEGORY_TREE_LOADER,))
+        self._bump_ancestor_versions(db, db_category.parent_id)
         self._remove_category_relations(db, category_id)
         db.delete(db_category)
+        self._invalidate_caches(db)
         db.commit()
         return db_category
 
+    def _load_category_tree(self, db: Session, category_id: int) -> DbCategory:
+        """Reload Category together with its Subcategories, so it can be rendered without lazy loads."""
+        return (
+            db.query(DbCategory)
+            .options(CATEGORY_TREE_LOADER)
+            .populate_existing()
+            .filter(DbCategory.id == category_id)
+            .one()
+        )
+
+    def _load_detached_category(self, db: Session, category_id: int) -> DbCategory:
+        """Load Category with its Subcategories and detach it from the session, so it can be shared by the cache."""
+        db_category = get_object_or_404(DbCategory, FilterField.ID, category_id, db, options=(CATEGORY_TREE_LOADER,))
+        db.expunge(db_category)
+        return db_category
+
+    def _is_tree_loaded(self, db: Session, db_category: DbCategory) -> bool:
+        """Check if the whole subtree fits into CATEGORY_TREE_DEPTH, so it renders without lazy loads."""
+        depths = category_tree.get_snapshot(db).get_descendants(db_category.id).values()
+        return max(depths, default=0) < CATEGORY_TREE_DEPTH
+
+    def _invalidate_caches(self, db: Session) -> None:
+        """Evict cached Categories, which render whole subtrees, and Products, whose ETags include Category versions."""
+        invalidate_on_commit(db, category_tree)
+        invalidate_on_commit(db, category_cache)
+        invalidate_on_commit(db, product_cache)
+
+    def _bump_ancestor_versions(self, db: Session, parent_id: Optional[int]) -> None:
+        """Bump version of the parent Category and all its ancestors, as they render the changed subtree."""
+        if not parent_id:
+            return
+        ancestor_ids = select(DbCategoryRelation.ancestor_id).where(DbCategoryRelation.descendant_id == parent_id)
+        db.execute(
+            update(DbCategory).where(DbCategory.id.in_(ancestor_ids)).values(version=DbCategory.version + 1),
+            execution_options={"synchronize_session": False},
+        )
+
     def _update_category_relations(self, db: Session, new_category: DbCategory, parent_id: int) -> None:
-        """Update relations for the newly created category based on its parent."""
+        """
+        Update relations for the newly created category based on its parent.
+
+        Parent's own self-relation yields the direct `parent -> category` relation at depth 1.
+        """
         relations = db.query(DbCategoryRelation).filter_by(descendant_id=parent_id).all()
         for relation in relations:
             new_relation = DbCategoryRelation(
@@ -74,11 +143,6 @@ class SqlalchemyCategoryDatabase(AbstractCategoryDatabase):
                 depth=relation.depth + 1
             )
             db.add(new_relation)
-        db.add(DbCategoryRelation(
-            ancestor_id=parent_id,
-            descendant_id=new_category.id,
-            depth=1
-        ))
 
     def _add_self_relation(self, db: Session, new_category: DbCategory) -> None:
         """Add a self-relation for the newly created category."""
@@ -97,6 +161,5 @@ class SqlalchemyCategoryDatabase(AbstractCategoryDatabase):
 
     def get_category_relations(self, db: Session, category_id: int) -> List[DbCategory]:
         """Retrieve all categories related to a given category (subcategories)."""
-        relations = db.query(DbCategoryRelation).filter(DbCategoryRelation.ancestor_id == category_id).all()
-        related_category_ids = [relation.descendant_id for relation in relations]
+        related_category_ids = category_tree.get_descendants(db, category_id)
         return db.query(DbCategory).filter(DbCategory.id.in_(related_category_ids)).all()
@@ -1,14 +1,20 @@
-from decimal import Decimal
-from typing import List
+from typing import List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import ColumnElement, Select, and_, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import Insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, joinedload
 
-from ...db.models import DbDiscount, DbProduct, DbProductDiscount
+from ...db.models import DbCategory, DbCategoryRelation, DbDiscount, DbProduct, DbProductDiscount
 from ...enums import FilterField
 from ...request_utils import PaginationParams, apply_pagination, get_object_or_404
-from ...schemas.discount_schemes import DiscountCreate, DiscountUpdate
+from ...schemas.discount_schemes import CategoryDiscount, DiscountCreate, DiscountUpdate, as_utc
 from ..abstract.db_abstract_doscount import AbstractDiscountDatabase
+from .pricing import reprice_products
+
+# Fields of a Discount that change effective prices of its Products
+PRICING_FIELDS = {"percentage", "active", "starts_at", "ends_at"}
 
 
 class SqlalchemyDiscountDatabase(AbstractDiscountDatabase):
@@ -16,87 +22,251 @@ class SqlalchemyDiscountDatabase(AbstractDiscountDatabase):
 
     def get_all_discounts(self, db: Session, pagination: PaginationParams) -> List[DbDiscount]:
         """Get all Discounts from the database with pagination support."""
-        db_discounts = db.query(DbDiscount)
-        return apply_pagination(db_discounts, pagination)
+        db_discounts = db.query(DbDiscount).filter(DbDiscount.deleted.is_(False))
+        return apply_pagination(db_discounts, pagination, keyset=(DbDiscount.id,))
 
     def create_discount(self, db: Session, discount: DiscountCreate) -> DbDiscount:
         """Create new Discount in the database."""
         db_discount = DbDiscount(**discount.dict())
         db.add(db_discount)
+        db.flush()
+        self._schedule_reprice(db, DbDiscount.id == db_discount.id)
         db.commit()
         db.refresh(db_discount)
         return db_discount
 
     def get_discount_by_id(self, db: Session, discount_id: int) -> DbDiscount:
         """Get Discount by ID from the database."""
-        return get_object_or_404(DbDiscount, FilterField.ID, discount_id, db)
+        return self._get_discount(db, discount_id)
 
     def update_discount(self, db: Session, discount_id: int, discount_update: DiscountUpdate) -> DbDiscount:
-        """Update existing Discount by ID in the database."""
-        db_discount = get_object_or_404(DbDiscount, FilterField.ID, discount_id, db)
-        for key, value in discount_update.dict(exclude_unset=True).items():
+        """
+        Update existing Discount by ID in the database.
+
+        A change of percentage, activity or window only queues repricing of the Discount's Products,
+        `reprice_discount_batch` recomputes their effective prices in the background.
+        """
+        db_discount = self._get_discount(db, discount_id)
+        changes = discount_update.dict(exclude_unset=True)
+        for key, value in changes.items():
             setattr(db_discount, key, value)
+        starts_at, ends_at = as_utc(db_discount.starts_at), as_utc(db_discount.ends_at)
+        if starts_at and ends_at and ends_at <= starts_at:
+            raise HTTPException(status_code=400, detail="Discount must end after it starts.")
+
+        db.flush()
+        if PRICING_FIELDS.intersection(changes):
+            self._schedule_reprice(db, DbDiscount.id == discount_id)
         db.commit()
         db.refresh(db_discount)
         return db_discount
 
     def delete_discount(self, db: Session, discount_id: int) -> DbDiscount:
-        """Delete existing Discount by ID from the database."""
-        db_discount = get_object_or_404(DbDiscount, FilterField.ID, discount_id, db)
-        db.delete(db_discount)
+        """
+        Delete existing Discount by ID from the database.
+
+        The Discount is only deactivated, marked deleted and queued for repricing here, so deleting a Discount
+        of any size is one short transaction. `reprice_discount_batch` then reprices its Products and unlinks
+        them batch by batch and deletes the Discount row with the last batch.
+        """
+        db_discount = self._get_discount(db, discount_id)
+        db_discount.active = False
+        db_discount.deleted = True
+        db.flush()
+        self._schedule_reprice(db, DbDiscount.id == discount_id)
         db.commit()
+        db.refresh(db_discount)
         return db_discount
 
     def add_discount_to_product(self, db: Session, product_id: int, discount_id: int) -> DbProduct:
-        """Add Discount to Product and update Product price."""
-        try:
-            db.begin()
-            db_product_discount = DbProductDiscount(product_id=product_id, discount_id=discount_id)
-            db.add(db_product_discount)
-            db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
-            db_discount = get_object_or_404(DbDiscount, FilterField.ID, discount_id, db)
-
-            # Convert price and discount percentage to Decimal
-            price = Decimal(db_product.price)
-            percentage = Decimal(db_discount.percentage)
-            # Update the product price based on the discount
-            new_price = price * (Decimal('1.00') - (percentage / Decimal('100.00')))
-            db_product.price = float(new_price)
-
-            db.commit()
-            db.refresh(db_product)
-            db.refresh(db_product_discount)
-            return db_product
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=500, detail=f"Failed to add Discount: {str(e)}")
+        """Link Discount to Product and recompute its effective price, linking twice has no effect."""
+        get_object_or_404(DbProduct, FilterField.ID, product_id, db)
+        self._get_discount(db, discount_id)
+        db.execute(self._link(pg_insert(DbProductDiscount).values(product_id=product_id, discount_id=discount_id)))
+        reprice_products(db, [product_id])
+        db.commit()
+        return self._load_product(db, product_id)
 
     def remove_discount_from_product(self, db: Session, product_id: int, discount_id: int) -> DbProduct:
-        """Remove Discount from Product and update Product price."""
-        try:
-            db_product_discount = db.query(DbProductDiscount).filter(
-                DbProductDiscount.product_id == product_id,
-                DbProductDiscount.discount_id == discount_id
-            ).first()
-
-            if not db_product_discount:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Product Discount with 'id': {product_id} and 'discount_id': {discount_id} not found"
+        """Unlink Discount from Product and recompute its effective price."""
+        unlinked = db.execute(
+            delete(DbProductDiscount)
+            .where(DbProductDiscount.product_id == product_id, DbProductDiscount.discount_id == discount_id)
+            .returning(DbProductDiscount.id)
+        ).first()
+        if unlinked is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Product Discount with 'id': {product_id} and 'discount_id': {discount_id} not found"
+            )
+
+        reprice_products(db, [product_id])
+        db.commit()
+        return self._load_product(db, product_id)
+
+    def add_discount_to_category(self, db: Session, category_id: int, discount_id: int) -> CategoryDiscount:
+        """
+        Link Discount to all Products of Category and its Subcategories and queue repricing of its Products.
+
+        Links are created with one INSERT ... SELECT over the Category closure table, Products already
+        linked are skipped. It locks no Product rows, `reprice_discount_batch` recomputes effective prices
+        in the background, so linking a Category of any size never holds the Products of the subtree.
+        """
+        get_object_or_404(DbCategory, FilterField.ID, category_id, db)
+        self._get_discount(db, discount_id)
+        linked = db.execute(
+            self._link(
+                pg_insert(DbProductDiscount).from_select(
+                    ["product_id", "discount_id"],
+                    self._subtree_product_ids(category_id).add_columns(literal(discount_id)),
+                )
+            )
+        )
+        self._schedule_reprice(db, DbDiscount.id == discount_id)
+        db.commit()
+        return CategoryDiscount(discount_id=discount_id, category_id=category_id, affected_products=linked.rowcount)
+
+    def remove_discount_from_category(self, db: Session, category_id: int, discount_id: int) -> CategoryDiscount:
+        """
+        Unlink Discount from all Products of Category and its Subcategories and queue repricing of its Products.
+
+        Links are only marked removed with one UPDATE, `reprice_discount_batch` then reprices their Products
+        and deletes the links batch by batch, like it does for a deleted Discount.
+        """
+        get_object_or_404(DbCategory, FilterField.ID, category_id, db)
+        self._get_discount(db, discount_id)
+        unlinked = db.execute(
+            update(DbProductDiscount)
+            .where(
+                DbProductDiscount.discount_id == discount_id,
+                DbProductDiscount.removed.is_(False),
+                DbProductDiscount.product_id.in_(self._subtree_product_ids(category_id)),
+            )
+            .values(removed=True)
+            .execution_options(synchronize_session=False)
+        )
+        self._schedule_reprice(db, DbDiscount.id == discount_id)
+        db.commit()
+        return CategoryDiscount(discount_id=discount_id, category_id=category_id, affected_products=unlinked.rowcount)
+
+    def apply_discount_schedule(self, db: Session) -> List[int]:
+        """
+        Switch Discounts whose window started or ended on or off and queue repricing of their Products.
+
+        Returns IDs of the switched Discounts. Safe to run from several workers at once, a Discount
+        switched by one of them no longer matches when the others get to its row.
+        """
+        discount_ids = self._schedule_reprice(db, DbDiscount.in_effect.is_distinct_from(self._in_effect_now()))
+        db.commit()
+        return discount_ids
+
+    def reprice_discount_batch(self, db: Session, batch_size: int) -> Optional[int]:
+        """
+        Recompute effective prices of the next `batch_size` Products of a Discount queued for repricing.
+
+        Each batch is its own transaction, so repricing a Discount of any size never locks more than
+        `batch_size` Products at once. The Discount row is claimed with FOR UPDATE SKIP LOCKED, so
+        concurrent workers reprice different Discounts instead of waiting for each other.
+        Products of a deleted Discount are unlinked with their batch, and the Discount row with the last one.
+        Links removed from a Category are deleted with their batch.
+        Returns number of processed Products, or None when no Discount is queued.
+        """
+        db_discount = db.scalars(
+            select(DbDiscount)
+            .where(DbDiscount.reprice_after_product_id.isnot(None))
+            .order_by(DbDiscount.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            # The locked row is the truth, not a copy the session may still hold from before it was queued
+            .execution_options(populate_existing=True)
+        ).first()
+        if db_discount is None:
+            return None
+
+        product_ids = db.scalars(
+            self._linked_product_ids(db_discount.id)
+            .where(DbProductDiscount.product_id > db_discount.reprice_after_product_id)
+            .order_by(DbProductDiscount.product_id)
+            .limit(batch_size)
+        ).all()
+        last_batch = len(product_ids) < batch_size
+        repriced_ids = product_ids
+        if db_discount.deleted:
+            unlinked = delete(DbProductDiscount).where(DbProductDiscount.discount_id == db_discount.id)
+            if not last_batch:
+                unlinked = unlinked.where(DbProductDiscount.product_id.in_(product_ids))
+            # The last batch also catches links added while the Discount was being deleted
+            repriced_ids = db.scalars(unlinked.returning(DbProductDiscount.product_id)).all()
+        else:
+            db.execute(
+                delete(DbProductDiscount).where(
+                    DbProductDiscount.discount_id == db_discount.id,
+                    DbProductDiscount.product_id.in_(product_ids),
+                    DbProductDiscount.removed.is_(True),
                 )
+            )
+        reprice_products(db, repriced_ids)
+        if db_discount.deleted and last_batch:
+            db.delete(db_discount)
+        else:
+            db_discount.reprice_after_product_id = None if last_batch else product_ids[-1]
+        db.commit()
+        return len(repriced_ids)
+
+    def _get_discount(self, db: Session, discount_id: int) -> DbDiscount:
+        """Get Discount by ID or raise 404, Discounts being deleted in the background count as missing."""
+        db_discount = get_object_or_404(DbDiscount, FilterField.ID, discount_id, db)
+        if db_discount.deleted:
+            raise HTTPException(status_code=404, detail=f"DbDiscount with 'id': '{discount_id}' not found")
+        return db_discount
+
+    def _schedule_reprice(self, db: Session, *criteria: ColumnElement) -> List[int]:
+        """Set whether matching Discounts are in effect now and queue repricing of all their Products."""
+        return db.scalars(
+            update(DbDiscount)
+            .where(*criteria)
+            .values(in_effect=self._in_effect_now(), reprice_after_product_id=0)
+            .returning(DbDiscount.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    @staticmethod
+    def _in_effect_now() -> ColumnElement:
+        """Whether Discount is active and the current time is inside its window."""
+        now = func.now()
+        return and_(
+            DbDiscount.active.is_(True),
+            or_(DbDiscount.starts_at.is_(None), DbDiscount.starts_at <= now),
+            or_(DbDiscount.ends_at.is_(None), DbDiscount.ends_at > now),
+        )
+
+    @staticmethod
+    def _link(insert_links: Insert) -> Insert:
+        """Skip Products already linked to the Discount, links waiting for removal are kept instead."""
+        return insert_links.on_conflict_do_update(
+            index_elements=[DbProductDiscount.product_id, DbProductDiscount.discount_id],
+            set_={"removed": False},
+            where=DbProductDiscount.removed.is_(True),
+        )
+
+    def _subtree_product_ids(self, category_id: int) -> Select:
+        """Select IDs of Products of Category and all its Subcategories."""
+        return (
+            select(DbProduct.id)
+            .join(DbCategoryRelation, DbCategoryRelation.descendant_id == DbProduct.category_id)
+            .where(DbCategoryRelation.ancestor_id == category_id)
+        )
+
+    def _linked_product_ids(self, discount_id: int) -> Select:
+        """Select IDs of Products the Discount is linked to."""
+        return select(DbProductDiscount.product_id).where(DbProductDiscount.discount_id == discount_id)
 
-            db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
-            # Convert price and percentage to Decimal
-            price = Decimal(db_product.price)
-            percentage = Decimal(db_product_discount.discount.percentage)
-            # Calculate the original price before discount
-            original_price = price / (Decimal('1.00') - percentage / Decimal('100.00'))
-            db_product.price = float(original_price)
-
-            db.delete(db_product_discount)
-            db.commit()
-            db.refresh(db_product)
-            return db_product
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=500, detail=f"Failed to remove Discount: {str(e)}")
+    def _load_product(self, db: Session, product_id: int) -> DbProduct:
+        """Reload Product with its Category after its effective price was recomputed in the database."""
+        return (
+            db.query(DbProduct)
+            .options(joinedload(DbProduct.category))
+            .populate_existing()
+            .filter(DbProduct.id == product_id)
+            .one()
+        )
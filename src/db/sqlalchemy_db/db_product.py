@@ -1,12 +1,27 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, literal, or_, select
+from sqlalchemy.orm import Session, joinedload
 
-from ...db.models import DbCategory, DbCategoryRelation, DbProduct
+from ...db.models import DbCategory, DbCategoryRelation, DbProduct, DbProductDiscount
 from ...enums import FilterField
 from ...request_utils import PaginationParams, apply_pagination, get_object_or_404
 from ...schemas.product_schemes import ProductCreate, ProductUpdate
 from ..abstract.db_abstract_product import AbstractProductDatabase
+from ..entity_cache import product_cache
+from ..invalidation import invalidate_on_commit
+from .pricing import reprice_products
+
+# Product schema renders `category_name`, join the Category instead of lazy loading it for every row
+PRODUCT_CATEGORY_LOADER = joinedload(DbProduct.category)
+# Columns the ETag of a rendered Product is computed from, matches `DbProduct.etag_key`
+PRODUCT_VERSION_COLUMNS = (
+    DbProduct.id,
+    DbProduct.version,
+    DbProduct.updated_at,
+    DbCategory.version,
+    DbCategory.updated_at,
+)
 
 
 class SqlalchemyProductDatabase(AbstractProductDatabase):
@@ -14,8 +29,34 @@ class SqlalchemyProductDatabase(AbstractProductDatabase):
 
     def get_all_products(self, db: Session, pagination: PaginationParams) -> List[DbProduct]:
         """Get all Products from the database with pagination support."""
-        db_products = db.query(DbProduct).filter(DbProduct.stock > 0)
-        return apply_pagination(db_products, pagination)
+        db_products = db.query(DbProduct).options(PRODUCT_CATEGORY_LOADER).filter(DbProduct.stock > 0)
+        return apply_pagination(db_products, pagination, keyset=(DbProduct.id,))
+
+    def get_all_products_versions(self, db: Session, pagination: PaginationParams) -> List[Row]:
+        """Get version columns of the Products on the same page as `get_all_products`, without loading them."""
+        versions = (
+            db.query(*PRODUCT_VERSION_COLUMNS)
+            .outerjoin(DbCategory, DbCategory.id == DbProduct.category_id)
+            .filter(DbProduct.stock > 0)
+        )
+        return apply_pagination(versions, pagination, keyset=(DbProduct.id,))
+
+    def get_products_export(self, db: Session) -> Select:
+        """Build statement selecting plain catalog columns of all Products for streaming export."""
+        return (
+            select(
+                DbProduct.id,
+                DbProduct.name,
+                DbProduct.category_id,
+                DbCategory.name.label("category_name"),
+                DbProduct.price,
+                DbProduct.effective_price,
+                DbProduct.stock,
+                DbProduct.reserved_stock,
+            )
+            .join(DbCategory, DbCategory.id == DbProduct.category_id)
+            .order_by(DbProduct.id)
+        )
 
     def create_product(self, db: Session, product: ProductCreate) -> DbProduct:
         """Create new Product in the database."""
@@ -27,19 +68,62 @@ class SqlalchemyProductDatabase(AbstractProductDatabase):
         return db_product
 
     def get_product_by_id(self, db: Session, product_id: int) -> DbProduct:
-        """Get Product by ID from the database."""
-        return get_object_or_404(DbProduct, FilterField.ID, product_id, db)
+        """Get Product by ID, served from the entity cache when possible."""
+        return product_cache.get_or_load(product_id, lambda: self._load_product(db, product_id))
+
+    def get_product_versions(self, db: Session, product_id: int) -> List[Row]:
+        """Get version columns of Product by ID without loading it, empty if it doesn't exist."""
+        return (
+            db.query(*PRODUCT_VERSION_COLUMNS)
+            .outerjoin(DbCategory, DbCategory.id == DbProduct.category_id)
+            .filter(DbProduct.id == product_id)
+            .all()
+        )
 
     def get_product_by_name(self, db: Session, product_name: str) -> DbProduct:
         """Get Product by name from the database."""
-        return get_object_or_404(DbProduct, FilterField.NAME, product_name, db)
+        return get_object_or_404(DbProduct, FilterField.NAME, product_name, db, options=(PRODUCT_CATEGORY_LOADER,))
 
     def get_products_by_category(self, db: Session, category_id: int, pagination: PaginationParams) -> List[DbProduct]:
         """Get all Products in specific Category and its Subcategories."""
-        all_categories = self._get_all_subcategories(db, category_id)
-        all_categories.append(category_id)
-        db_products = db.query(DbProduct).filter(DbProduct.category_id.in_(all_categories), DbProduct.stock > 0)
-        return apply_pagination(db_products, pagination)
+        db_products = (
+            db.query(DbProduct)
+            .options(PRODUCT_CATEGORY_LOADER)
+            .join(DbCategoryRelation, DbCategoryRelation.descendant_id == DbProduct.category_id)
+            .filter(DbCategoryRelation.ancestor_id == category_id, DbProduct.stock > 0)
+        )
+        return apply_pagination(db_products, pagination, keyset=(DbProduct.id,))
+
+    def search_products(
+            self,
+            db: Session,
+            query: str,
+            pagination: PaginationParams,
+            category_id: Optional[int] = None,
+            in_stock: bool = False,
+    ) -> List[DbProduct]:
+        """
+        Search Products by name prefix or typo-tolerant trigram match, ordered by name.
+
+        Both conditions are served by the trigram index on `name`, results can be narrowed down
+        to a Category subtree and to Products in stock.
+        """
+        prefix = query.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+        db_products = (
+            db.query(DbProduct)
+            .options(PRODUCT_CATEGORY_LOADER)
+            .filter(or_(DbProduct.name.ilike(prefix, escape="/"), literal(query).op("<%")(DbProduct.name)))
+        )
+        if category_id:
+            get_object_or_404(DbCategory, FilterField.ID, category_id, db)
+            db_products = db_products.join(
+                DbCategoryRelation, DbCategoryRelation.descendant_id == DbProduct.category_id
+            ).filter(DbCategoryRelation.ancestor_id == category_id)
+
+        if in_stock:
+            db_products = db_products.filter(DbProduct.stock > 0)
+
+        return apply_pagination(db_products, pagination, keyset=(DbProduct.name, DbProduct.id))
 
     def update_product(self, db: Session, product_id: int, product_data: ProductUpdate) -> DbProduct:
         """Update Product by ID in the database."""
@@ -47,14 +131,18 @@ class SqlalchemyProductDatabase(AbstractProductDatabase):
         get_object_or_404(DbCategory, FilterField.ID, product_data.category_id, db)
         for key, value in product_data.dict(exclude_unset=True).items():
             setattr(db_product, key, value)
+        invalidate_on_commit(db, product_cache, [product_id])
         db.commit()
         db.refresh(db_product)
         return db_product
 
     def update_product_price(self, db: Session, product_id: int, new_price: float) -> DbProduct:
-        """Update price of Product by ID in database."""
+        """Update base price of Product by ID in database and recompute its effective price."""
         db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
         db_product.price = new_price
+        db.flush()
+        reprice_products(db, [product_id])
+        invalidate_on_commit(db, product_cache, [product_id])
         db.commit()
         db.refresh(db_product)
         return db_product
@@ -63,11 +151,14 @@ class SqlalchemyProductDatabase(AbstractProductDatabase):
         """Remove Product by ID from the database."""
         db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
 
+        db.query(DbProductDiscount).filter(DbProductDiscount.product_id == product_id).delete(synchronize_session=False)
         db.delete(db_product)
+        invalidate_on_commit(db, product_cache, [product_id])
         db.commit()
         return {'message': "Product deleted successfully"}
 
-    def _get_all_subcategories(self, db: Session, category_id: int) -> List[int]:
-        """Get all Subcategories for given Category ID."""
-        subcategories = db.query(DbCategoryRelation).filter(DbCategoryRelation.ancestor_id == category_id).all()
-        return [relation.descendant_id for relation in subcategories]
+    def _load_product(self, db: Session, product_id: int) -> DbProduct:
+        """Load Product with its Category and detach it from the session, so it can be shared by the cache."""
+        db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db, options=(PRODUCT_CATEGORY_LOADER,))
+        db.expunge(db_product)
+        return db_product
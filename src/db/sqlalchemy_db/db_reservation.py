@@ -1,12 +1,24 @@
 from typing import Dict, List
 
 from fastapi import HTTPException
+from sqlalchemy import func, insert, literal, select, update
 from sqlalchemy.orm import Session
 
 from ...enums import FilterField, ReservationStatus
 from ...request_utils import PaginationParams, apply_pagination, get_object_or_404
+from ...schemas.reservation_schemes import ReservationItem
 from ..abstract.db_abstract_reservation import AbstractReservationDatabase
-from ..models import DbProduct, DbReservation
+from ..entity_cache import product_cache
+from ..invalidation import invalidate_on_commit
+from ..models import DbProduct, DbReservation, DbSale
+from .fulfilment import fulfil_reservations
+from .stock_utils import (
+    decrement_stock,
+    decrement_stock_bulk,
+    merge_quantities,
+    raise_stock_error,
+    release_reserved_stock,
+)
 
 
 class SqlalchemyReservationDatabase(AbstractReservationDatabase):
@@ -15,40 +27,114 @@ class SqlalchemyReservationDatabase(AbstractReservationDatabase):
     def get_reservations(self, db: Session, pagination: PaginationParams) -> List[DbReservation]:
         """Get all Reservations from the database."""
         db_reservations = db.query(DbReservation)
-        return apply_pagination(db_reservations, pagination)
+        return apply_pagination(db_reservations, pagination, keyset=(DbReservation.id,))
 
     def get_active_reservations(self, db: Session, pagination: PaginationParams) -> List[DbReservation]:
         """Get active Reservations from the database."""
         db_reservations = db.query(DbReservation).filter(DbReservation.status == ReservationStatus.RESERVED.value)
-        return apply_pagination(db_reservations, pagination)
+        return apply_pagination(db_reservations, pagination, keyset=(DbReservation.id,))
 
     def get_reservation_by_id(self, db: Session, reservation_id: int) -> DbReservation:
         """Get Reservation by ID from the database."""
         return get_object_or_404(DbReservation, FilterField.ID, reservation_id, db)
 
     def reserve_product(self, db: Session, product_id: int, quantity: int) -> DbReservation:
-        """Reserve Product by ID in the database."""
-        db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
-        if db_product.stock < quantity:
-            raise HTTPException(status_code=400, detail=f"Not enough stock, {db_product.stock} units remain.")
-        db_product.stock -= quantity
-        db_product.reserved_stock += quantity
-
-        db_reservation = DbReservation(product_id=product_id, quantity=quantity)
-        db.add(db_reservation)
+        """Reserve Product by ID in the database, moving stock to reserved in the same statement."""
+        reserved = decrement_stock(product_id, quantity, reserve=True)
+        # Scalar column defaults aren't applied to INSERT ... SELECT, the status is selected explicitly
+        db_reservation = db.scalars(
+            insert(DbReservation)
+            .from_select(
+                ["product_id", "quantity", "price", "status"],
+                select(reserved.c.id, literal(quantity), reserved.c.price, literal(ReservationStatus.RESERVED.value)),
+            )
+            .returning(DbReservation)
+        ).first()
+        if db_reservation is None:
+            raise_stock_error(db, product_id)
+
+        invalidate_on_commit(db, product_cache, [product_id], coalesce=True)
         db.commit()
-        db.refresh(db_reservation)
         return db_reservation
 
+    def reserve_products(self, db: Session, items: List[ReservationItem]) -> List[DbReservation]:
+        """Reserve several Products in one transaction, all or nothing."""
+        quantities = merge_quantities(items)
+        products = decrement_stock_bulk(db, quantities, reserve=True)
+        db_reservations = db.scalars(
+            insert(DbReservation).returning(DbReservation, sort_by_parameter_order=True),
+            [
+                {"product_id": item.product_id, "quantity": item.quantity, "price": products[item.product_id].price}
+                for item in items
+            ],
+        ).all()
+        invalidate_on_commit(db, product_cache, list(quantities), coalesce=True)
+        db.commit()
+        return db_reservations
+
     def cancel_reservation(self, db: Session, reservation_id: int) -> Dict:
-        """Cancel Reservation by ID in the database."""
-        db_reservation = get_object_or_404(DbReservation, FilterField.ID, reservation_id, db)
-        if db_reservation.status != ReservationStatus.RESERVED.value:
+        """Cancel Reservation by ID in the database and return its quantity to the Product stock."""
+        cancelled = db.execute(
+            update(DbReservation)
+            .where(DbReservation.id == reservation_id, DbReservation.status == ReservationStatus.RESERVED.value)
+            .values(status=ReservationStatus.CANCELLED.value)
+            .returning(DbReservation.product_id, DbReservation.quantity)
+        ).first()
+        if cancelled is None:
             raise HTTPException(status_code=404, detail=f"Reservation with '{reservation_id}' not found or 'canceled'")
 
-        db_product = db.query(DbProduct).filter(DbProduct.id == db_reservation.product_id).first()
-        db_product.stock += db_reservation.quantity
-        db_product.reserved_stock -= db_reservation.quantity
-        db_reservation.status = ReservationStatus.CANCELLED.value
+        db.execute(
+            update(DbProduct)
+            .where(DbProduct.id == cancelled.product_id)
+            .values(
+                stock=DbProduct.stock + cancelled.quantity,
+                reserved_stock=DbProduct.reserved_stock - cancelled.quantity,
+            )
+        )
+        invalidate_on_commit(db, product_cache, [cancelled.product_id], coalesce=True)
+        db.commit()
+        return {"message": f"Reservation with 'id': '{reservation_id}' cancelled successfully."}
+
+    def fulfil_reservation(self, db: Session, reservation_id: int) -> DbSale:
+        """Sell reserved stock of Reservation by ID at its locked-in price and mark it fulfilled."""
+        db_sale = fulfil_reservations(db, [reservation_id])[0]
+        db.commit()
+        return db_sale
+
+    def fulfil_reservations(self, db: Session, reservation_ids: List[int]) -> List[DbSale]:
+        """Fulfil several Reservations, e.g. of a whole order, in one transaction, all or nothing."""
+        db_sales = fulfil_reservations(db, reservation_ids)
+        db.commit()
+        return db_sales
+
+    def release_expired_reservations(self, db: Session, batch_size: int) -> int:
+        """
+        Expire at most `batch_size` overdue Reservations and return their quantities to the Product stock.
+
+        Reservations are claimed with FOR UPDATE SKIP LOCKED, so concurrent sweepers release disjoint batches
+        and skip Reservations being cancelled. The status check makes every Reservation released only once.
+        Returns number of released Reservations.
+        """
+        overdue = (
+            select(DbReservation.id)
+            .where(DbReservation.status == ReservationStatus.RESERVED.value, DbReservation.expires_at <= func.now())
+            .order_by(DbReservation.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .cte("overdue")
+        )
+        released = db.execute(
+            update(DbReservation)
+            .where(DbReservation.id == overdue.c.id)
+            .values(status=ReservationStatus.EXPIRED.value)
+            .returning(DbReservation.product_id, DbReservation.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not released:
+            return 0
+
+        quantities = merge_quantities(released)
+        release_reserved_stock(db, quantities)
+        invalidate_on_commit(db, product_cache, list(quantities), coalesce=True)
         db.commit()
-        return {"message": f"Reservation with 'id': '{db_reservation.id}' cancelled successfully."}
+        return len(released)
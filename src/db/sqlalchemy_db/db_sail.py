@@ -1,47 +1,213 @@
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, delete, func, insert, literal, select
+from sqlalchemy.orm import Query, Session, aliased
 
-from ...db.models import DbCategory, DbProduct, DbSale
-from ...enums import FilterField
+from ...db.models import DbCategory, DbCategoryRelation, DbProduct, DbSale, DbSaleDailyRollup
+from ...enums import FilterField, SalesReportGroupBy
 from ...request_utils import PaginationParams, apply_pagination, get_object_or_404
+from ...schemas.sale_schemes import SaleItem
 from ..abstract.db_abstract_sale import AbstractSaleDatabase
+from ..entity_cache import product_cache
+from ..invalidation import invalidate_on_commit
+from .fulfilment import fulfil_reservations
+from .sales_rollup import is_whole_day, rollup_sales, utc_day
+from .stock_utils import decrement_stock, decrement_stock_bulk, merge_quantities, raise_stock_error
 
 
 class SqlalchemySaleDatabase(AbstractSaleDatabase):
     """SQLAlchemy implementation of the AbstractSaleDatabase for managing Sales in the database."""
 
     def sell_product(self, db: Session, product_id: int, quantity: int) -> DbSale:
-        """Sell Product, decrease stock and create Sale record in the database."""
-        db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
-        if not db_product or db_product.stock < quantity:
-            raise HTTPException(status_code=400, detail="Not enough stock")
+        """Sell Product, decrease stock, create Sale record and roll it up in the database with a single statement."""
+        sold = decrement_stock(product_id, quantity)
+        sale = (
+            insert(DbSale)
+            .from_select(["product_id", "quantity", "sale_price"], select(sold.c.id, literal(quantity), sold.c.price))
+            .returning(*DbSale.__table__.c)
+            .cte("inserted_sale")
+        )
+        db_sale = db.scalars(select(aliased(DbSale, sale)).add_cte(rollup_sales(sale).cte("sale_rollup"))).first()
+        if db_sale is None:
+            raise_stock_error(db, product_id)
 
-        db_product.stock -= quantity
-        sale_price = db_product.price
+        invalidate_on_commit(db, product_cache, [product_id], coalesce=True)
+        db.commit()
+        return db_sale
 
-        db_sale = DbSale(product_id=product_id, quantity=quantity, sale_price=sale_price)
-        db.add(db_sale)
+    def sell_products(self, db: Session, items: List[SaleItem]) -> List[DbSale]:
+        """Sell several Products in one transaction with set-based stock updates and a single multi-row insert."""
+        quantities = merge_quantities(items)
+        products = decrement_stock_bulk(db, quantities)
+        sales = [
+            {"product_id": item.product_id, "quantity": item.quantity, "sale_price": products[item.product_id].price}
+            for item in items
+        ]
+        sale = insert(DbSale).values(sales).returning(*DbSale.__table__.c).cte("inserted_sales")
+        db_sales = db.scalars(
+            select(aliased(DbSale, sale)).add_cte(rollup_sales(sale).cte("sales_rollup")).order_by(sale.c.id)
+        ).all()
+        invalidate_on_commit(db, product_cache, list(quantities), coalesce=True)
+        db.commit()
+        return db_sales
+
+    def fulfil_reservation(self, db: Session, reservation_id: int) -> DbSale:
+        """Sell reserved stock of Reservation by ID at its locked-in price and mark it fulfilled."""
+        db_sale = fulfil_reservations(db, [reservation_id])[0]
         db.commit()
-        db.refresh(db_sale)
         return db_sale
 
+    def fulfil_reservations(self, db: Session, reservation_ids: List[int]) -> List[DbSale]:
+        """Fulfil several Reservations, e.g. of a whole order, in one transaction, all or nothing."""
+        db_sales = fulfil_reservations(db, reservation_ids)
+        db.commit()
+        return db_sales
+
     def get_sales_report(
             self,
             db: Session,
             pagination: PaginationParams,
             category_id: Optional[int] = None,
             product_id: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
     ) -> List[DbSale]:
-        """Get Sales report, optionally filtered by Category or Product."""
-        query = db.query(DbSale).join(DbProduct)
+        """Get Sales report, optionally filtered by Category subtree, Product or time range."""
+        query = self._filter_sales(db, db.query(DbSale), category_id, product_id, date_from, date_to)
+        return apply_pagination(query, pagination, keyset=(DbSale.id,))
+
+    def get_sales_export(
+            self,
+            db: Session,
+            category_id: Optional[int] = None,
+            product_id: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+    ) -> Select:
+        """Build statement selecting plain Sale columns for streaming export, filtered like the Sales report."""
+        query = self._filter_sales(db, db.query(DbSale), category_id, product_id, date_from, date_to)
+        return (
+            query.with_entities(DbSale.id, DbSale.product_id, DbSale.quantity, DbSale.sale_price, DbSale.created_at)
+            .order_by(DbSale.id)
+            .statement
+        )
+
+    def get_sales_summary(
+            self,
+            db: Session,
+            group_by: SalesReportGroupBy,
+            category_id: Optional[int] = None,
+            product_id: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+    ) -> List[Row]:
+        """
+        Aggregate quantity, revenue and number of Sales in the database.
+
+        Rows are grouped by Product, by Category or by Category subtree, where every Category totals
+        the Sales of all its Subcategories. Reports over whole UTC days are read from the daily rollup,
+        other time ranges aggregate raw Sales.
+        """
+        if is_whole_day(date_from) and is_whole_day(date_to):
+            source = DbSaleDailyRollup
+            totals = (
+                func.sum(DbSaleDailyRollup.quantity),
+                func.sum(DbSaleDailyRollup.revenue),
+                func.sum(DbSaleDailyRollup.sale_count),
+            )
+        else:
+            source = DbSale
+            totals = (
+                func.sum(DbSale.quantity),
+                func.sum(DbSale.quantity * DbSale.sale_price),
+                func.count(DbSale.id),
+            )
+
+        query = db.query(source)
+        if group_by != SalesReportGroupBy.PRODUCT or category_id:
+            query = query.join(DbProduct, DbProduct.id == source.product_id)
+
+        category_column = DbProduct.category_id
+        if group_by == SalesReportGroupBy.PRODUCT:
+            group_column = source.product_id
+        elif group_by == SalesReportGroupBy.CATEGORY:
+            group_column = DbProduct.category_id
+        else:
+            tree = aliased(DbCategoryRelation)
+            query = query.join(tree, tree.descendant_id == DbProduct.category_id)
+            group_column = category_column = tree.ancestor_id
+
         if category_id:
-            get_object_or_404(DbCategory, FilterField.ID, category_id, db)
-            query = query.filter(DbProduct.category_id == category_id)
+            query = self._filter_by_category_tree(db, query, category_id, category_column)
 
         if product_id:
             get_object_or_404(DbProduct, FilterField.ID, product_id, db)
-            query = query.filter(DbProduct.id == product_id)
+            query = query.filter(source.product_id == product_id)
+
+        if source is DbSaleDailyRollup:
+            query = self._filter_by_days(query, date_from, date_to)
+        else:
+            query = self._filter_by_period(query, date_from, date_to)
+
+        quantity, revenue, sale_count = totals
+        return (
+            query.with_entities(
+                group_column.label("group_id"),
+                quantity.label("quantity"),
+                revenue.label("revenue"),
+                sale_count.label("sale_count"),
+            )
+            .group_by(group_column)
+            .order_by(group_column)
+            .all()
+        )
+
+    def rebuild_sales_rollup(self, db: Session) -> int:
+        """Recompute the daily Sales rollup from all Sales, returns number of rollup rows."""
+        db.execute(delete(DbSaleDailyRollup))
+        db.execute(rollup_sales(DbSale.__table__))
+        db.commit()
+        return db.query(DbSaleDailyRollup).count()
+
+    def _filter_sales(
+            self,
+            db: Session,
+            query: Query,
+            category_id: Optional[int],
+            product_id: Optional[int],
+            date_from: Optional[datetime],
+            date_to: Optional[datetime],
+    ) -> Query:
+        """Apply Sales report filters, checking that the given Category and Product exist."""
+        if category_id:
+            query = query.join(DbProduct, DbProduct.id == DbSale.product_id)
+            query = self._filter_by_category_tree(db, query, category_id, DbProduct.category_id)
+
+        if product_id:
+            get_object_or_404(DbProduct, FilterField.ID, product_id, db)
+            query = query.filter(DbSale.product_id == product_id)
+
+        return self._filter_by_period(query, date_from, date_to)
+
+    def _filter_by_category_tree(self, db: Session, query: Query, category_id: int, category_column) -> Query:
+        """Keep only rows whose `category_column` is the given Category or one of its Subcategories."""
+        get_object_or_404(DbCategory, FilterField.ID, category_id, db)
+        subtree = aliased(DbCategoryRelation)
+        return query.join(subtree, subtree.descendant_id == category_column).filter(subtree.ancestor_id == category_id)
+
+    def _filter_by_period(self, query: Query, date_from: Optional[datetime], date_to: Optional[datetime]) -> Query:
+        """Keep only Sales created in `[date_from, date_to)`."""
+        if date_from:
+            query = query.filter(DbSale.created_at >= date_from)
+        if date_to:
+            query = query.filter(DbSale.created_at < date_to)
+        return query
 
-        return apply_pagination(query, pagination)
+    def _filter_by_days(self, query: Query, date_from: Optional[datetime], date_to: Optional[datetime]) -> Query:
+        """Keep only rollup rows of UTC days in `[date_from, date_to)`."""
+        if date_from:
+            query = query.filter(DbSaleDailyRollup.day >= utc_day(date_from))
+        if date_to:
+            query = query.filter(DbSaleDailyRollup.day < utc_day(date_to))
+        return query
@@ -0,0 +1,51 @@
+from typing import Iterable, List
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session, aliased
+
+from ...enums import ReservationStatus
+from ..entity_cache import product_cache
+from ..invalidation import invalidate_on_commit
+from ..models import DbReservation, DbSale
+from .sales_rollup import rollup_sales
+from .stock_utils import merge_quantities, release_reserved_stock
+
+
+def fulfil_reservations(db: Session, reservation_ids: Iterable[int]) -> List[DbSale]:
+    """
+    Turn active Reservations into Sales all-or-nothing, without returning their stock to the store in between.
+
+    Reservations are marked fulfilled, their quantities leave `reserved_stock` with one set-based update
+    and the Sales are inserted and rolled up with a single statement. Every Sale is priced at the price
+    locked in by its Reservation, or at the current effective price for Reservations made before prices
+    were locked in. Raises 404 if any Reservation doesn't exist or isn't active. Doesn't commit.
+    """
+    reservation_ids = sorted(set(reservation_ids))
+    fulfilled = db.execute(
+        update(DbReservation)
+        .where(DbReservation.id.in_(reservation_ids), DbReservation.status == ReservationStatus.RESERVED.value)
+        .values(status=ReservationStatus.FULFILLED.value)
+        .returning(DbReservation.id, DbReservation.product_id, DbReservation.quantity, DbReservation.price)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if len(fulfilled) < len(reservation_ids):
+        missing = sorted(set(reservation_ids) - {row.id for row in fulfilled})
+        raise HTTPException(status_code=404, detail=f"Reservations with 'id': {missing} not found or not 'reserved'")
+
+    quantities = merge_quantities(fulfilled)
+    products = release_reserved_stock(db, quantities, restock=False)
+    sales = [
+        {
+            "product_id": row.product_id,
+            "quantity": row.quantity,
+            "sale_price": row.price if row.price is not None else products[row.product_id].price,
+        }
+        for row in sorted(fulfilled, key=lambda row: row.id)
+    ]
+    sale = insert(DbSale).values(sales).returning(*DbSale.__table__.c).cte("inserted_sales")
+    db_sales = db.scalars(
+        select(aliased(DbSale, sale)).add_cte(rollup_sales(sale).cte("sales_rollup")).order_by(sale.c.id)
+    ).all()
+    invalidate_on_commit(db, product_cache, list(quantities), coalesce=True)
+    return db_sales
@@ -0,0 +1,77 @@
+from typing import List, Union
+
+from sqlalchemy import Float, Numeric, Select, case, cast, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from ..entity_cache import product_cache
+from ..invalidation import invalidate_on_commit
+from ..models import DbDiscount, DbProduct, DbProductDiscount
+
+# Decimal places effective prices are rounded to, i.e. cents
+PRICE_SCALE = 2
+
+
+def discount_factor(product_id_column) -> Select:
+    """
+    Build correlated subquery multiplying `1 - percentage / 100` of all Discounts in effect for a Product.
+
+    Links marked removed no longer count, they only wait for the scheduler to reprice and delete them.
+
+    The product is taken as `exp(sum(ln(...)))`, so stacked Discounts give the same result in any order.
+    A Discount of 100% or more makes the Product free, Products without Discounts in effect get no factor.
+    """
+    return (
+        select(
+            case(
+                (func.bool_or(DbDiscount.percentage >= 100), 0.0),
+                # Aggregates are computed before CASE picks a branch, keep ln() defined for 100% Discounts too
+                else_=func.exp(func.sum(func.ln(func.greatest(1 - DbDiscount.percentage / 100.0, 1e-9)))),
+            )
+        )
+        .join(DbProductDiscount, DbProductDiscount.discount_id == DbDiscount.id)
+        .where(
+            DbProductDiscount.product_id == product_id_column,
+            DbProductDiscount.removed.is_(False),
+            DbDiscount.in_effect.is_(True),
+        )
+        .scalar_subquery()
+    )
+
+
+def round_price(price):
+    """Round a price expression to PRICE_SCALE decimals, keeping the Float type of the price columns."""
+    return cast(func.round(cast(price, Numeric), PRICE_SCALE), Float)
+
+
+def reprice_products(db: Session, product_ids: Union[List[int], Select]) -> List[int]:
+    """
+    Recompute `effective_price` of Products from their base `price` and Discounts in effect in one UPDATE ... FROM.
+
+    `product_ids` is a list of IDs or a subquery selecting them, such as the Products linked to a Discount.
+    Prices are rounded half away from zero to PRICE_SCALE decimals in `numeric`, so the float error
+    of `exp(sum(ln(...)))` never shows up, e.g. 70% off 100.00 is 30.0 and not 30.000000000000004.
+    Only rows whose effective price actually changes are written. Returns IDs of the repriced Products
+    and evicts them from the cache once the transaction commits.
+    """
+    product = aliased(DbProduct)
+    new_prices = (
+        select(
+            product.id.label("product_id"),
+            round_price(product.price * func.coalesce(discount_factor(product.id), 1.0)).label("effective_price"),
+        )
+        .where(product.id.in_(product_ids))
+        .subquery("new_prices")
+    )
+    repriced_ids = db.scalars(
+        update(DbProduct)
+        .where(
+            DbProduct.id == new_prices.c.product_id,
+            DbProduct.effective_price.is_distinct_from(new_prices.c.effective_price),
+        )
+        .values(effective_price=new_prices.c.effective_price)
+        .returning(DbProduct.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if repriced_ids:
+        invalidate_on_commit(db, product_cache, repriced_ids)
+    return repriced_ids
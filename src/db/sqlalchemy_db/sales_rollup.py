@@ -0,0 +1,61 @@
+from datetime import date, datetime, time, timezone
+from typing import Optional
+
+from sqlalchemy import Date, Insert, cast, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..models import DbSaleDailyRollup
+
+ROLLUP_COLUMNS = ["product_id", "day", "quantity", "revenue", "sale_count"]
+
+
+def sale_day(created_at):
+    """UTC calendar day a Sale created at `created_at` is rolled up into."""
+    return cast(func.timezone("UTC", created_at), Date)
+
+
+def utc_day(moment: datetime) -> date:
+    """UTC calendar day of `moment`, naive datetimes are treated as UTC."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+
+def is_whole_day(moment: Optional[datetime]) -> bool:
+    """Check if report boundary is missing or falls on UTC midnight, so the daily rollup can serve it."""
+    if moment is None:
+        return True
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.time() == time.min
+
+
+def upsert_rollup(totals) -> Insert:
+    """Build INSERT ... ON CONFLICT DO UPDATE adding `totals` rows to the daily Sales rollup."""
+    stmt = pg_insert(DbSaleDailyRollup).from_select(ROLLUP_COLUMNS, totals)
+    return stmt.on_conflict_do_update(
+        index_elements=[DbSaleDailyRollup.product_id, DbSaleDailyRollup.day],
+        set_={
+            "quantity": DbSaleDailyRollup.quantity + stmt.excluded.quantity,
+            "revenue": DbSaleDailyRollup.revenue + stmt.excluded.revenue,
+            "sale_count": DbSaleDailyRollup.sale_count + stmt.excluded.sale_count,
+        },
+    )
+
+
+def rollup_sales(sales) -> Insert:
+    """
+    Build statement adding Sales to the rollup.
+
+    `sales` is any selectable with DbSale columns, such as the Sales table itself or the RETURNING output
+    of an INSERT used as a CTE, so new Sales are rolled up by the same statement that creates them.
+    """
+    day = sale_day(sales.c.created_at)
+    totals = select(
+        sales.c.product_id,
+        day,
+        func.sum(sales.c.quantity),
+        func.sum(sales.c.quantity * sales.c.sale_price),
+        func.count(),
+    ).group_by(sales.c.product_id, day)
+    return upsert_rollup(totals)
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import CTE, Integer, Row, column, select, update, values
+from sqlalchemy.orm import Session
+
+from ...enums import FilterField
+from ...request_utils import get_object_or_404
+from ..models import DbProduct
+
+
+def decrement_stock(product_id: int, quantity: int, reserve: bool = False) -> CTE:
+    """
+    Build conditional stock decrement of a Product as a CTE returning its `id` and the `price` it sells at.
+
+    The UPDATE only matches when enough stock is left, so concurrent writers can't oversell, and the CTE is
+    empty otherwise. With `reserve` the quantity is moved to `reserved_stock` instead of leaving the store.
+    """
+    values = {"stock": DbProduct.stock - quantity}
+    if reserve:
+        values["reserved_stock"] = DbProduct.reserved_stock + quantity
+
+    return (
+        update(DbProduct)
+        .where(DbProduct.id == product_id, DbProduct.stock >= quantity)
+        .values(**values)
+        .returning(DbProduct.id, DbProduct.effective_price.label("price"))
+        .cte("decremented_product")
+    )
+
+
+def raise_stock_error(db: Session, product_id: int) -> None:
+    """Explain why a conditional stock decrement matched no Product: it doesn't exist or lacks stock."""
+    db_product = get_object_or_404(DbProduct, FilterField.ID, product_id, db)
+    raise HTTPException(status_code=400, detail=f"Not enough stock, {db_product.stock} units remain.")
+
+
+def lock_products(db: Session, product_ids: Iterable[int]) -> Dict[int, Row]:
+    """
+    Lock Products with `SELECT ... FOR UPDATE` in ascending ID order.
+
+    A deterministic lock order lets concurrent multi-product writers queue up instead of deadlocking.
+    Raises 404 if any of the Products doesn't exist.
+    """
+    product_ids = sorted(set(product_ids))
+    locked = db.execute(
+        select(DbProduct.id, DbProduct.stock, DbProduct.effective_price.label("price"))
+        .where(DbProduct.id.in_(product_ids))
+        .order_by(DbProduct.id)
+        .with_for_update()
+    ).all()
+    products = {row.id: row for row in locked}
+
+    missing = [product_id for product_id in product_ids if product_id not in products]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"DbProduct with 'id': {missing} not found")
+    return products
+
+
+def decrement_stock_bulk(db: Session, quantities: Dict[int, int], reserve: bool = False) -> Dict[int, Row]:
+    """
+    Decrement stock of many Products all-or-nothing with one `UPDATE ... FROM (VALUES ...)`.
+
+    Products are locked first, so the stock check can't race with other writers. Returns locked rows
+    with the `stock` the Products had before the update and the `price` they sell at.
+    """
+    products = lock_products(db, quantities)
+    short = {
+        product_id: products[product_id].stock
+        for product_id, quantity in quantities.items()
+        if products[product_id].stock < quantity
+    }
+    if short:
+        raise HTTPException(status_code=400, detail=f"Not enough stock, units remain per Product: {short}")
+
+    lines = values(column("product_id", Integer), column("quantity", Integer), name="lines").data(
+        list(quantities.items())
+    )
+    updated_values = {"stock": DbProduct.stock - lines.c.quantity}
+    if reserve:
+        updated_values["reserved_stock"] = DbProduct.reserved_stock + lines.c.quantity
+    db.execute(update(DbProduct).where(DbProduct.id == lines.c.product_id).values(**updated_values))
+    return products
+
+
+def release_reserved_stock(db: Session, quantities: Dict[int, int], restock: bool = True) -> Dict[int, Row]:
+    """
+    Release reserved quantities of many Products with one `UPDATE ... FROM (VALUES ...)`.
+
+    With `restock` the quantities go back to the stock, otherwise they leave the store, as when Reservations
+    are sold. Products are locked in ascending ID order first, like every other multi-product writer,
+    to avoid deadlocks. Returns locked rows with the `price` the Products sell at.
+    """
+    products = lock_products(db, quantities)
+    lines = values(column("product_id", Integer), column("quantity", Integer), name="lines").data(
+        list(quantities.items())
+    )
+    updated_values = {"reserved_stock": DbProduct.reserved_stock - lines.c.quantity}
+    if restock:
+        updated_values["stock"] = DbProduct.stock + lines.c.quantity
+    db.execute(update(DbProduct).where(DbProduct.id == lines.c.product_id).values(**updated_values))
+    return products
+
+
+def merge_quantities(items: Iterable) -> Dict[int, int]:
+    """Sum requested quantities per Product ID."""
+    quantities = defaultdict(int)
+    for item in items:
+        quantities[item.product_id] += item.quantity
+    return dict(quantities)
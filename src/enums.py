@@ -10,3 +10,16 @@ class FilterField(str, Enum):
 class ReservationStatus(str, Enum):
     RESERVED = 'reserved'
     CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+    FULFILLED = 'fulfilled'
+
+
+class SalesReportGroupBy(str, Enum):
+    PRODUCT = 'product'
+    CATEGORY = 'category'
+    CATEGORY_TREE = 'category_tree'
+
+
+class ExportFormat(str, Enum):
+    CSV = 'csv'
+    NDJSON = 'ndjson'
@@ -1,15 +1,54 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 
-from src.db import models
+from config import METRICS_DIR
 from src.db.database import engine
+from src.db.entity_cache import get_cache_stats
+from src.db.invalidation import invalidation_listener
+from src.db.pool_metrics import get_pool_stats
+from src.metrics import collect_metrics
+from src.middleware import IDEMPOTENT_REPLAYED_HEADER, IdempotencyMiddleware, MetricsMiddleware
+from src.request_utils import ETAG_HEADER, NEXT_CURSOR_HEADER
+from src.response_utils import FastJSONResponse
 from src.routers import category, discount, product, reservation, sale
+from src.services.discount_scheduler import discount_scheduler
+from src.services.idempotency_key_purger import idempotency_key_purger
+from src.services.metrics_exporter import metrics_exporter
+from src.services.reservation_sweeper import reservation_sweeper
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Listen to cache invalidations of the other workers and run the Discount scheduler, the Reservation sweeper,
+    the Idempotency-Key purger and the metrics exporter while running.
+
+    The schema is managed by the migrations in `migrations/`, run `alembic upgrade head` before starting.
+    """
+    invalidation_listener.start()
+    discount_scheduler.start()
+    reservation_sweeper.start()
+    idempotency_key_purger.start()
+    if METRICS_DIR:
+        metrics_exporter.start()
+    yield
+    await metrics_exporter.stop()
+    await idempotency_key_purger.stop()
+    await reservation_sweeper.stop()
+    await discount_scheduler.stop()
+    invalidation_listener.stop()
+
 
 app = FastAPI(
     title="Online Store",
     description="Test Online Store",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 
@@ -20,15 +59,31 @@ app.include_router(reservation.router)
 app.include_router(sale.router)
 
 
-models.Base.metadata.create_all(engine)
-
-
 @app.get("/status", tags=["Test"])
 async def status_endpoint():
     """Endpoint to return status message."""
     return {"status": "Online"}
 
 
+@app.get("/status/pool", tags=["Test"])
+async def pool_status_endpoint():
+    """Endpoint to return live database connection pool statistics."""
+    return get_pool_stats(engine)
+
+
+@app.get("/status/cache", tags=["Test"])
+async def cache_status_endpoint():
+    """Endpoint to return size and hit/miss/eviction counters of the entity caches."""
+    return get_cache_stats()
+
+
+@app.get("/metrics", tags=["Test"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Endpoint to return request and database metrics of all workers in Prometheus text format."""
+    content = await run_in_threadpool(collect_metrics)
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/", include_in_schema=False)
 async def root_redirect():
     """Redirect to the Swagger UI documentation."""
@@ -39,11 +94,14 @@ origins = [
   'http://localhost:8000',
 ]
 
-# Add CORS middleware
+# Middleware added last runs first. Idempotency runs inside CORS, so replayed responses get CORS headers too
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER, IDEMPOTENT_REPLAYED_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,317 @@
+import bisect
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+from config import METRICS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from sub-millisecond waits up to the default pool timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Thread-safe histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record single observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        """Get cumulative bucket counts, total count and sum of observations."""
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+
+        buckets, cumulative = {}, 0
+        for upper_bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            buckets["+Inf" if upper_bound == float("inf") else str(upper_bound)] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total_sum}
+
+
+def merge_histogram_snapshots(first: Dict, second: Dict) -> Dict:
+    """Add up two snapshots of histograms with the same buckets."""
+    return {
+        "buckets": {bound: first["buckets"].get(bound, 0) + count for bound, count in second["buckets"].items()},
+        "count": first["count"] + second["count"],
+        "sum": first["sum"] + second["sum"],
+    }
+
+
+class Metric:
+    """Named metric with a value per combination of label values, rendered in Prometheus text format."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def collect(self) -> List[list]:
+        """Get `[label values, value]` pairs, ready to be serialized to JSON."""
+        raise NotImplementedError
+
+    @staticmethod
+    def merge(first, second):
+        """Add up values of the same labels collected by two processes."""
+        return first + second
+
+    def render(self, samples: Iterable[list]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in samples:
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[list]:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class LabeledHistogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._histograms: Dict[tuple, Histogram] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(labels, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def collect(self) -> List[list]:
+        with self._lock:
+            histograms = list(self._histograms.items())
+        return [[list(labels), histogram.snapshot()] for labels, histogram in histograms]
+
+    merge = staticmethod(merge_histogram_snapshots)
+
+    def render(self, samples: Iterable[list]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for labels, snapshot in samples:
+            for bound, count in snapshot["buckets"].items():
+                bucket_labels = format_labels((*self.labelnames, "le"), (*labels, bound))
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(snapshot['sum'])}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {snapshot['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of the process, collected into one JSON-serializable snapshot."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, List[list]]:
+        return {name: metric.collect() for name, metric in self.metrics.items()}
+
+    def merge(self, snapshots: Iterable[Dict[str, List[list]]]) -> Dict[str, List[list]]:
+        """Add up snapshots of several processes per metric and label values."""
+        merged: Dict[str, Dict[tuple, object]] = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for labels, value in samples:
+                    labels = tuple(labels)
+                    values[labels] = value if labels not in values else metric.merge(values[labels], value)
+        return {name: [[list(labels), value] for labels, value in values.items()] for name, values in merged.items()}
+
+    def cumulative(self, snapshot: Dict[str, List[list]]) -> Dict[str, List[list]]:
+        """Keep counters and histograms of snapshot, which stay valid after their process exits, and drop gauges."""
+        return {
+            name: samples
+            for name, samples in snapshot.items()
+            if name in self.metrics and self.metrics[name].type != Gauge.type
+        }
+
+    def render(self, snapshot: Dict[str, List[list]]) -> str:
+        """Render snapshot in Prometheus text exposition format."""
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.extend(metric.render(sorted(snapshot.get(name, []), key=lambda sample: sample[0])))
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+# Counters and histograms of exited workers, folded together so totals over all workers never go down
+RETIRED_SNAPSHOT = "metrics-retired.json"
+RETIRED_LOCK = "metrics-retired.lock"
+
+
+def snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def read_snapshot(path: str) -> Dict[str, List[list]]:
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_snapshot(snapshot: Dict[str, List[list]], path: str) -> None:
+    """Write snapshot to `path` in METRICS_DIR, replacing the previous file atomically."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=METRICS_DIR, suffix=".tmp", delete=False) as file:
+        json.dump(snapshot, file)
+    os.replace(file.name, path)
+
+
+def export_snapshot() -> None:
+    """Write metrics of this process to METRICS_DIR for the other workers."""
+    write_snapshot(registry.snapshot(), snapshot_path(os.getpid()))
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def retired_lock(operation: int) -> Iterator[None]:
+    """Hold the file lock of the retired snapshot, `fcntl.LOCK_EX` to retire snapshots, `fcntl.LOCK_SH` to read them."""
+    with open(os.path.join(METRICS_DIR, RETIRED_LOCK), "a") as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+def worker_pids() -> List[int]:
+    """PIDs of the other workers that exported a snapshot to METRICS_DIR."""
+    pids = []
+    for file_name in os.listdir(METRICS_DIR):
+        name, extension = os.path.splitext(file_name)
+        if extension != ".json" or not name.startswith("metrics-") or not name[len("metrics-"):].isdigit():
+            continue
+        pid = int(name[len("metrics-"):])
+        if pid != os.getpid():
+            pids.append(pid)
+    return pids
+
+
+def retire_snapshot(pid: int) -> None:
+    """
+    Fold counters and histograms of exited worker `pid` into the retired snapshot and remove its file.
+
+    Gauges, such as requests in flight, describe the worker itself and are dropped with it. Workers
+    retire snapshots under an exclusive file lock, so a snapshot is never added to the totals twice.
+    """
+    retired_path = os.path.join(METRICS_DIR, RETIRED_SNAPSHOT)
+    with retired_lock(fcntl.LOCK_EX):
+        path = snapshot_path(pid)
+        if not os.path.exists(path):
+            # Retired by another worker meanwhile
+            return
+        snapshots = [registry.cumulative(read_snapshot(path))]
+        if os.path.exists(retired_path):
+            snapshots.append(read_snapshot(retired_path))
+        write_snapshot(registry.merge(snapshots), retired_path)
+        os.remove(path)
+
+
+def collect_metrics() -> str:
+    """
+    Render metrics of all workers in Prometheus text format.
+
+    Without METRICS_DIR only this process is reported. Otherwise its fresh snapshot is merged with the
+    latest snapshots exported by the other live workers and with the retired counters and histograms of
+    exited workers, so counters keep growing when workers restart. Only what a worker recorded after
+    its last export, at most METRICS_EXPORT_INTERVAL seconds, is lost when it exits.
+
+    Snapshots of exited workers are retired first. The remaining snapshots and the retired one are then read
+    under the shared lock, so no worker can retire a snapshot in between and have it counted twice.
+    """
+    if not METRICS_DIR:
+        return registry.render(registry.snapshot())
+
+    snapshots = [registry.snapshot()]
+    if not os.path.isdir(METRICS_DIR):
+        return registry.render(registry.merge(snapshots))
+
+    for pid in worker_pids():
+        try:
+            if not is_alive(pid):
+                retire_snapshot(pid)
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics snapshot %s", snapshot_path(pid))
+
+    retired_path = os.path.join(METRICS_DIR, RETIRED_SNAPSHOT)
+    with retired_lock(fcntl.LOCK_SH):
+        paths = [snapshot_path(pid) for pid in worker_pids()]
+        if os.path.exists(retired_path):
+            paths.append(retired_path)
+        for path in paths:
+            try:
+                snapshots.append(read_snapshot(path))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable metrics snapshot %s", path)
+    return registry.render(registry.merge(snapshots))
@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import time
+
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db.database import run_in_session
+from .db.idempotency import claim_idempotency_key, release_idempotency_key, store_idempotent_response
+from .db.query_metrics import QueryStats, current_query_stats
+from .metrics import Counter, Gauge, LabeledHistogram, registry
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# Route label of requests no route matched, so unknown paths don't create new label values
+UNMATCHED_ROUTE = "unmatched"
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+http_requests = registry.register(
+    Counter("http_requests_total", "Requests completed per route and status code.", ("method", "route", "status"))
+)
+http_requests_in_flight = registry.register(Gauge("http_requests_in_flight", "Requests being processed right now."))
+http_request_duration = registry.register(
+    LabeledHistogram("http_request_duration_seconds", "Request latency per route.", ("method", "route"))
+)
+http_request_db_queries = registry.register(
+    LabeledHistogram(
+        "http_request_db_queries", "Database statements per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+    )
+)
+http_request_db_duration = registry.register(
+    LabeledHistogram("http_request_db_duration_seconds", "Database time per request.", ("method", "route"))
+)
+
+
+async def read_body(receive: Receive) -> bytes:
+    """Read the whole request body from ASGI `receive`."""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def request_fingerprint(scope: Scope, body: bytes) -> str:
+    """Hash method, path, query and body of a request, so a key reused for another request can be told apart."""
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Replay the first response of a mutating request to retries sending the same `Idempotency-Key` header.
+
+    The key is claimed before the request runs, so a retry arriving while the first attempt is still running
+    gets 409 instead of repeating the write. Responses below 500 are stored and replayed without running the
+    endpoint again, a failed request releases its key so it can be retried. Requests without the header
+    are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"{IDEMPOTENCY_KEY_HEADER} must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters long"},
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        fingerprint = request_fingerprint(scope, body)
+        stored = await run_in_session(claim_idempotency_key, key, fingerprint)
+        if stored is None or not stored.claimed:
+            await self._replay(stored, fingerprint)(scope, receive, send)
+            return
+
+        await self._run_once(scope, receive, send, key, body)
+
+    async def _run_once(self, scope: Scope, receive: Receive, send: Send, key: str, body: bytes) -> None:
+        body_sent = False
+        response = {"status": 500, "content_type": None, "body": []}
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_and_capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_capture)
+        except Exception:
+            await self._update_key(release_idempotency_key, key)
+            raise
+
+        if response["status"] >= 500:
+            await self._update_key(release_idempotency_key, key)
+        else:
+            status, content_type, content = response["status"], response["content_type"], b"".join(response["body"])
+            await self._update_key(store_idempotent_response, key, status, content_type, content)
+
+    @staticmethod
+    def _replay(stored, fingerprint: str) -> Response:
+        if stored is not None and stored.fingerprint != fingerprint:
+            return JSONResponse(
+                {"detail": f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"}, status_code=422
+            )
+        if stored is None or stored.status_code is None:
+            return JSONResponse(
+                {"detail": f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+        return Response(
+            stored.body,
+            status_code=stored.status_code,
+            media_type=stored.content_type,
+            headers={IDEMPOTENT_REPLAYED_HEADER: "true"},
+        )
+
+    @staticmethod
+    async def _update_key(func, *args) -> None:
+        """Update the stored key after the response was sent, a failure only costs retries the replay."""
+        try:
+            await run_in_session(func, *args)
+        except SQLAlchemyError:
+            logger.exception("Failed to update %s %r", IDEMPOTENCY_KEY_HEADER, args[0])
+
+
+def route_label(scope: Scope) -> str:
+    """Path template of the route that handled the request."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Plain Starlette routes, such as the docs, have fixed paths
+    return scope["path"] if "endpoint" in scope else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status code, database statements and database time of every HTTP request per route.
+
+    Routes are labeled by their path template, e.g. `/product/id/{product_id}`, so the number of series
+    stays bounded. Latency covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_and_record_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            current_query_stats.reset(token)
+            labels = (scope["method"], route_label(scope))
+            http_requests.inc((*labels, str(status)))
+            http_request_duration.observe(labels, duration)
+            http_request_db_queries.observe(labels, stats.count)
+            http_request_db_duration.observe(labels, stats.duration)
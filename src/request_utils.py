@@ -1,33 +1,167 @@
-from fastapi import Depends, HTTPException, Query, status
+import base64
+import binascii
+import hashlib
+import inspect
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 
 from src.db.database import get_db
 from src.enums import FilterField
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+ETAG_HEADER = "ETag"
+
 
 class PaginationParams:
     def __init__(
             self,
             limit: int = Query(10, ge=1, description="Number of items to return"),
-            offset: int = Query(0, ge=0, description="Number of items to skip before starting to return items")
+            offset: int = Query(0, ge=0, description="Number of items to skip before starting to return items"),
+            cursor: Optional[str] = Query(
+                None,
+                description=f"Opaque cursor taken from the '{NEXT_CURSOR_HEADER}' header of the previous page. "
+                            f"When provided, 'offset' is ignored",
+            ),
+            response: Response = None,
     ):
         self.limit = limit
         self.offset = offset
+        self.cursor = cursor
+        self.response = response
+        self.next_cursor = None
+
+    def set_next_cursor(self, next_cursor: str) -> None:
+        """Remember cursor of the next page and expose it to the client."""
+        self.next_cursor = next_cursor
+        if self.response is not None:
+            self.response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+class ConditionalRequest:
+    """
+    Conditional GET support: reads `If-None-Match` and sets `ETag` and `Last-Modified` on the response.
+
+    Validators are computed from version rows of the rendered entities, so a revalidation can be answered
+    with `304 Not Modified` after a cheap version query, without loading or serializing the entities.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.if_none_match = request.headers.get("If-None-Match")
+        self.response = response
+        self.etag = None
+
+    def set_validators(self, versions: Sequence[Sequence]) -> None:
+        """Compute validators from `versions` rows and expose them to the client."""
+        payload = json.dumps([list(row) for row in versions], separators=(",", ":"), default=str)
+        self.etag = f'W/"{hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()}"'
+        self.response.headers[ETAG_HEADER] = self.etag
+
+        moments = [value for row in versions for value in row if isinstance(value, datetime)]
+        if moments:
+            last_modified = max(moments)
+            if last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            self.response.headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), True)
+
+    def is_not_modified(self, versions: Sequence[Sequence]) -> bool:
+        """Set validators from `versions` and check if the copy the client holds is still current."""
+        self.set_validators(versions)
+        if not self.if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in self.if_none_match.split(",")}
+        return "*" in tags or self.etag.removeprefix("W/") in tags
+
+    def not_modified(self) -> Response:
+        """Empty `304 Not Modified` response carrying the headers already set for this request."""
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(self.response.headers))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode keyset values of the last row into an opaque cursor."""
+    payload = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
 
 
-def apply_pagination(query: Query, pagination: PaginationParams):
-    """Apply pagination to a SQLAlchemy query using PaginationParams."""
-    return query.limit(pagination.limit).offset(pagination.offset).all()
+def decode_cursor(cursor: str, keyset: Sequence) -> List[Any]:
+    """Decode an opaque cursor back into values of the `keyset` columns or raise 400 if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(keyset):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: '{cursor}'")
+    try:
+        return [_cursor_value(column, value) for column, value in zip(keyset, values)]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: '{cursor}'")
 
 
-def get_object_or_404(model, field: FilterField, value: any, db: Session = Depends(get_db)):
+def _cursor_value(column, value: Any) -> Any:
+    """Check that a decoded cursor value has the Python type of its keyset column."""
+    python_type = column.type.python_type
+    if isinstance(value, bool):
+        raise TypeError("Booleans are not valid keyset values")
+    if python_type is float and isinstance(value, (int, float)):
+        return float(value)
+    if python_type is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if not isinstance(value, python_type):
+        raise TypeError(f"Expected {python_type.__name__}, got {type(value).__name__}")
+    return value
+
+
+def apply_pagination(query: Query, pagination: PaginationParams, keyset: Sequence = ()):
+    """
+    Apply pagination to a SQLAlchemy query using PaginationParams.
+
+    When `keyset` columns are given, the query is ordered by them and can be continued from an opaque cursor
+    instead of an offset, so deep pages cost the same as the first one. A full page always exposes
+    the cursor of the next page.
+    """
+    if not keyset:
+        return query.limit(pagination.limit).offset(pagination.offset).all()
+
+    query = query.order_by(*keyset)
+    if pagination.cursor:
+        last_values = decode_cursor(pagination.cursor, keyset)
+        query = query.filter(tuple_(*keyset) > tuple_(*last_values))
+    else:
+        query = query.offset(pagination.offset)
+
+    items = query.limit(pagination.limit).all()
+    if len(items) == pagination.limit:
+        pagination.set_next_cursor(encode_cursor([getattr(items[-1], column.key) for column in keyset]))
+    return items
+
+
+async def run_db(func: Callable, *args, **kwargs):
+    """
+    Call repository method from async code.
+
+    Async repositories are awaited directly, sync ones are run in the threadpool so they don't block the event loop.
+    """
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+def get_object_or_404(model, field: FilterField, value: any, db: Session = Depends(get_db), options: Sequence = ()):
     """
     FastAPI dependency to fetch an object by any field or raise 404 if not found.
 
+    Loader `options` may be passed to eagerly load relationships needed by the response.
+
     Return:
         Object instance if found, raises 404 HTTPException otherwise
     """
-    obj = db.query(model).filter(getattr(model, field.value) == value).first()
+    obj = db.query(model).options(*options).filter(getattr(model, field.value) == value).first()
     if not obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Any, AsyncIterator, Iterator, List, Mapping, Optional, Sequence, Union
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import Select
+from starlette.background import BackgroundTask
+
+from config import EXPORT_BATCH_SIZE
+from src.db.database import stream_in_session
+from src.enums import ExportFormat
+from src.schemas.category_schemes import Category
+from src.schemas.product_schemes import Product
+from src.schemas.reservation_schemes import Reservation
+from src.schemas.sale_schemes import Sale, SalesSummary
+
+# Built once at import, so list endpoints don't rebuild validators and serializers per request
+PRODUCT_LIST = TypeAdapter(List[Product])
+CATEGORY_LIST = TypeAdapter(List[Category])
+RESERVATION_LIST = TypeAdapter(List[Reservation])
+SALE_LIST = TypeAdapter(List[Sale])
+SALES_SUMMARY_LIST = TypeAdapter(List[SalesSummary])
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered straight to bytes by pydantic-core.
+
+    Used as the default response class, it only replaces the stdlib `json` encoding. Given a precompiled
+    `adapter`, ORM objects returned by an endpoint are validated and dumped in one pass, skipping FastAPI's
+    response validation and `jsonable_encoder`. Headers already set on the injected `response`, such as
+    the pagination cursor or the ETag, are carried over.
+
+    `status_code` must stay an explicit parameter with a default, FastAPI reads it from the signature
+    of the default response class to document the responses in the OpenAPI schema.
+    """
+
+    def __init__(
+            self,
+            content: Any,
+            adapter: Optional[TypeAdapter] = None,
+            response: Optional[Response] = None,
+            status_code: int = 200,
+            headers: Optional[Mapping[str, str]] = None,
+            media_type: Optional[str] = None,
+            background: Optional[BackgroundTask] = None,
+    ):
+        self.adapter = adapter
+        if response is not None:
+            headers = {**response.headers, **(headers or {})}
+        super().__init__(
+            content, status_code=status_code, headers=headers, media_type=media_type, background=background
+        )
+
+    def render(self, content: Any) -> bytes:
+        if self.adapter is None:
+            return to_json(content)
+        return self.adapter.dump_json(self.adapter.validate_python(content, from_attributes=True))
+
+
+def _export_value(value):
+    """Render dates as ISO 8601 in every export format."""
+    return value.isoformat() if isinstance(value, date) else value
+
+
+class CsvEncoder:
+    media_type = "text/csv"
+
+    def header(self, keys: List[str]) -> str:
+        return self.rows(keys, [keys])
+
+    def rows(self, keys: List[str], rows: Sequence) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_export_value(value) for value in row] for row in rows)
+        return buffer.getvalue()
+
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+
+    def header(self, keys: List[str]) -> str:
+        return ""
+
+    def rows(self, keys: List[str], rows: Sequence) -> str:
+        return "".join(
+            json.dumps({key: _export_value(value) for key, value in zip(keys, row)}) + "\n" for row in rows
+        )
+
+
+EXPORT_ENCODERS = {
+    ExportFormat.CSV: CsvEncoder(),
+    ExportFormat.NDJSON: NdjsonEncoder(),
+}
+
+
+def _encode(encoder, chunks: Iterator) -> Iterator[str]:
+    keys = next(chunks)
+    yield encoder.header(keys)
+    for rows in chunks:
+        yield encoder.rows(keys, rows)
+
+
+async def _encode_async(encoder, chunks: AsyncIterator) -> AsyncIterator[str]:
+    keys = await chunks.__anext__()
+    yield encoder.header(keys)
+    async for rows in chunks:
+        yield encoder.rows(keys, rows)
+
+
+def stream_export(statement: Select, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """
+    Stream rows of `statement` as CSV or NDJSON attachment.
+
+    Rows are fetched from a server-side cursor in chunks of EXPORT_BATCH_SIZE and written out as they
+    arrive, so neither ORM objects nor the whole result are kept in memory.
+    """
+    encoder = EXPORT_ENCODERS[export_format]
+    chunks: Union[Iterator, AsyncIterator] = stream_in_session(statement, EXPORT_BATCH_SIZE)
+    content = _encode_async(encoder, chunks) if hasattr(chunks, "__anext__") else _encode(encoder, chunks)
+    return StreamingResponse(
+        content,
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
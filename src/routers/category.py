@@ -3,9 +3,11 @@ from typing import List
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
-from ..db.database import get_db
+from ..db.database import IS_ASYNC, get_db
+from ..db.sqlalchemy_async_db.db_category import AsyncSqlalchemyCategoryDatabase
 from ..db.sqlalchemy_db.db_category import SqlalchemyCategoryDatabase
-from ..request_utils import PaginationParams
+from ..request_utils import ConditionalRequest, PaginationParams
+from ..response_utils import CATEGORY_LIST, FastJSONResponse
 from ..schemas.category_schemes import Category, CategoryCreate, CategoryUpdate
 from ..services.category_service import CategoryService
 
@@ -15,44 +17,66 @@ router = APIRouter(
 )
 
 
-category_service = CategoryService(db=SqlalchemyCategoryDatabase())
+category_service = CategoryService(db=AsyncSqlalchemyCategoryDatabase() if IS_ASYNC else SqlalchemyCategoryDatabase())
 
 
 @router.get("/", response_model=List[Category])
-def get_categories(db: Session = Depends(get_db), pagination: PaginationParams = Depends()) -> List[Category]:
-    """Get all Categories endpoint."""
-    return category_service.get_categories(db, pagination)
+async def get_categories(
+        db: Session = Depends(get_db),
+        pagination: PaginationParams = Depends(),
+        conditional: ConditionalRequest = Depends(),
+) -> List[Category]:
+    """Get all Categories endpoint, answers `304` when the page is unchanged since `If-None-Match`."""
+    if conditional.if_none_match:
+        versions = await category_service.get_all_categories_versions(db, pagination)
+        if conditional.is_not_modified(versions):
+            return conditional.not_modified()
+
+    db_categories = await category_service.get_categories(db, pagination)
+    conditional.set_validators([db_category.etag_key for db_category in db_categories])
+    return FastJSONResponse(db_categories, CATEGORY_LIST, conditional.response)
 
 
 @router.post("/")
-def create_category(request: CategoryCreate, db: Session = Depends(get_db)) -> Category:
+async def create_category(request: CategoryCreate, db: Session = Depends(get_db)) -> Category:
     """
     Create new Category endpoint.
 
     If `parent_id` is provided as `0`, it will be ignored, as it is meant to be used only for subcategories.
     """
-    return category_service.create_category(db, request)
+    return await category_service.create_category(db, request)
 
 
 @router.get("/id/{category_id}", response_model=Category)
-def get_category_by_id(category_id: int, db: Session = Depends(get_db)) -> Category:
-    """Get Category by ID endpoint"""
-    return category_service.get_category_by_id(category_id, db)
+async def get_category_by_id(
+        category_id: int,
+        db: Session = Depends(get_db),
+        conditional: ConditionalRequest = Depends(),
+) -> Category:
+    """Get Category by ID endpoint, answers `304` when the Category is unchanged since `If-None-Match`."""
+    if conditional.if_none_match:
+        versions = await category_service.get_category_versions(db, category_id)
+        if versions and conditional.is_not_modified(versions):
+            return conditional.not_modified()
+
+    db_category = await category_service.get_category_by_id(category_id, db)
+    conditional.set_validators([db_category.etag_key])
+    return db_category
 
 
 @router.get("/name/{name}", response_model=Category)
-def get_category_by_name(name: str, db: Session = Depends(get_db)) -> Category:
+async def get_category_by_name(name: str, db: Session = Depends(get_db)) -> Category:
     """Get Category by Name endpoint"""
-    return category_service.get_category_by_name(name, db)
+    return await category_service.get_category_by_name(name, db)
 
 
-@router.patch("/{id}", response_model=Category)
-def update_category(request: CategoryUpdate, category_id: int, db: Session = Depends(get_db)) -> Category:
+@router.patch("/{category_id}", response_model=Category)
+async def update_category(request: CategoryUpdate, category_id: int, db: Session = Depends(get_db)) -> Category:
     """Update Category by ID endpoint"""
-    return category_service.update_category(db, category_id, request)
+    return await category_service.update_category(db, category_id, request)
 
 
 @router.delete('/delete/{category_id}')
-def remove_category(category_id: int, db: Session = Depends(get_db)) -> Category:
+async def remove_category(category_id: int, db: Session = Depends(get_db)) -> Category:
     """Delete Category by ID endpoint"""
-    return category_service.remove_category(db, category_id)
+    return await category_service.remove_category(db, category_id)
@@ -1,11 +1,15 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ..db.database import get_db
+from ..db.database import IS_ASYNC, get_db
+from ..db.sqlalchemy_async_db.db_product import AsyncSqlalchemyProductDatabase
 from ..db.sqlalchemy_db.db_product import SqlalchemyProductDatabase
-from ..request_utils import PaginationParams
+from ..enums import ExportFormat
+from ..request_utils import ConditionalRequest, PaginationParams
+from ..response_utils import PRODUCT_LIST, FastJSONResponse, stream_export
 from ..schemas.product_schemes import Product, ProductCreate, ProductPriceUpdate, ProductUpdate
 from ..services.product_service import ProductService
 
@@ -14,55 +18,101 @@ router = APIRouter(
     tags=["product"],
 )
 
-product_service = ProductService(db=SqlalchemyProductDatabase())
+product_service = ProductService(db=AsyncSqlalchemyProductDatabase() if IS_ASYNC else SqlalchemyProductDatabase())
 
 
 @router.get("/products", response_model=List[Product])
-def get_products(db: Session = Depends(get_db), pagination: PaginationParams = Depends()) -> List[Product]:
-    """Get all Products endpoint."""
-    return product_service.get_products(db, pagination)
+async def get_products(
+        db: Session = Depends(get_db),
+        pagination: PaginationParams = Depends(),
+        conditional: ConditionalRequest = Depends(),
+) -> List[Product]:
+    """Get all Products endpoint, answers `304` when the page is unchanged since `If-None-Match`."""
+    if conditional.if_none_match:
+        versions = await product_service.get_all_products_versions(db, pagination)
+        if conditional.is_not_modified(versions):
+            return conditional.not_modified()
+
+    db_products = await product_service.get_products(db, pagination)
+    conditional.set_validators([db_product.etag_key for db_product in db_products])
+    return FastJSONResponse(db_products, PRODUCT_LIST, conditional.response)
+
+
+@router.get("/products/export", response_class=StreamingResponse)
+async def export_products(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """Stream the whole catalog as CSV or NDJSON without pagination."""
+    statement = await product_service.get_products_export(db)
+    return stream_export(statement, export_format, filename="products")
 
 
 @router.post("/create", response_model=Product)
-def create_product(request: ProductCreate, db: Session = Depends(get_db)) -> Product:
+async def create_product(request: ProductCreate, db: Session = Depends(get_db)) -> Product:
     """Create new Product endpoint."""
-    return product_service.create_product(db, request)
+    return await product_service.create_product(db, request)
 
 
 @router.get("/id/{product_id}", response_model=Product)
-def get_product_by_id(product_id: int, db: Session = Depends(get_db)) -> Product:
-    """Get Product by ID endpoint."""
-    return product_service.get_product_by_id(db, product_id)
+async def get_product_by_id(
+        product_id: int,
+        db: Session = Depends(get_db),
+        conditional: ConditionalRequest = Depends(),
+) -> Product:
+    """Get Product by ID endpoint, answers `304` when the Product is unchanged since `If-None-Match`."""
+    if conditional.if_none_match:
+        versions = await product_service.get_product_versions(db, product_id)
+        if versions and conditional.is_not_modified(versions):
+            return conditional.not_modified()
+
+    db_product = await product_service.get_product_by_id(db, product_id)
+    conditional.set_validators([db_product.etag_key])
+    return db_product
 
 
 @router.get("/name/{name}", response_model=Product)
-def get_product_by_name(name: str, db: Session = Depends(get_db)) -> Product:
+async def get_product_by_name(name: str, db: Session = Depends(get_db)) -> Product:
     """Get Product by Name endpoint"""
-    return product_service.get_product_by_name(db, name)
+    return await product_service.get_product_by_name(db, name)
 
 
 @router.get("/category/{category_id}", response_model=List[Product])
-def get_products_by_category(
+async def get_products_by_category(
         category_id: int,
         db: Session = Depends(get_db),
         pagination: PaginationParams = Depends(),
 ) -> List[Product]:
-    return product_service.get_products_by_category(db, category_id, pagination)
+    db_products = await product_service.get_products_by_category(db, category_id, pagination)
+    return FastJSONResponse(db_products, PRODUCT_LIST, pagination.response)
+
+
+@router.get("/search", response_model=List[Product])
+async def search_products(
+        q: str = Query(..., min_length=1, description="Name prefix or approximate name, tolerant to typos"),
+        category_id: Optional[int] = Query(None, description="Search within Category and its Subcategories"),
+        in_stock: bool = Query(False, description="Return only Products in stock"),
+        db: Session = Depends(get_db),
+        pagination: PaginationParams = Depends(),
+) -> List[Product]:
+    """Search Products by name endpoint."""
+    db_products = await product_service.search_products(db, q, pagination, category_id, in_stock)
+    return FastJSONResponse(db_products, PRODUCT_LIST, pagination.response)
 
 
-@router.patch("/update/{id}", response_model=Product)
-def update_product(request: ProductUpdate, product_id: int, db: Session = Depends(get_db)) -> Product:
+@router.patch("/update/{product_id}", response_model=Product)
+async def update_product(request: ProductUpdate, product_id: int, db: Session = Depends(get_db)) -> Product:
     """Update Product by ID endpoint"""
-    return product_service.update_product(db, product_id, request)
+    return await product_service.update_product(db, product_id, request)
 
 
 @router.patch("/{product_id}/price", response_model=Product)
-def update_product_price(product_id: int, request: ProductPriceUpdate, db: Session = Depends(get_db)) -> Product:
+async def update_product_price(product_id: int, request: ProductPriceUpdate, db: Session = Depends(get_db)) -> Product:
     """Update price of Product by ID."""
-    return product_service.update_product_price(db, product_id, request.price)
+    return await product_service.update_product_price(db, product_id, request.price)
 
 
 @router.delete("/delete/{product_id}", response_model=Dict)
-def remove_product(product_id: int, db: Session = Depends(get_db)) -> Dict:
+async def remove_product(product_id: int, db: Session = Depends(get_db)) -> Dict:
     """Remove Product by ID endpoint."""
-    return product_service.remove_product(db, product_id)
+    return await product_service.remove_product(db, product_id)
@@ -3,10 +3,13 @@ from typing import Dict, List
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
-from ..db.database import get_db
+from ..db.database import IS_ASYNC, get_db
+from ..db.sqlalchemy_async_db.db_reservation import AsyncSqlalchemyReservationDatabase
 from ..db.sqlalchemy_db.db_reservation import SqlalchemyReservationDatabase
 from ..request_utils import PaginationParams
-from ..schemas.reservation_schemes import QuantityRequest, Reservation
+from ..response_utils import RESERVATION_LIST, SALE_LIST, FastJSONResponse
+from ..schemas.reservation_schemes import BatchFulfilmentRequest, BatchReservationRequest, QuantityRequest, Reservation
+from ..schemas.sale_schemes import Sale
 from ..services.reservation_service import ReservationService
 
 router = APIRouter(
@@ -14,41 +17,68 @@ router = APIRouter(
     tags=["reservation"]
 )
 
-reservation_service = ReservationService(db=SqlalchemyReservationDatabase())
+reservation_service = ReservationService(
+    db=AsyncSqlalchemyReservationDatabase() if IS_ASYNC else SqlalchemyReservationDatabase()
+)
 
 
 @router.get("/reservations", response_model=List[Reservation])
-def get_reservations(db: Session = Depends(get_db), pagination: PaginationParams = Depends()) -> List[Reservation]:
+async def get_reservations(
+        db: Session = Depends(get_db),
+        pagination: PaginationParams = Depends(),
+) -> List[Reservation]:
     """Get all Reservations endpoint."""
-    return reservation_service.get_reservations(db, pagination)
+    db_reservations = await reservation_service.get_reservations(db, pagination)
+    return FastJSONResponse(db_reservations, RESERVATION_LIST, pagination.response)
 
 
 @router.get("/reservations/active", response_model=List[Reservation])
-def get_active_reservations(
+async def get_active_reservations(
         db: Session = Depends(get_db),
         pagination: PaginationParams = Depends()
 ) -> List[Reservation]:
     """Get active Reservations endpoint."""
-    return reservation_service.get_active_reservations(db, pagination)
+    db_reservations = await reservation_service.get_active_reservations(db, pagination)
+    return FastJSONResponse(db_reservations, RESERVATION_LIST, pagination.response)
 
 
 @router.get("/id/{reservation_id}", response_model=Reservation)
-def get_reservation(reservation_id: int, db: Session = Depends(get_db)) -> List[Reservation]:
+async def get_reservation(reservation_id: int, db: Session = Depends(get_db)) -> List[Reservation]:
     """Get Reservation by ID endpoint."""
-    return reservation_service.get_reservation_by_id(db, reservation_id)
+    return await reservation_service.get_reservation_by_id(db, reservation_id)
 
 
 @router.post("/reserve_product/{product_id}", response_model=Reservation)
-def reserve_product(
+async def reserve_product(
     product_id: int,
     request: QuantityRequest,
     db: Session = Depends(get_db)
 ) -> Reservation:
     """Reserve Product by ID endpoint."""
-    return reservation_service.reserve_product(db, product_id, request.quantity)
+    return await reservation_service.reserve_product(db, product_id, request.quantity)
+
+
+@router.post("/reserve_products", response_model=List[Reservation])
+async def reserve_products(request: BatchReservationRequest, db: Session = Depends(get_db)) -> List[Reservation]:
+    """Reserve several Products at once endpoint, either every item is reserved or none."""
+    db_reservations = await reservation_service.reserve_products(db, request.items)
+    return FastJSONResponse(db_reservations, RESERVATION_LIST)
+
+
+@router.post("/id/{reservation_id}/fulfil", response_model=Sale)
+async def fulfil_reservation(reservation_id: int, db: Session = Depends(get_db)) -> Sale:
+    """Sell reserved stock of Reservation at its locked-in price endpoint."""
+    return await reservation_service.fulfil_reservation(db, reservation_id)
+
+
+@router.post("/fulfil", response_model=List[Sale])
+async def fulfil_reservations(request: BatchFulfilmentRequest, db: Session = Depends(get_db)) -> List[Sale]:
+    """Fulfil several Reservations of an order at once endpoint, either every Reservation is sold or none."""
+    db_sales = await reservation_service.fulfil_reservations(db, request.reservation_ids)
+    return FastJSONResponse(db_sales, SALE_LIST)
 
 
 @router.delete("/id/{reservation_id}")
-def cancel_reservation(reservation_id: int, db: Session = Depends(get_db)) -> Dict:
+async def cancel_reservation(reservation_id: int, db: Session = Depends(get_db)) -> Dict:
     """Cancel Reservation endpoint."""
-    return reservation_service.cancel_reservation(db, reservation_id)
+    return await reservation_service.cancel_reservation(db, reservation_id)
@@ -1,12 +1,18 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ..db.database import get_db
+from ..db.database import IS_ASYNC, get_db
+from ..db.sqlalchemy_async_db.db_sail import AsyncSqlalchemySaleDatabase
 from ..db.sqlalchemy_db.db_sail import SqlalchemySaleDatabase
+from ..enums import ExportFormat, SalesReportGroupBy
 from ..request_utils import PaginationParams
-from ..schemas.sale_schemes import Sale
+from ..response_utils import SALE_LIST, SALES_SUMMARY_LIST, FastJSONResponse, stream_export
+from ..schemas.reservation_schemes import BatchFulfilmentRequest
+from ..schemas.sale_schemes import BulkSaleRequest, Sale, SalesSummary
 from ..services.sale_service import SaleService
 
 router = APIRouter(
@@ -14,20 +20,69 @@ router = APIRouter(
     tags=["sale"],
 )
 
-sell_service = SaleService(db=SqlalchemySaleDatabase())
+sell_service = SaleService(db=AsyncSqlalchemySaleDatabase() if IS_ASYNC else SqlalchemySaleDatabase())
 
 
 @router.post("/product_id/{product_id}", response_model=Sale)
-def sell_product(product_id: int, quantity: int, db: Session = Depends(get_db)) -> Sale:
-    return sell_service.sell_product(db, product_id, quantity)
+async def sell_product(
+    product_id: int,
+    quantity: int = Query(..., gt=0, description="Number of items to sell"),
+    db: Session = Depends(get_db),
+) -> Sale:
+    return await sell_service.sell_product(db, product_id, quantity)
+
+
+@router.post("/products", response_model=List[Sale])
+async def sell_products(request: BulkSaleRequest, db: Session = Depends(get_db)) -> List[Sale]:
+    """Sell several Products at once endpoint, either every line is sold or none."""
+    db_sales = await sell_service.sell_products(db, request.items)
+    return FastJSONResponse(db_sales, SALE_LIST)
+
+
+@router.post("/reservation/{reservation_id}", response_model=Sale)
+async def sell_reservation(reservation_id: int, db: Session = Depends(get_db)) -> Sale:
+    """Sell reserved stock of Reservation at its locked-in price endpoint."""
+    return await sell_service.fulfil_reservation(db, reservation_id)
+
 
+@router.post("/reservations", response_model=List[Sale])
+async def sell_reservations(request: BatchFulfilmentRequest, db: Session = Depends(get_db)) -> List[Sale]:
+    """Sell several Reservations of an order at once endpoint, either every Reservation is sold or none."""
+    db_sales = await sell_service.fulfil_reservations(db, request.reservation_ids)
+    return FastJSONResponse(db_sales, SALE_LIST)
 
-@router.get("/sales/report", response_model=List[Sale])
-def get_sales_report(
+
+@router.get("/sales/report", response_model=Union[List[SalesSummary], List[Sale]])
+async def get_sales_report(
     category_id: Optional[int] = None,
     product_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from", description="Include Sales created at or after"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Include Sales created before"),
+    group_by: Optional[SalesReportGroupBy] = Query(
+        None,
+        description="Return totals computed by the database, grouped by Product, Category or Category subtree, "
+                    "instead of individual Sales. Pagination is ignored in this mode",
+    ),
     pagination: PaginationParams = Depends(),
     db: Session = Depends(get_db),
-) -> List[Sale]:
-    """Get sales report, optionally filtered by category or product."""
-    return sell_service.get_sales_report(db, pagination, category_id, product_id)
+) -> Union[List[SalesSummary], List[Sale]]:
+    """Get sales report, optionally filtered by category subtree, product or time range."""
+    if group_by:
+        summary = await sell_service.get_sales_summary(db, group_by, category_id, product_id, date_from, date_to)
+        return FastJSONResponse(summary, SALES_SUMMARY_LIST)
+    db_sales = await sell_service.get_sales_report(db, pagination, category_id, product_id, date_from, date_to)
+    return FastJSONResponse(db_sales, SALE_LIST, pagination.response)
+
+
+@router.get("/sales/export", response_class=StreamingResponse)
+async def export_sales(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    category_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from", description="Include Sales created at or after"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Include Sales created before"),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """Stream all matching Sales as CSV or NDJSON without pagination."""
+    statement = await sell_service.get_sales_export(db, category_id, product_id, date_from, date_to)
+    return stream_export(statement, export_format, filename="sales")
@@ -1,10 +1,20 @@
+from datetime import datetime, timezone
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 """DISCOUNT SCHEMES"""
 
 
+def as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Convert `moment` to UTC, naive datetimes are treated as UTC, so any two window bounds compare."""
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
 class DiscountBase(BaseModel):
     percentage: float = Field(
         ...,
@@ -13,6 +23,18 @@ class DiscountBase(BaseModel):
         description="Discount percentage must be between 0 and 100.",
     )
     description: Optional[str] = None
+    starts_at: Optional[datetime] = Field(None, description="Discount applies from this time, always when empty")
+    ends_at: Optional[datetime] = Field(None, description="Discount applies until this time, always when empty")
+
+    @field_validator('starts_at', 'ends_at')
+    def window_in_utc(cls, value):
+        return as_utc(value)
+
+    @model_validator(mode='after')
+    def window_must_not_be_empty(self):
+        if self.starts_at is not None and self.ends_at is not None and self.ends_at <= self.starts_at:
+            raise ValueError('Discount must end after it starts.')
+        return self
 
 
 class DiscountCreate(DiscountBase):
@@ -23,11 +45,18 @@ class DiscountUpdate(BaseModel):
     percentage: Optional[float] = None
     description: Optional[str] = None
     active: Optional[bool] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+
+    @field_validator('starts_at', 'ends_at')
+    def window_in_utc(cls, value):
+        return as_utc(value)
 
 
 class Discount(DiscountBase):
     id: int
     active: bool
+    in_effect: bool = Field(..., description="Whether effective prices of linked Products include the Discount")
 
     class Config:
         from_attributes = True
@@ -47,3 +76,13 @@ class ProductDiscount(ProductDiscountBase):
 
     class Config:
         from_attributes = True
+
+
+class CategoryDiscount(BaseModel):
+    discount_id: int
+    category_id: int
+    affected_products: int = Field(
+        ...,
+        description="Products of the Category subtree linked or unlinked, their effective prices are recomputed "
+                    "in the background",
+    )
@@ -35,6 +35,7 @@ class Product(ProductBase):
     id: int
     reserved_stock: int
     price: float
+    effective_price: float = Field(..., description="Price after all active discounts")
     category_name: str
 
     class Config:
@@ -1,5 +1,10 @@
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
+from config import MAX_BATCH_ITEMS
+
 """RESERVATION SCHEMAS"""
 
 
@@ -15,6 +20,8 @@ class ReservationCreate(ReservationBase):
 class Reservation(ReservationBase):
     id: int
     status: str
+    price: Optional[float] = Field(None, description="Price the Product is sold at when the Reservation is fulfilled")
+    expires_at: Optional[datetime] = Field(None, description="Reservation is released unless paid by this time")
 
     class Config:
         from_attributes = True
@@ -22,3 +29,15 @@ class Reservation(ReservationBase):
 
 class QuantityRequest(BaseModel):
     quantity: int = Field(..., gt=0)
+
+
+class ReservationItem(QuantityRequest):
+    product_id: int
+
+
+class BatchReservationRequest(BaseModel):
+    items: List[ReservationItem] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class BatchFulfilmentRequest(BaseModel):
+    reservation_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from config import MAX_BATCH_ITEMS
 
 """RESERVATION SCHEMES"""
 
@@ -14,3 +19,25 @@ class SaleBase(BaseModel):
 
 class Sale(SaleBase):
     id: int
+    created_at: datetime
+
+
+class SalesSummary(BaseModel):
+    group_id: Optional[int] = Field(
+        ..., description="Product or Category ID the row is aggregated by, null totals Products without a Category"
+    )
+    quantity: int
+    revenue: float
+    sale_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class SaleItem(BaseModel):
+    product_id: int
+    quantity: int = Field(..., gt=0)
+
+
+class BulkSaleRequest(BaseModel):
+    items: List[SaleItem] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
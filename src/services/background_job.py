@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJob:
+    """
+    Task running `run_once` in every worker every `interval` seconds, or sooner when woken up.
+
+    Any error of a run is logged and the job retries on the next run, so neither a lost connection nor a bug
+    hit by one batch stops the job for the lifetime of the worker. Only cancellation by `stop` ends it.
+    """
+
+    name = "background-job"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def wake(self) -> None:
+        """Run the job now instead of after the interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """Do one round of work. Returns number of processed rows."""
+        raise NotImplementedError
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Background job %s failed, retrying in %s s", self.name, self.interval)
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
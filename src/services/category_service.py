@@ -1,9 +1,10 @@
 from typing import List
 
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
 
 from ..db.sqlalchemy_db.db_category import SqlalchemyCategoryDatabase
-from ..request_utils import PaginationParams
+from ..request_utils import PaginationParams, run_db
 from ..schemas.category_schemes import Category, CategoryCreate, CategoryUpdate
 
 
@@ -14,31 +15,39 @@ class CategoryService:
         """Initialize the CategoryService with the provided database implementation."""
         self.db = db
 
-    def get_categories(self, db: Session, pagination: PaginationParams) -> List[Category]:
+    async def get_categories(self, db: Session, pagination: PaginationParams) -> List[Category]:
         """Get all Categories with pagination."""
-        return self.db.get_all_categories(db, pagination)
+        return await run_db(self.db.get_all_categories, db, pagination)
 
-    def get_category_by_id(self, category_id: int, db: Session) -> Category:
+    async def get_all_categories_versions(self, db: Session, pagination: PaginationParams) -> List[Row]:
+        """Get version columns of the Categories on a page of `get_categories`."""
+        return await run_db(self.db.get_all_categories_versions, db, pagination)
+
+    async def get_category_versions(self, db: Session, category_id: int) -> List[Row]:
+        """Get version columns of Category by ID."""
+        return await run_db(self.db.get_category_versions, db, category_id)
+
+    async def get_category_by_id(self, category_id: int, db: Session) -> Category:
         """Get Category by ID."""
-        return self.db.get_category_by_id(category_id, db)
+        return await run_db(self.db.get_category_by_id, category_id, db)
 
-    def get_category_by_name(self, name: str, db: Session) -> Category:
+    async def get_category_by_name(self, name: str, db: Session) -> Category:
         """Get Category by name."""
-        return self.db.get_category_by_name(name, db)
+        return await run_db(self.db.get_category_by_name, name, db)
 
-    def update_category(self, db: Session, category_id: int, category_data: CategoryUpdate) -> Category:
+    async def update_category(self, db: Session, category_id: int, category_data: CategoryUpdate) -> Category:
         """Update Category by ID with the provided data."""
-        return self.db.update_category(db, category_id, category_data)
+        return await run_db(self.db.update_category, db, category_id, category_data)
 
-    def create_category(self, db: Session, category: CategoryCreate) -> Category:
+    async def create_category(self, db: Session, category: CategoryCreate) -> Category:
         """Create new Category with the provided data."""
-        return self.db.create_category(db, category)
+        return await run_db(self.db.create_category, db, category)
 
-    def remove_category(self, db: Session, category_id: int) -> Category:
+    async def remove_category(self, db: Session, category_id: int) -> Category:
         """Get Category by ID."""
-        return self.db.remove_category(db, category_id)
+        return await run_db(self.db.remove_category, db, category_id)
 
-    def get_category_relations(self, db: Session, category_id: int) -> List[Category]:
+    async def get_category_relations(self, db: Session, category_id: int) -> List[Category]:
         """Get all related Categories for given Category."""
-        related_db_categories = self.db.get_category_relations(db, category_id)
+        related_db_categories = await run_db(self.db.get_category_relations, db, category_id)
         return related_db_categories
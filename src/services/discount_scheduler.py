@@ -0,0 +1,39 @@
+from config import DISCOUNT_REPRICE_BATCH_SIZE, DISCOUNT_SCHEDULER_INTERVAL
+
+from ..db.abstract.db_abstract_doscount import AbstractDiscountDatabase
+from ..db.database import run_in_session
+from ..db.sqlalchemy_db.db_discount import SqlalchemyDiscountDatabase
+from .background_job import BackgroundJob
+
+
+class DiscountScheduler(BackgroundJob):
+    """
+    Background job switching Discounts on and off at their start and end times and repricing their Products.
+
+    Runs in every worker, each batch of Products is repriced in its own short transaction. Workers claim
+    queued Discounts with SKIP LOCKED, so they share the repricing of many Discounts instead of repeating it.
+    Windows are checked every `interval` seconds, so a Discount starts or ends at most that late.
+    """
+
+    name = "discount-scheduler"
+
+    def __init__(
+        self,
+        db: AbstractDiscountDatabase,
+        interval: float = DISCOUNT_SCHEDULER_INTERVAL,
+        batch_size: int = DISCOUNT_REPRICE_BATCH_SIZE,
+    ):
+        super().__init__(interval)
+        self.db = db
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        """Apply Discount windows and reprice all queued Products. Returns number of repriced Products."""
+        await run_in_session(self.db.apply_discount_schedule)
+        processed = 0
+        while (count := await run_in_session(self.db.reprice_discount_batch, self.batch_size)) is not None:
+            processed += count
+        return processed
+
+
+discount_scheduler = DiscountScheduler(db=SqlalchemyDiscountDatabase())
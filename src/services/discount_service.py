@@ -3,8 +3,9 @@ from typing import List
 from sqlalchemy.orm import Session
 
 from ..db.abstract.db_abstract_doscount import AbstractDiscountDatabase
-from ..request_utils import PaginationParams
-from ..schemas.discount_schemes import Discount, DiscountCreate, DiscountUpdate
+from ..request_utils import PaginationParams, run_db
+from ..schemas.discount_schemes import CategoryDiscount, Discount, DiscountCreate, DiscountUpdate
+from .discount_scheduler import discount_scheduler
 
 
 class DiscountService:
@@ -12,30 +13,48 @@ class DiscountService:
         """Initialize DiscountService with database instance."""
         self.db = db
 
-    def get_discounts(self, db: Session, pagination: PaginationParams) -> List[Discount]:
+    async def get_discounts(self, db: Session, pagination: PaginationParams) -> List[Discount]:
         """Get all Discounts with pagination support."""
-        return self.db.get_all_discounts(db, pagination)
+        return await run_db(self.db.get_all_discounts, db, pagination)
 
-    def create_discount(self, db: Session, discount: DiscountCreate) -> Discount:
+    async def create_discount(self, db: Session, discount: DiscountCreate) -> Discount:
         """Create new Discount."""
-        return self.db.create_discount(db, discount)
+        db_discount = await run_db(self.db.create_discount, db, discount)
+        discount_scheduler.wake()
+        return db_discount
 
-    def get_discount_by_id(self, db: Session, discount_id: int) -> Discount:
+    async def get_discount_by_id(self, db: Session, discount_id: int) -> Discount:
         """Get Discount by ID."""
-        return self.db.get_discount_by_id(db, discount_id)
-
-    def update_discount(self, db: Session, discount_id: int, discount_data: DiscountUpdate) -> Discount:
-        """Update Discount by ID."""
-        return self.db.update_discount(db, discount_id, discount_data)
-
-    def delete_discount(self, db: Session, discount_id: int) -> Discount:
-        """Delete Discount by ID."""
-        return self.db.delete_discount(db, discount_id)
-
-    def add_discount_to_product(self, db: Session, product_id: int, discount_id: int) -> Discount:
-        """Add Discount to Product and update Product price."""
-        return self.db.add_discount_to_product(db, product_id, discount_id)
-
-    def remove_discount_from_product(self, db: Session, product_id: int, discount_id: int) -> Discount:
-        """Remove Discount from Product and update Product price."""
-        return self.db.remove_discount_from_product(db, product_id, discount_id)
+        return await run_db(self.db.get_discount_by_id, db, discount_id)
+
+    async def update_discount(self, db: Session, discount_id: int, discount_data: DiscountUpdate) -> Discount:
+        """Update Discount by ID, its Products are repriced by the scheduler in the background."""
+        db_discount = await run_db(self.db.update_discount, db, discount_id, discount_data)
+        discount_scheduler.wake()
+        return db_discount
+
+    async def delete_discount(self, db: Session, discount_id: int) -> Discount:
+        """Delete Discount by ID, its Products are repriced and unlinked by the scheduler in the background."""
+        db_discount = await run_db(self.db.delete_discount, db, discount_id)
+        discount_scheduler.wake()
+        return db_discount
+
+    async def add_discount_to_product(self, db: Session, product_id: int, discount_id: int) -> Discount:
+        """Link Discount to Product and recompute its effective price."""
+        return await run_db(self.db.add_discount_to_product, db, product_id, discount_id)
+
+    async def remove_discount_from_product(self, db: Session, product_id: int, discount_id: int) -> Discount:
+        """Unlink Discount from Product and recompute its effective price."""
+        return await run_db(self.db.remove_discount_from_product, db, product_id, discount_id)
+
+    async def add_discount_to_category(self, db: Session, category_id: int, discount_id: int) -> CategoryDiscount:
+        """Link Discount to all Products of Category subtree, they are repriced by the scheduler in the background."""
+        category_discount = await run_db(self.db.add_discount_to_category, db, category_id, discount_id)
+        discount_scheduler.wake()
+        return category_discount
+
+    async def remove_discount_from_category(self, db: Session, category_id: int, discount_id: int) -> CategoryDiscount:
+        """Unlink Discount from all Products of Category subtree, they are repriced and unlinked in the background."""
+        category_discount = await run_db(self.db.remove_discount_from_category, db, category_id, discount_id)
+        discount_scheduler.wake()
+        return category_discount
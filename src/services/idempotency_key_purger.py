@@ -0,0 +1,27 @@
+from config import IDEMPOTENCY_PURGE_BATCH_SIZE, IDEMPOTENCY_PURGE_INTERVAL
+
+from ..db.database import run_in_session
+from ..db.idempotency import purge_expired_idempotency_keys
+from .background_job import BackgroundJob
+
+
+class IdempotencyKeyPurger(BackgroundJob):
+    """Background job deleting expired Idempotency-Keys batch by batch, so the table stays small."""
+
+    name = "idempotency-key-purger"
+
+    def __init__(self, interval: float = IDEMPOTENCY_PURGE_INTERVAL, batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        """Delete all expired keys. Returns number of deleted keys."""
+        purged = 0
+        while True:
+            count = await run_in_session(purge_expired_idempotency_keys, self.batch_size)
+            purged += count
+            if count < self.batch_size:
+                return purged
+
+
+idempotency_key_purger = IdempotencyKeyPurger()
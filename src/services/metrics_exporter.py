@@ -0,0 +1,28 @@
+import asyncio
+import logging
+
+from config import METRICS_EXPORT_INTERVAL
+
+from ..metrics import export_snapshot
+from .background_job import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsExporter(BackgroundJob):
+    """Background job writing metrics of this worker to METRICS_DIR, where /metrics of any worker reads them."""
+
+    name = "metrics-exporter"
+
+    def __init__(self, interval: float = METRICS_EXPORT_INTERVAL):
+        super().__init__(interval)
+
+    async def run_once(self) -> int:
+        try:
+            await asyncio.to_thread(export_snapshot)
+        except OSError:
+            logger.exception("Failed to export metrics")
+        return 1
+
+
+metrics_exporter = MetricsExporter()
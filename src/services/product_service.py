@@ -1,9 +1,10 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+from sqlalchemy import Row, Select
 from sqlalchemy.orm import Session
 
 from ..db.abstract.db_abstract_product import AbstractProductDatabase
-from ..request_utils import PaginationParams
+from ..request_utils import PaginationParams, run_db
 from ..schemas.product_schemes import Product, ProductCreate, ProductUpdate
 
 
@@ -12,34 +13,62 @@ class ProductService:
         """Initialize ProductService with database instance."""
         self.db = db
 
-    def get_products(self, db: Session, pagination: PaginationParams) -> List[Product]:
+    async def get_products(self, db: Session, pagination: PaginationParams) -> List[Product]:
         """Get all Products with pagination support."""
-        return self.db.get_all_products(db, pagination)
+        return await run_db(self.db.get_all_products, db, pagination)
 
-    def create_product(self, db: Session, product: ProductCreate) -> Product:
+    async def get_all_products_versions(self, db: Session, pagination: PaginationParams) -> List[Row]:
+        """Get version columns of the Products on a page of `get_products`."""
+        return await run_db(self.db.get_all_products_versions, db, pagination)
+
+    async def get_product_versions(self, db: Session, product_id: int) -> List[Row]:
+        """Get version columns of Product by ID."""
+        return await run_db(self.db.get_product_versions, db, product_id)
+
+    async def get_products_export(self, db: Session) -> Select:
+        """Get statement selecting all Products for streaming export."""
+        return await run_db(self.db.get_products_export, db)
+
+    async def create_product(self, db: Session, product: ProductCreate) -> Product:
         """Create new Product."""
-        return self.db.create_product(db, product)
+        return await run_db(self.db.create_product, db, product)
 
-    def get_product_by_id(self, db: Session, product_id: int) -> Product:
+    async def get_product_by_id(self, db: Session, product_id: int) -> Product:
         """Get Product by ID."""
-        return self.db.get_product_by_id(db, product_id)
+        return await run_db(self.db.get_product_by_id, db, product_id)
 
-    def get_product_by_name(self, db: Session, product_name: str) -> Product:
+    async def get_product_by_name(self, db: Session, product_name: str) -> Product:
         """Get Product by name."""
-        return self.db.get_product_by_name(db, product_name)
+        return await run_db(self.db.get_product_by_name, db, product_name)
 
-    def get_products_by_category(self, db: Session, category_id: int, pagination: PaginationParams) -> List[Product]:
+    async def get_products_by_category(
+            self,
+            db: Session,
+            category_id: int,
+            pagination: PaginationParams,
+    ) -> List[Product]:
         """Get all Products in specific Category and Subcategories."""
-        return self.db.get_products_by_category(db, category_id, pagination)
+        return await run_db(self.db.get_products_by_category, db, category_id, pagination)
+
+    async def search_products(
+            self,
+            db: Session,
+            query: str,
+            pagination: PaginationParams,
+            category_id: Optional[int] = None,
+            in_stock: bool = False,
+    ) -> List[Product]:
+        """Search Products by name prefix or fuzzy match."""
+        return await run_db(self.db.search_products, db, query, pagination, category_id, in_stock)
 
-    def update_product(self, db: Session, product_id: int, product_data: ProductUpdate) -> Product:
+    async def update_product(self, db: Session, product_id: int, product_data: ProductUpdate) -> Product:
         """Update Product by ID."""
-        return self.db.update_product(db, product_id, product_data)
+        return await run_db(self.db.update_product, db, product_id, product_data)
 
-    def update_product_price(self, db: Session, product_id: int, new_price: float) -> Product:
+    async def update_product_price(self, db: Session, product_id: int, new_price: float) -> Product:
         """Update price of Product by ID."""
-        return self.db.update_product_price(db, product_id, new_price)
+        return await run_db(self.db.update_product_price, db, product_id, new_price)
 
-    def remove_product(self, db: Session, product_id: int) -> Dict:
+    async def remove_product(self, db: Session, product_id: int) -> Dict:
         """Remove Product by ID."""
-        return self.db.remove_product(db, product_id)
+        return await run_db(self.db.remove_product, db, product_id)
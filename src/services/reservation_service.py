@@ -3,8 +3,9 @@ from typing import Dict, List
 from sqlalchemy.orm import Session
 
 from ..db.abstract.db_abstract_reservation import AbstractReservationDatabase
-from ..db.models import DbReservation
-from ..request_utils import PaginationParams
+from ..db.models import DbReservation, DbSale
+from ..request_utils import PaginationParams, run_db
+from ..schemas.reservation_schemes import ReservationItem
 
 
 class ReservationService:
@@ -12,22 +13,34 @@ class ReservationService:
         """Initialize ReservationService with database instance."""
         self.db = db
 
-    def get_reservations(self, db: Session, pagination: PaginationParams) -> List[DbReservation]:
+    async def get_reservations(self, db: Session, pagination: PaginationParams) -> List[DbReservation]:
         """Get all Reservations with pagination support."""
-        return self.db.get_reservations(db, pagination)
+        return await run_db(self.db.get_reservations, db, pagination)
 
-    def get_active_reservations(self, db: Session, pagination: PaginationParams) -> List[DbReservation]:
+    async def get_active_reservations(self, db: Session, pagination: PaginationParams) -> List[DbReservation]:
         """Get active Reservations with pagination support."""
-        return self.db.get_active_reservations(db, pagination)
+        return await run_db(self.db.get_active_reservations, db, pagination)
 
-    def get_reservation_by_id(self, db: Session, reservation_id: int) -> DbReservation:
+    async def get_reservation_by_id(self, db: Session, reservation_id: int) -> DbReservation:
         """Get Reservation by ID."""
-        return self.db.get_reservation_by_id(db, reservation_id)
+        return await run_db(self.db.get_reservation_by_id, db, reservation_id)
 
-    def reserve_product(self, db: Session, product_id: int, quantity: int) -> DbReservation:
+    async def reserve_product(self, db: Session, product_id: int, quantity: int) -> DbReservation:
         """Reserve Product by ID."""
-        return self.db.reserve_product(db, product_id, quantity)
+        return await run_db(self.db.reserve_product, db, product_id, quantity)
 
-    def cancel_reservation(self, db: Session, reservation_id: int) -> Dict:
+    async def reserve_products(self, db: Session, items: List[ReservationItem]) -> List[DbReservation]:
+        """Reserve several Products at once, all or nothing."""
+        return await run_db(self.db.reserve_products, db, items)
+
+    async def cancel_reservation(self, db: Session, reservation_id: int) -> Dict:
         """Cancel Reservation by ID."""
-        return self.db.cancel_reservation(db, reservation_id)
+        return await run_db(self.db.cancel_reservation, db, reservation_id)
+
+    async def fulfil_reservation(self, db: Session, reservation_id: int) -> DbSale:
+        """Sell reserved stock of Reservation by ID at its locked-in price and mark it fulfilled."""
+        return await run_db(self.db.fulfil_reservation, db, reservation_id)
+
+    async def fulfil_reservations(self, db: Session, reservation_ids: List[int]) -> List[DbSale]:
+        """Fulfil several Reservations in one transaction, all or nothing."""
+        return await run_db(self.db.fulfil_reservations, db, reservation_ids)
@@ -0,0 +1,39 @@
+from config import RESERVATION_SWEEP_BATCH_SIZE, RESERVATION_SWEEP_INTERVAL
+
+from ..db.abstract.db_abstract_reservation import AbstractReservationDatabase
+from ..db.database import run_in_session
+from ..db.sqlalchemy_db.db_reservation import SqlalchemyReservationDatabase
+from .background_job import BackgroundJob
+
+
+class ReservationSweeper(BackgroundJob):
+    """
+    Background job releasing Reservations past their `expires_at` back to the Product stock.
+
+    Runs in every worker, each batch is its own transaction. Concurrent sweepers skip Reservations
+    locked by each other, so they split the backlog instead of waiting or releasing anything twice.
+    """
+
+    name = "reservation-sweeper"
+
+    def __init__(
+        self,
+        db: AbstractReservationDatabase,
+        interval: float = RESERVATION_SWEEP_INTERVAL,
+        batch_size: int = RESERVATION_SWEEP_BATCH_SIZE,
+    ):
+        super().__init__(interval)
+        self.db = db
+        self.batch_size = batch_size
+
+    async def run_once(self) -> int:
+        """Release all overdue Reservations batch by batch. Returns number of released Reservations."""
+        released = 0
+        while True:
+            count = await run_in_session(self.db.release_expired_reservations, self.batch_size)
+            released += count
+            if count < self.batch_size:
+                return released
+
+
+reservation_sweeper = ReservationSweeper(db=SqlalchemyReservationDatabase())
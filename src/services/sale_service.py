@@ -1,10 +1,14 @@
+from datetime import datetime
 from typing import List, Optional
 
+from sqlalchemy import Select
 from sqlalchemy.orm import Session
 
 from ..db.abstract.db_abstract_sale import AbstractSaleDatabase
 from ..db.models import DbSale
-from ..request_utils import PaginationParams
+from ..enums import SalesReportGroupBy
+from ..request_utils import PaginationParams, run_db
+from ..schemas.sale_schemes import SaleItem, SalesSummary
 
 
 class SaleService:
@@ -12,16 +16,53 @@ class SaleService:
         """Initialize SaleService with database instance."""
         self.db = db
 
-    def sell_product(self, db: Session, product_id: int, quantity: int) -> DbSale:
+    async def sell_product(self, db: Session, product_id: int, quantity: int) -> DbSale:
         """Sell Product, decrease stock and create Sale record in the database."""
-        return self.db.sell_product(db, product_id, quantity)
+        return await run_db(self.db.sell_product, db, product_id, quantity)
 
-    def get_sales_report(
+    async def sell_products(self, db: Session, items: List[SaleItem]) -> List[DbSale]:
+        """Sell several Products at once, all or nothing."""
+        return await run_db(self.db.sell_products, db, items)
+
+    async def fulfil_reservation(self, db: Session, reservation_id: int) -> DbSale:
+        """Sell reserved stock of Reservation by ID at its locked-in price and mark it fulfilled."""
+        return await run_db(self.db.fulfil_reservation, db, reservation_id)
+
+    async def fulfil_reservations(self, db: Session, reservation_ids: List[int]) -> List[DbSale]:
+        """Fulfil several Reservations in one transaction, all or nothing."""
+        return await run_db(self.db.fulfil_reservations, db, reservation_ids)
+
+    async def get_sales_report(
             self,
             db: Session,
             pagination: PaginationParams,
             category_id: Optional[int] = None,
             product_id: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
     ) -> List[DbSale]:
-        """Get Sales report, optionally filtered by Category or Product."""
-        return self.db.get_sales_report(db, pagination, category_id, product_id)
+        """Get Sales report, optionally filtered by Category, Product or time range."""
+        return await run_db(self.db.get_sales_report, db, pagination, category_id, product_id, date_from, date_to)
+
+    async def get_sales_export(
+            self,
+            db: Session,
+            category_id: Optional[int] = None,
+            product_id: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+    ) -> Select:
+        """Get statement selecting Sales for streaming export, filtered like the Sales report."""
+        return await run_db(self.db.get_sales_export, db, category_id, product_id, date_from, date_to)
+
+    async def get_sales_summary(
+            self,
+            db: Session,
+            group_by: SalesReportGroupBy,
+            category_id: Optional[int] = None,
+            product_id: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+    ) -> List[SalesSummary]:
+        """Get Sales totals aggregated by Product, Category or Category subtree."""
+        return await run_db(self.db.get_sales_summary, db, group_by, category_id, product_id, date_from, date_to)
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.db import models
+from src.db.database import get_db
+from src.db.entity_cache import ENTITY_CACHES
+from src.main import app
+
+# Postgres database the concurrency and NOTIFY tests run against, they are skipped when it is not set.
+# Every table of the database is dropped and recreated, never point it at real data.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(autouse=True)
+def empty_entity_caches():
+    """Every test starts from a new database, entities cached by an earlier test must not leak into it."""
+    for cache in ENTITY_CACHES.values():
+        cache.invalidate()
+
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite engine with the whole schema, shared by all sessions of a test."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def client(session_factory):
+    """Client of the application with its database dependency bound to the test engine."""
+    def get_test_db():
+        with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def pg_engine():
+    """Engine of TEST_DATABASE_URL with a freshly created schema."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL, pool_size=20)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    yield engine
+    models.Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def pg_session_factory(pg_engine):
+    return sessionmaker(bind=pg_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def pg_client(pg_session_factory):
+    """Client of the application with its database dependency bound to TEST_DATABASE_URL."""
+    def get_test_db():
+        with pg_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
@@ -0,0 +1,81 @@
+"""
+Smoke test of the application running with `DB_CONNECTOR=asyncpg`.
+
+The connector is picked when `src` is imported, so the app is driven in a child interpreter. Requests go
+to TEST_DATABASE_URL through asyncpg when it is set, otherwise to an in-memory SQLite database through
+aiosqlite, which runs the same `AsyncSession.run_sync` code path on the event loop thread.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_app_serves_requests_on_async_sessions():
+    env = {**os.environ, "DB_CONNECTOR": "asyncpg", "PYTHONPATH": str(ROOT)}
+    result = subprocess.run(
+        [sys.executable, __file__], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+async def create_schema(engine, metadata) -> None:
+    async with engine.begin() as connection:
+        if TEST_DATABASE_URL:
+            await connection.run_sync(metadata.drop_all)
+        await connection.run_sync(metadata.create_all)
+
+
+def main() -> None:
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    from src.db import models
+    from src.db.database import IS_ASYNC, get_db
+    from src.main import app
+
+    assert IS_ASYNC
+    if TEST_DATABASE_URL:
+        engine = create_async_engine(TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1))
+    else:
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    @asynccontextmanager
+    async def lifespan(_):
+        # Background jobs and the NOTIFY listener connect through the configured URL, not the test one
+        yield
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.router.lifespan_context = lifespan
+    with TestClient(app) as client:
+        client.portal.call(create_schema, engine, models.Base.metadata)
+
+        root = client.post("/category/", json={"name": "root"}).json()["id"]
+        child = client.post("/category/", json={"name": "child", "parent_id": root}).json()["id"]
+        product = client.post(
+            "/product/create", json={"name": "lamp", "price": 10, "stock": 5, "category_id": child}
+        )
+        assert product.status_code == 200, product.text
+        product_id = product.json()["id"]
+
+        assert client.get(f"/product/id/{product_id}").json()["name"] == "lamp"
+        assert [item["id"] for item in client.get("/product/products").json()] == [product_id]
+        assert [item["id"] for item in client.get(f"/product/category/{root}").json()] == [product_id]
+        assert client.get(f"/category/id/{child}").json()["name"] == "child"
+
+    asyncio.run(engine.dispose())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import asyncio
+
+from src.services.background_job import BackgroundJob
+
+
+class FlakyJob(BackgroundJob):
+    """Job failing with `errors` one after another, then counting its successful runs."""
+
+    name = "flaky-job"
+
+    def __init__(self, errors):
+        super().__init__(interval=0.01)
+        self.errors = list(errors)
+        self.runs = 0
+        self.succeeded = asyncio.Event()
+
+    async def run_once(self) -> int:
+        self.runs += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        self.succeeded.set()
+        return 0
+
+
+def test_job_keeps_running_after_any_error(caplog):
+    async def run():
+        job = FlakyJob([RuntimeError("bug"), KeyError("row")])
+        job.start()
+        await asyncio.wait_for(job.succeeded.wait(), 1)
+        await job.stop()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.runs >= 3
+    assert [record.exc_info[0] for record in caplog.records] == [RuntimeError, KeyError]
+
+
+def test_stop_cancels_the_job():
+    async def run():
+        job = FlakyJob([])
+        job.start()
+        await asyncio.wait_for(job.succeeded.wait(), 1)
+        task = job._task
+        await job.stop()
+        return task
+
+    assert asyncio.run(run()).cancelled()
@@ -0,0 +1,56 @@
+import threading
+
+from src.db.category_tree import CategoryTreeCache
+
+
+class FakeSession:
+    """Session whose closure table query returns `relations`, calling `on_query` first."""
+
+    def __init__(self, relations, on_query=lambda: None):
+        self.relations = relations
+        self.on_query = on_query
+
+    def query(self, *columns):
+        return self
+
+    def all(self):
+        self.on_query()
+        return self.relations
+
+
+def test_snapshot_is_loaded_once_and_reused():
+    tree = CategoryTreeCache()
+    loads = []
+    db = FakeSession([(1, 1, 0), (1, 2, 1), (2, 2, 0)], on_query=lambda: loads.append(1))
+
+    assert sorted(tree.get_descendants(db, 1)) == [1, 2]
+    assert tree.get_descendants(db, 2) == [2]
+    assert len(loads) == 1
+
+
+def test_snapshot_invalidated_while_loading_is_not_published():
+    tree = CategoryTreeCache()
+    db = FakeSession([(1, 1, 0)], on_query=tree.invalidate)
+
+    assert tree.get_descendants(db, 1) == [1]
+    assert tree._snapshot is None
+
+
+def test_loading_doesnt_block_concurrent_lookups():
+    """A lookup missing the cache while another one is still loading the tree runs its own query instead of waiting."""
+    tree = CategoryTreeCache()
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_query():
+        loading.set()
+        assert release.wait(5)
+
+    slow = threading.Thread(target=tree.get_descendants, args=(FakeSession([(1, 1, 0)], slow_query), 1))
+    slow.start()
+    try:
+        assert loading.wait(5)
+        assert tree.get_descendants(FakeSession([(1, 1, 0), (1, 2, 1)]), 1) == [1, 2]
+    finally:
+        release.set()
+        slow.join()
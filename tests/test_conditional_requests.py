@@ -0,0 +1,100 @@
+import pytest
+
+from src.request_utils import ETAG_HEADER
+
+
+@pytest.fixture
+def product(pg_client):
+    category_id = pg_client.post("/category/", json={"name": "lighting"}).json()["id"]
+    return pg_client.post(
+        "/product/create", json={"name": "lamp", "stock": 10, "category_id": category_id, "price": 10}
+    ).json()
+
+
+def etag_of(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return response.headers[ETAG_HEADER]
+
+
+def test_matching_etag_answers_304_without_body(pg_client, product):
+    url = f"/product/id/{product['id']}"
+    etag = etag_of(pg_client, url)
+
+    response = pg_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers[ETAG_HEADER] == etag
+    assert "Last-Modified" in response.headers
+
+
+@pytest.mark.parametrize("if_none_match", ["{strong}", '"stale", {weak}', "*"])
+def test_weak_strong_and_wildcard_tags_match(pg_client, product, if_none_match):
+    url = f"/product/id/{product['id']}"
+    weak = etag_of(pg_client, url)
+    strong = weak.removeprefix("W/")
+
+    response = pg_client.get(url, headers={"If-None-Match": if_none_match.format(weak=weak, strong=strong)})
+
+    assert response.status_code == 304
+
+
+def test_stale_etag_answers_full_response(pg_client, product):
+    response = pg_client.get(f"/product/id/{product['id']}", headers={"If-None-Match": 'W/"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "lamp"
+
+
+def test_wildcard_doesnt_match_missing_product(pg_client):
+    assert pg_client.get("/product/id/1", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def update_product(client, product):
+    response = client.patch(
+        f"/product/update/{product['id']}",
+        json={"name": "desk lamp", "stock": product["stock"], "category_id": product["category_id"]},
+    )
+    assert response.status_code == 200, response.text
+
+
+def rename_category(client, product):
+    assert client.patch(f"/category/{product['category_id']}", json={"name": "lamps"}).status_code == 200
+
+
+def sell_through_core_update(client, product):
+    assert client.post(f"/sale/product_id/{product['id']}", params={"quantity": 1}).status_code == 200
+
+
+@pytest.mark.parametrize("change", [update_product, rename_category, sell_through_core_update])
+def test_etag_changes_after_write(pg_client, product, change):
+    url = f"/product/id/{product['id']}"
+    etag = etag_of(pg_client, url)
+
+    change(pg_client, product)
+
+    response = pg_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers[ETAG_HEADER] != etag
+    assert pg_client.get(url, headers={"If-None-Match": response.headers[ETAG_HEADER]}).status_code == 304
+
+
+@pytest.mark.parametrize("change", [update_product, rename_category, sell_through_core_update])
+def test_list_etag_changes_after_write(pg_client, product, change):
+    etag = etag_of(pg_client, "/product/products")
+    assert pg_client.get("/product/products", headers={"If-None-Match": etag}).status_code == 304
+
+    change(pg_client, product)
+
+    assert pg_client.get("/product/products", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_category_etag_changes_after_rename(pg_client, product):
+    url = f"/category/id/{product['category_id']}"
+    etag = etag_of(pg_client, url)
+    assert pg_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    rename_category(pg_client, product)
+
+    assert pg_client.get(url, headers={"If-None-Match": etag}).status_code == 200
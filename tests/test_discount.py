@@ -0,0 +1,95 @@
+from sqlalchemy import func, select
+
+from src.db.models import DbDiscount, DbProduct, DbProductDiscount
+from src.db.sqlalchemy_db.db_discount import SqlalchemyDiscountDatabase
+
+
+def test_discounts_being_deleted_are_hidden(client, db):
+    db.add_all([DbDiscount(percentage=10), DbDiscount(percentage=20, active=False, deleted=True)])
+    db.commit()
+
+    assert [discount["id"] for discount in client.get("/discount/discounts").json()] == [1]
+    assert client.get("/discount/id/2").status_code == 404
+    assert client.patch("/discount/2", json={"active": True}).status_code == 404
+
+
+def test_deleted_discount_is_unlinked_in_batches(pg_session_factory):
+    discount_db = SqlalchemyDiscountDatabase()
+    with pg_session_factory() as db:
+        db_discount = DbDiscount(percentage=70, in_effect=True)
+        db_products = [DbProduct(name=f"item {i}", price=100, effective_price=30, stock=1) for i in range(5)]
+        db.add_all([db_discount, *db_products])
+        db.flush()
+        db.add_all(DbProductDiscount(product_id=product.id, discount_id=db_discount.id) for product in db_products)
+        db.commit()
+
+        deleted = discount_db.delete_discount(db, db_discount.id)
+        assert (deleted.active, deleted.in_effect) == (False, False)
+        # Prices are untouched until the scheduler gets to the Products
+        assert db.scalar(select(func.count()).select_from(DbProductDiscount)) == 5
+
+        batches = []
+        while (count := discount_db.reprice_discount_batch(db, 2)) is not None:
+            batches.append(count)
+
+        assert batches == [2, 2, 1]
+        assert db.get(DbDiscount, db_discount.id) is None
+        assert db.scalar(select(func.count()).select_from(DbProductDiscount)) == 0
+        assert db.scalars(select(DbProduct.effective_price)).all() == [100.0] * 5
+
+
+def reprice_all(discount_db, db, batch_size=2):
+    batches = []
+    while (count := discount_db.reprice_discount_batch(db, batch_size)) is not None:
+        batches.append(count)
+    return batches
+
+
+def test_category_discount_is_repriced_in_batches(pg_client, pg_session_factory):
+    discount_db = SqlalchemyDiscountDatabase()
+    root = pg_client.post("/category/", json={"name": "root"}).json()["id"]
+    child = pg_client.post("/category/", json={"name": "child", "parent_id": root}).json()["id"]
+    other = pg_client.post("/category/", json={"name": "other"}).json()["id"]
+    with pg_session_factory() as db:
+        db_discount = DbDiscount(percentage=70, in_effect=True)
+        db.add(db_discount)
+        db.add_all(
+            DbProduct(name=f"item {i}", price=100, effective_price=100, stock=1, category_id=category_id)
+            for i, category_id in enumerate([root, child, child, child, root, other])
+        )
+        db.commit()
+
+        linked = discount_db.add_discount_to_category(db, root, db_discount.id)
+        assert linked.affected_products == 5
+        # Linking locks and reprices no Product, the scheduler gets to them in batches
+        assert db.scalars(select(DbProduct.effective_price).order_by(DbProduct.id)).all() == [100.0] * 6
+        assert reprice_all(discount_db, db) == [2, 2, 1]
+        assert db.scalars(select(DbProduct.effective_price).order_by(DbProduct.id)).all() == [30.0] * 5 + [100.0]
+
+        unlinked = discount_db.remove_discount_from_category(db, child, db_discount.id)
+        assert unlinked.affected_products == 3
+        assert db.scalar(select(func.count()).select_from(DbProductDiscount)) == 5
+        assert reprice_all(discount_db, db) == [2, 2, 1]
+        assert db.scalars(select(DbProduct.effective_price).order_by(DbProduct.id)).all() == [
+            30.0, 100.0, 100.0, 100.0, 30.0, 100.0
+        ]
+        assert db.scalar(select(func.count()).select_from(DbProductDiscount)) == 2
+
+
+def test_relinking_keeps_link_waiting_for_removal(pg_client, pg_session_factory):
+    discount_db = SqlalchemyDiscountDatabase()
+    category_id = pg_client.post("/category/", json={"name": "root"}).json()["id"]
+    with pg_session_factory() as db:
+        db_discount = DbDiscount(percentage=50, in_effect=True)
+        db_product = DbProduct(name="item", price=100, effective_price=100, stock=1, category_id=category_id)
+        db.add_all([db_discount, db_product])
+        db.commit()
+        discount_db.add_discount_to_category(db, category_id, db_discount.id)
+        reprice_all(discount_db, db)
+
+        discount_db.remove_discount_from_category(db, category_id, db_discount.id)
+        assert discount_db.add_discount_to_product(db, db_product.id, db_discount.id).effective_price == 50
+        reprice_all(discount_db, db)
+
+        assert db.scalar(select(func.count()).select_from(DbProductDiscount)) == 1
+        assert db.get(DbProduct, db_product.id).effective_price == 50
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from src.db.models import DbDiscount
+from src.schemas.discount_schemes import DiscountCreate, DiscountUpdate
+
+
+def test_naive_window_bounds_are_treated_as_utc():
+    discount = DiscountCreate(percentage=10, starts_at="2026-01-01T00:00:00", ends_at="2026-01-02T02:00:00+02:00")
+
+    assert discount.starts_at == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert discount.ends_at == datetime(2026, 1, 2, tzinfo=timezone.utc)
+    assert DiscountUpdate(ends_at="2026-01-01T00:00:00").ends_at.tzinfo == timezone.utc
+
+
+def test_window_mixing_naive_and_aware_bounds_must_not_be_empty():
+    with pytest.raises(ValidationError, match="must end after it starts"):
+        DiscountCreate(percentage=10, starts_at="2026-01-01T10:00:00", ends_at="2026-01-01T11:00:00+02:00")
+
+
+def test_update_rejects_empty_window_against_stored_bound(client, db):
+    db.add(DbDiscount(percentage=10, starts_at=datetime(2026, 1, 1, 10, tzinfo=timezone.utc)))
+    db.commit()
+
+    # SQLite returns the stored bound naive, the new one is aware
+    response = client.patch("/discount/1", json={"ends_at": "2026-01-01T11:00:00+02:00"})
+    assert response.status_code == 400
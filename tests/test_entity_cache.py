@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, update
+
+from src.db.entity_cache import product_cache
+from src.db.invalidation import invalidate_on_commit
+from src.db.models import DbCategory, DbProduct
+from src.db.sqlalchemy_db.db_product import SqlalchemyProductDatabase
+from src.schemas.product_schemes import ProductUpdate
+
+product_db = SqlalchemyProductDatabase()
+
+
+@pytest.fixture
+def queries(engine):
+    """Statements executed on the test engine."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def product_id(db):
+    db_category = DbCategory(name="lighting")
+    db.add(db_category)
+    db.flush()
+    db_product = DbProduct(name="lamp", price=10, effective_price=10, stock=5, category_id=db_category.id)
+    db.add(db_product)
+    db.commit()
+    return db_product.id
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic clock of the entity cache, moved forward by assigning `now`."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr("src.db.entity_cache.time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_cached_product_is_served_without_query(session_factory, product_id, queries):
+    with session_factory() as db:
+        assert product_db.get_product_by_id(db, product_id).name == "lamp"
+    assert queries
+
+    queries.clear()
+    with session_factory() as db:
+        db_product = product_db.get_product_by_id(db, product_id)
+
+    assert (db_product.name, db_product.category.name) == ("lamp", "lighting")
+    assert queries == []
+
+
+def test_committed_write_evicts_product(session_factory, product_id, queries):
+    with session_factory() as db:
+        category_id = product_db.get_product_by_id(db, product_id).category_id
+        product_db.update_product(db, product_id, ProductUpdate(name="desk lamp", stock=5, category_id=category_id))
+
+    queries.clear()
+    with session_factory() as db:
+        assert product_db.get_product_by_id(db, product_id).name == "desk lamp"
+    assert queries
+
+
+def test_rolled_back_write_keeps_product(session_factory, product_id, queries):
+    with session_factory() as db:
+        product_db.get_product_by_id(db, product_id)
+        db.execute(update(DbProduct).where(DbProduct.id == product_id).values(name="desk lamp"))
+        invalidate_on_commit(db, product_cache, [product_id])
+        db.rollback()
+
+    queries.clear()
+    with session_factory() as db:
+        assert product_db.get_product_by_id(db, product_id).name == "lamp"
+    assert queries == []
+    assert product_cache.stats()["size"] == 1
+
+
+def test_expired_product_is_reloaded(session_factory, product_id, queries, clock):
+    with session_factory() as db:
+        product_db.get_product_by_id(db, product_id)
+        # Changed behind the cache's back, only the TTL bounds how long the old copy is served
+        db.execute(update(DbProduct).where(DbProduct.id == product_id).values(name="desk lamp"))
+        db.commit()
+
+    clock.now += product_cache.ttl - 1
+    with session_factory() as db:
+        assert product_db.get_product_by_id(db, product_id).name == "lamp"
+
+    clock.now += 1
+    queries.clear()
+    with session_factory() as db:
+        assert product_db.get_product_by_id(db, product_id).name == "desk lamp"
+    assert queries
+
+
+def test_load_overlapping_eviction_isnt_cached(session_factory, product_id):
+    with session_factory() as db:
+        def load_during_commit():
+            db_product = product_db._load_product(db, product_id)
+            product_cache.invalidate([product_id])
+            return db_product
+
+        product_cache.get_or_load(product_id, load_during_commit)
+
+    assert product_cache.stats()["size"] == 0
@@ -0,0 +1,102 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from src.db.models import DbProduct, DbSale
+from src.enums import ExportFormat
+from src.response_utils import stream_export
+
+CREATED_AT = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def exported(client, session_factory, db, monkeypatch):
+    """Products of two Categories with a Sale each, streamed in batches of two rows."""
+    monkeypatch.setattr("src.db.database.SessionLocal", session_factory)
+    monkeypatch.setattr("src.response_utils.EXPORT_BATCH_SIZE", 2)
+    tools, toys = [client.post("/category/", json={"name": name}).json()["id"] for name in ["tools", "toys"]]
+    db_products = [
+        DbProduct(name=name, price=price, effective_price=price, stock=5, category_id=category_id)
+        for name, price, category_id in [("hammer", 10, tools), ('saw, "fine"', 20, tools), ("ball", 3, toys)]
+    ]
+    db.add_all(db_products)
+    db.flush()
+    db.add_all(
+        DbSale(product_id=db_product.id, quantity=1, sale_price=db_product.price, created_at=CREATED_AT)
+        for db_product in db_products
+    )
+    db.commit()
+    return tools, db_products
+
+
+def test_sales_csv_export(client, exported):
+    response = client.get("/sale/sales/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="sales.csv"'
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "product_id", "quantity", "sale_price", "created_at"]
+    assert [row[1] for row in rows[1:]] == [str(db_product.id) for db_product in exported[1]]
+    assert {datetime.fromisoformat(row[4]) for row in rows[1:]} == {CREATED_AT.replace(tzinfo=None)}
+
+
+def test_sales_ndjson_export_is_filtered_like_the_report(client, exported):
+    tools_id, db_products = exported
+
+    response = client.get("/sale/sales/export", params={"format": "ndjson", "category_id": tools_id})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="sales.ndjson"'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["product_id"] for line in lines] == [db_product.id for db_product in db_products[:2]]
+    assert lines[0].keys() == {"id", "product_id", "quantity", "sale_price", "created_at"}
+
+
+@pytest.mark.parametrize("export_format", list(ExportFormat))
+def test_products_export_quotes_and_orders_every_product(client, exported, export_format):
+    response = client.get("/product/products/export", params={"format": export_format.value})
+
+    assert response.status_code == 200
+    if export_format == ExportFormat.CSV:
+        header, *rows = csv.reader(io.StringIO(response.text))
+        records = [dict(zip(header, row)) for row in rows]
+    else:
+        records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["name"] for record in records] == ["hammer", 'saw, "fine"', "ball"]
+    assert [record["category_name"] for record in records] == ["tools", "tools", "toys"]
+
+
+@pytest.mark.parametrize("export_format", list(ExportFormat))
+def test_export_streams_one_chunk_per_batch(exported, export_format):
+    response = stream_export(select(DbProduct.id, DbProduct.name).order_by(DbProduct.id), export_format, "products")
+
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    header, *batches = asyncio.run(collect())
+    assert bool(header) == (export_format == ExportFormat.CSV)
+    assert [chunk.count("\n") for chunk in batches] == [2, 1]
+
+
+def test_export_streams_from_postgres_server_side_cursor(pg_session_factory, monkeypatch):
+    monkeypatch.setattr("src.db.database.SessionLocal", pg_session_factory)
+    monkeypatch.setattr("src.response_utils.EXPORT_BATCH_SIZE", 2)
+    with pg_session_factory() as db:
+        db.add_all(DbProduct(name=f"product {number}", price=1, effective_price=1, stock=1) for number in range(5))
+        db.commit()
+
+    response = stream_export(select(DbProduct.name).order_by(DbProduct.id), ExportFormat.NDJSON, "products")
+
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    _, *batches = asyncio.run(collect())
+    assert [chunk.count("\n") for chunk in batches] == [2, 2, 1]
+    assert [json.loads(line)["name"] for line in "".join(batches).splitlines()] == [f"product {n}" for n in range(5)]
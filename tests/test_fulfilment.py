@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import func, select
+
+from config import MAX_BATCH_ITEMS
+from src.db.models import DbCategory, DbProduct, DbReservation, DbSale
+from src.enums import ReservationStatus
+
+
+@pytest.fixture
+def reserve(pg_client, pg_session_factory):
+    """Reserve `quantity` units of a new Product priced 10 with 10 units in stock, returns the Reservation ID."""
+    with pg_session_factory() as db:
+        db_category = DbCategory(name="lighting")
+        db_product = DbProduct(name="lamp", price=10, effective_price=10, stock=10, category=db_category)
+        db.add(db_product)
+        db.commit()
+        product_id = db_product.id
+
+    def reserve(quantity: int, product_id: int = product_id) -> int:
+        response = pg_client.post(f"/reservation/reserve_product/{product_id}", json={"quantity": quantity})
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+
+    reserve.product_id = product_id
+    return reserve
+
+
+def product_state(session_factory, product_id):
+    with session_factory() as db:
+        db_product = db.get(DbProduct, product_id)
+        sold = db.scalar(select(func.coalesce(func.sum(DbSale.quantity), 0)).where(DbSale.product_id == product_id))
+        return db_product.stock, db_product.reserved_stock, sold
+
+
+def test_fulfilment_sells_at_locked_in_price(pg_client, pg_session_factory, reserve):
+    first, second = reserve(2), reserve(3)
+    assert pg_client.patch(f"/product/{reserve.product_id}/price", json={"price": 20}).status_code == 200
+
+    response = pg_client.post("/reservation/fulfil", json={"reservation_ids": [second, first, second]})
+
+    assert response.status_code == 200, response.text
+    assert [(sale["quantity"], sale["sale_price"]) for sale in response.json()] == [(2, 10), (3, 10)]
+    assert product_state(pg_session_factory, reserve.product_id) == (5, 0, 5)
+    with pg_session_factory() as db:
+        assert {db.get(DbReservation, first).status, db.get(DbReservation, second).status} == {
+            ReservationStatus.FULFILLED.value
+        }
+
+
+@pytest.mark.parametrize("url", ["/reservation/fulfil", "/sale/reservations"])
+def test_fulfilment_is_all_or_nothing(pg_client, pg_session_factory, reserve, url):
+    active, fulfilled = reserve(2), reserve(3)
+    assert pg_client.post(f"/sale/reservation/{fulfilled}").status_code == 200
+
+    response = pg_client.post(url, json={"reservation_ids": [active, fulfilled]})
+
+    assert response.status_code == 404
+    assert str([fulfilled]) in response.json()["detail"]
+    assert product_state(pg_session_factory, reserve.product_id) == (5, 2, 3)
+    with pg_session_factory() as db:
+        assert db.get(DbReservation, active).status == ReservationStatus.RESERVED.value
+
+
+@pytest.mark.parametrize("url", ["/reservation/id/{id}/fulfil", "/sale/reservation/{id}"])
+def test_fulfilled_or_cancelled_reservation_is_rejected(pg_client, pg_session_factory, reserve, url):
+    fulfilled, cancelled = reserve(2), reserve(3)
+    assert pg_client.post(url.format(id=fulfilled)).status_code == 200
+    assert pg_client.delete(f"/reservation/id/{cancelled}").status_code == 200
+
+    assert pg_client.post(url.format(id=fulfilled)).status_code == 404
+    assert pg_client.post(url.format(id=cancelled)).status_code == 404
+    assert product_state(pg_session_factory, reserve.product_id) == (8, 0, 2)
+
+
+def test_fulfilment_rejects_too_many_reservations(client):
+    response = client.post("/reservation/fulfil", json={"reservation_ids": list(range(MAX_BATCH_ITEMS + 1))})
+
+    assert response.status_code == 422
@@ -0,0 +1,122 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+from src.db.idempotency import claim_idempotency_key, store_idempotent_response
+from src.db.models import DbCategory, DbIdempotencyKey
+from src.middleware import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAYED_HEADER, request_fingerprint
+from src.routers.category import category_service
+
+CLAIMERS = 8
+BODY = json.dumps({"name": "root"}).encode()
+
+
+@pytest.fixture
+def idempotent_client(pg_client, pg_session_factory, monkeypatch):
+    """Client whose middleware claims keys in the test database."""
+    monkeypatch.setattr("src.db.database.SessionLocal", pg_session_factory)
+    return pg_client
+
+
+def post_category(client, key, body=BODY):
+    return client.post(
+        "/category/", content=body, headers={IDEMPOTENCY_KEY_HEADER: key, "Content-Type": "application/json"}
+    )
+
+
+def count(session_factory, model) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+def test_first_claim_and_in_flight_duplicate(pg_session_factory):
+    with pg_session_factory() as db:
+        first = claim_idempotency_key(db, "order-1", "fingerprint")
+        duplicate = claim_idempotency_key(db, "order-1", "fingerprint")
+
+    assert first.claimed
+    assert (duplicate.claimed, duplicate.fingerprint, duplicate.status_code) == (False, "fingerprint", None)
+
+
+def test_expired_key_is_claimed_again(pg_session_factory):
+    with pg_session_factory() as db:
+        claim_idempotency_key(db, "order-1", "old")
+        store_idempotent_response(db, "order-1", 201, "application/json", b"{}")
+        db.execute(update(DbIdempotencyKey).values(expires_at=func.now()))
+        db.commit()
+
+        reclaimed = claim_idempotency_key(db, "order-1", "new")
+        db_key = db.get(DbIdempotencyKey, "order-1")
+
+    assert reclaimed.claimed
+    assert (db_key.fingerprint, db_key.status_code, db_key.body) == ("new", None, None)
+
+
+def test_concurrent_claims_have_one_winner(pg_session_factory):
+    barrier = threading.Barrier(CLAIMERS)
+
+    def claim(_):
+        barrier.wait()
+        with pg_session_factory() as db:
+            row = claim_idempotency_key(db, "order-1", "fingerprint")
+        return row is not None and row.claimed
+
+    with ThreadPoolExecutor(CLAIMERS) as executor:
+        claimed = list(executor.map(claim, range(CLAIMERS)))
+
+    assert claimed.count(True) == 1
+
+
+def test_stored_response_is_replayed(idempotent_client, pg_session_factory):
+    first = post_category(idempotent_client, "order-1")
+    replayed = post_category(idempotent_client, "order-1")
+
+    assert first.status_code == 200, first.text
+    assert IDEMPOTENT_REPLAYED_HEADER not in first.headers
+    assert (replayed.status_code, replayed.content) == (first.status_code, first.content)
+    assert replayed.headers[IDEMPOTENT_REPLAYED_HEADER] == "true"
+    assert replayed.headers["content-type"] == first.headers["content-type"]
+    assert count(pg_session_factory, DbCategory) == 1
+
+
+def test_duplicate_of_request_in_flight_gets_409(idempotent_client, pg_session_factory):
+    scope = {"method": "POST", "path": "/category/", "query_string": b""}
+    with pg_session_factory() as db:
+        claim_idempotency_key(db, "order-1", request_fingerprint(scope, BODY))
+
+    response = post_category(idempotent_client, "order-1")
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert count(pg_session_factory, DbCategory) == 0
+
+
+def test_key_reused_for_other_request_gets_422(idempotent_client, pg_session_factory):
+    assert post_category(idempotent_client, "order-1").status_code == 200
+
+    response = post_category(idempotent_client, "order-1", json.dumps({"name": "other"}).encode())
+
+    assert response.status_code == 422
+    assert count(pg_session_factory, DbCategory) == 1
+
+
+def test_key_is_released_on_server_error(idempotent_client, pg_session_factory, monkeypatch):
+    create_category = category_service.create_category
+
+    async def unavailable(*args):
+        raise HTTPException(status_code=503, detail="Try again later")
+
+    monkeypatch.setattr(category_service, "create_category", unavailable)
+    assert post_category(idempotent_client, "order-1").status_code == 503
+    assert count(pg_session_factory, DbIdempotencyKey) == 0
+
+    monkeypatch.setattr(category_service, "create_category", create_category)
+    retried = post_category(idempotent_client, "order-1")
+
+    assert retried.status_code == 200, retried.text
+    assert IDEMPOTENT_REPLAYED_HEADER not in retried.headers
+    assert count(pg_session_factory, DbCategory) == 1
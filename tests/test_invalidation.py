@@ -0,0 +1,162 @@
+import json
+import select
+
+import psycopg2
+import pytest
+
+from src.db.entity_cache import product_cache
+from src.db.invalidation import (
+    MAX_INVALIDATED_KEYS,
+    PROCESS_ID,
+    invalidate_on_commit,
+    publish_coalesced_invalidations,
+    take_coalesced_invalidations,
+)
+from src.db.models import DbProduct
+from src.db.sqlalchemy_db.db_sail import SqlalchemySaleDatabase
+
+CHANNEL = "test_cache_invalidation"
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    take_coalesced_invalidations()
+    product_cache.invalidate()
+    yield
+    take_coalesced_invalidations()
+
+
+class FakeConnection:
+    """psycopg2 connection recording executed statements, failing with `error` when set."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, parameters):
+        if self.error is not None:
+            raise self.error
+        self.executed.append(parameters)
+
+
+def test_coalesced_invalidation_evicts_locally_and_is_queued_on_commit(db):
+    product_cache.get_or_load(1, lambda: "old")
+
+    invalidate_on_commit(db, product_cache, [1], coalesce=True)
+    invalidate_on_commit(db, product_cache, [2, 1], coalesce=True)
+    assert take_coalesced_invalidations() == {}
+    db.commit()
+
+    assert product_cache.get_or_load(1, lambda: "new") == "new"
+    assert take_coalesced_invalidations() == {"product": [1, 2]}
+
+
+def test_coalesced_invalidation_is_dropped_on_rollback(db):
+    invalidate_on_commit(db, product_cache, [1], coalesce=True)
+    db.rollback()
+    assert take_coalesced_invalidations() == {}
+
+
+def test_too_many_coalesced_keys_invalidate_whole_cache(db):
+    invalidate_on_commit(db, product_cache, list(range(MAX_INVALIDATED_KEYS)), coalesce=True)
+    invalidate_on_commit(db, product_cache, [MAX_INVALIDATED_KEYS], coalesce=True)
+    db.commit()
+    assert take_coalesced_invalidations() == {"product": None}
+
+
+def test_queued_invalidations_are_published_with_one_statement(db):
+    invalidate_on_commit(db, product_cache, [3, 1], coalesce=True)
+    db.commit()
+    connection = FakeConnection()
+
+    assert publish_coalesced_invalidations(connection, CHANNEL) == 1
+    assert publish_coalesced_invalidations(connection, CHANNEL) == 0
+
+    [(channel, payloads)] = connection.executed
+    assert channel == CHANNEL
+    assert [json.loads(payload) for payload in payloads] == [{"cache": "product", "keys": [1, 3], "origin": PROCESS_ID}]
+
+
+def test_failed_publish_queues_invalidations_again(db):
+    invalidate_on_commit(db, product_cache, [1], coalesce=True)
+    db.commit()
+
+    with pytest.raises(psycopg2.Error):
+        publish_coalesced_invalidations(FakeConnection(psycopg2.OperationalError()), CHANNEL)
+    assert take_coalesced_invalidations() == {"product": [1]}
+
+
+@pytest.fixture
+def connect(pg_engine):
+    """
+    Open autocommit psycopg2 connections to the test database outside the engine's pool.
+
+    A raw connection of the pool goes back to it when its proxy is garbage collected, so the sessions
+    of the test could check out the listener's own physical connection and its notifications.
+    """
+    connections = []
+    cargs, cparams = pg_engine.dialect.create_connect_args(pg_engine.url)
+
+    def connect():
+        connection = psycopg2.connect(*cargs, **cparams)
+        connection.autocommit = True
+        connections.append(connection)
+        return connection
+
+    yield connect
+    for connection in connections:
+        connection.close()
+
+
+def listen(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN "{CHANNEL}"')
+    return connection
+
+
+def received(connection, timeout: float = 0.5) -> list:
+    """Payloads delivered to `connection` within `timeout` seconds."""
+    payloads = []
+    while select.select([connection], [], [], timeout)[0]:
+        connection.poll()
+        while connection.notifies:
+            payloads.append(json.loads(connection.notifies.pop(0).payload))
+        timeout = 0.05
+    return payloads
+
+
+def test_sales_dont_notify_in_their_transaction(connect, pg_session_factory, monkeypatch):
+    """Selling only queues the stock invalidation, it reaches the other workers with the next coalesced NOTIFY."""
+    monkeypatch.setattr("src.db.invalidation.CACHE_INVALIDATION_CHANNEL", CHANNEL)
+    listener, publisher = listen(connect()), connect()
+    with pg_session_factory() as db:
+        db_product = DbProduct(name="lamp", price=10, effective_price=10, stock=10)
+        db.add(db_product)
+        db.commit()
+        received(listener)
+
+        for _ in range(3):
+            SqlalchemySaleDatabase().sell_product(db, db_product.id, 1)
+    assert received(listener) == []
+
+    assert publish_coalesced_invalidations(publisher, CHANNEL) == 1
+    assert received(listener) == [{"cache": "product", "keys": [db_product.id], "origin": PROCESS_ID}]
+
+
+def test_other_writes_notify_on_commit(connect, pg_session_factory, monkeypatch):
+    monkeypatch.setattr("src.db.invalidation.CACHE_INVALIDATION_CHANNEL", CHANNEL)
+    listener = listen(connect())
+    with pg_session_factory() as db:
+        invalidate_on_commit(db, product_cache, [7])
+        db.commit()
+    assert received(listener) == [{"cache": "product", "keys": [7], "origin": PROCESS_ID}]
+    assert take_coalesced_invalidations() == {}
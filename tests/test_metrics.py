@@ -0,0 +1,88 @@
+import fcntl
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src import metrics, middleware  # noqa: F401, registers the request metrics
+
+LABELS = ["GET", "/test", "200"]
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_worker_snapshot(metrics_dir, pid: int, requests: int, in_flight: int) -> None:
+    snapshot = {
+        "http_requests_total": [[LABELS, requests]],
+        "http_requests_in_flight": [[[], in_flight]],
+    }
+    (metrics_dir / f"metrics-{pid}.json").write_text(json.dumps(snapshot))
+
+
+def sample(text: str, name: str) -> float:
+    """Value of the sample of `name` with LABELS, 0 when there is none."""
+    labels = metrics.format_labels(metrics.registry.metrics[name].labelnames, LABELS)
+    prefix = f"{name}{labels} "
+    return sum(float(line[len(prefix):]) for line in text.splitlines() if line.startswith(prefix))
+
+
+def test_counters_of_exited_workers_are_kept(metrics_dir):
+    write_worker_snapshot(metrics_dir, exited_pid(), requests=5, in_flight=2)
+    first = metrics.collect_metrics()
+
+    write_worker_snapshot(metrics_dir, exited_pid(), requests=3, in_flight=1)
+    second = metrics.collect_metrics()
+    third = metrics.collect_metrics()
+
+    assert sample(first, "http_requests_total") == 5
+    assert sample(second, "http_requests_total") == sample(third, "http_requests_total") == 8
+    assert sorted(os.listdir(metrics_dir)) == sorted([metrics.RETIRED_LOCK, metrics.RETIRED_SNAPSHOT])
+
+
+def test_gauges_of_exited_workers_are_dropped(metrics_dir):
+    write_worker_snapshot(metrics_dir, exited_pid(), requests=5, in_flight=2)
+    metrics.collect_metrics()
+
+    retired = json.loads((metrics_dir / metrics.RETIRED_SNAPSHOT).read_text())
+    assert retired["http_requests_total"] == [[LABELS, 5]]
+    assert retired.get("http_requests_in_flight", []) == []
+
+
+def test_live_workers_are_merged_without_retiring(metrics_dir):
+    write_worker_snapshot(metrics_dir, os.getppid(), requests=4, in_flight=1)
+
+    assert sample(metrics.collect_metrics(), "http_requests_total") == 4
+    assert (metrics_dir / f"metrics-{os.getppid()}.json").exists()
+
+
+def test_snapshots_are_read_while_retiring_is_locked_out(metrics_dir, monkeypatch):
+    write_worker_snapshot(metrics_dir, exited_pid(), requests=5, in_flight=0)
+    write_worker_snapshot(metrics_dir, os.getppid(), requests=4, in_flight=1)
+    read_snapshot = metrics.read_snapshot
+    locked_out = []
+
+    def read_while_retiring(path):
+        with open(metrics_dir / metrics.RETIRED_LOCK, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                locked_out.append(os.path.basename(path))
+        return read_snapshot(path)
+
+    metrics.collect_metrics()
+    monkeypatch.setattr(metrics, "read_snapshot", read_while_retiring)
+
+    assert sample(metrics.collect_metrics(), "http_requests_total") == 9
+    assert sorted(locked_out) == sorted([f"metrics-{os.getppid()}.json", metrics.RETIRED_SNAPSHOT])
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from src.db.idempotency import claim_idempotency_key
+from src.middleware import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAYED_HEADER
+
+ORIGIN = "http://localhost:8000"
+
+
+def test_replayed_response_has_cors_headers(client, monkeypatch):
+    async def run_in_session(func, *args):
+        assert func is claim_idempotency_key
+        key, fingerprint = args
+        return SimpleNamespace(
+            claimed=False, fingerprint=fingerprint, status_code=201, content_type="application/json", body=b'{"id":1}'
+        )
+
+    monkeypatch.setattr("src.middleware.run_in_session", run_in_session)
+
+    response = client.post(
+        "/category/", json={"name": "root"}, headers={IDEMPOTENCY_KEY_HEADER: "retry-1", "Origin": ORIGIN}
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {"id": 1}
+    assert response.headers[IDEMPOTENT_REPLAYED_HEADER] == "true"
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN
+    assert IDEMPOTENT_REPLAYED_HEADER in response.headers["Access-Control-Expose-Headers"]
@@ -0,0 +1,70 @@
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from config import CATEGORY_RELATIONS_TABLE, CATEGORY_TABLE
+from src.db import models
+
+from .conftest import TEST_DATABASE_URL
+
+
+def alembic_config(url: str = "postgresql+psycopg2://") -> Config:
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_migrations_render_sql_offline(capsys):
+    command.upgrade(alembic_config(), "head", sql=True)
+    sql = capsys.readouterr().out
+    for table in models.Base.metadata.tables:
+        assert f"CREATE TABLE {table} " in sql
+
+
+@pytest.fixture
+def empty_pg_engine():
+    """Engine of TEST_DATABASE_URL without any table."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    models.Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    yield engine
+    models.Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    engine.dispose()
+
+
+def test_migrations_create_the_model_schema(empty_pg_engine):
+    command.upgrade(alembic_config(TEST_DATABASE_URL), "head")
+
+    inspector = inspect(empty_pg_engine)
+    for table in models.Base.metadata.sorted_tables:
+        assert {column["name"] for column in inspector.get_columns(table.name)} == set(table.columns.keys())
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes
+
+
+def test_upgrade_removes_duplicate_closure_rows(empty_pg_engine):
+    config = alembic_config(TEST_DATABASE_URL)
+    command.upgrade(config, "0001")
+    with empty_pg_engine.begin() as connection:
+        connection.execute(text(f"INSERT INTO {CATEGORY_TABLE} (id, name) VALUES (1, 'root'), (2, 'child')"))
+        connection.execute(text(f"UPDATE {CATEGORY_TABLE} SET parent_id = 1 WHERE id = 2"))
+        connection.execute(
+            text(
+                f"INSERT INTO {CATEGORY_RELATIONS_TABLE} (ancestor_id, descendant_id, depth)"
+                " VALUES (1, 1, 0), (2, 2, 0), (1, 2, 1), (1, 2, 1)"
+            )
+        )
+
+    command.upgrade(config, "head")
+
+    with empty_pg_engine.connect() as connection:
+        pairs = connection.execute(
+            text(f"SELECT ancestor_id, descendant_id FROM {CATEGORY_RELATIONS_TABLE} ORDER BY 1, 2")
+        ).all()
+    assert pairs == [(1, 1), (1, 2), (2, 2)]
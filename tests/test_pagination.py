@@ -0,0 +1,41 @@
+import pytest
+from fastapi import HTTPException
+
+from src.db.models import DbDiscount, DbProduct, DbSale
+from src.request_utils import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    keyset = (DbProduct.name, DbProduct.id)
+    assert decode_cursor(encode_cursor(["Phone", 7]), keyset) == ["Phone", 7]
+
+
+@pytest.mark.parametrize("values", [["a"], [{"id": 1}], [[1]], [True], [1.5], [None], [1, 2]])
+def test_tampered_cursor_is_rejected(values):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(values), (DbSale.id,))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor({"id": 1})])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, (DbSale.id,))
+    assert error.value.status_code == 400
+
+
+def test_list_endpoint_answers_400_to_tampered_cursor(client):
+    response = client.get("/discount/discounts", params={"cursor": encode_cursor(["a"])})
+    assert response.status_code == 400
+
+
+def test_keyset_pages_follow_each_other(client, db):
+    db.add_all([DbDiscount(percentage=i) for i in range(5)])
+    db.commit()
+
+    first = client.get("/discount/discounts", params={"limit": 3})
+    second = client.get("/discount/discounts", params={"limit": 3, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+
+    assert [discount["id"] for discount in first.json()] == [1, 2, 3]
+    assert [discount["id"] for discount in second.json()] == [4, 5]
+    assert NEXT_CURSOR_HEADER not in second.headers
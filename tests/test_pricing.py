@@ -0,0 +1,17 @@
+import pytest
+from sqlalchemy import literal, select
+
+from src.db.sqlalchemy_db.pricing import round_price
+
+
+@pytest.mark.parametrize(
+    "price, factor, expected",
+    [
+        (100.0, 1 - 0.7, 30.0),
+        (19.99, 0.85, 16.99),
+        (10.0, 1.0, 10.0),
+        (0.05, 0.5, 0.03),
+    ],
+)
+def test_effective_prices_are_rounded_to_cents(db, price, factor, expected):
+    assert db.scalar(select(round_price(literal(price) * literal(factor)))) == expected
@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event, func, select
+
+from src.db.models import DbCategoryRelation, DbProduct
+
+
+@contextmanager
+def recorded_statements(engine):
+    """Collect `(statement, parameters)` of everything executed on `engine` inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def create_tree(client, db):
+    """Build `root -> child -> grandchild` plus a sibling tree, with Products in stock and sold out."""
+    root = client.post("/category/", json={"name": "root"}).json()["id"]
+    child = client.post("/category/", json={"name": "child", "parent_id": root}).json()["id"]
+    grandchild = client.post("/category/", json={"name": "grandchild", "parent_id": child}).json()["id"]
+    other = client.post("/category/", json={"name": "other"}).json()["id"]
+    for name, category_id, stock in [
+        ("in root", root, 1),
+        ("in child", child, 2),
+        ("in grandchild", grandchild, 3),
+        ("sold out", grandchild, 0),
+        ("elsewhere", other, 4),
+    ]:
+        db.add(DbProduct(name=name, price=1, effective_price=1, stock=stock, category_id=category_id))
+    db.commit()
+    return root, child
+
+
+def test_closure_table_has_one_relation_per_pair(client, db):
+    create_tree(client, db)
+
+    pairs = select(DbCategoryRelation.ancestor_id, DbCategoryRelation.descendant_id)
+    duplicates = db.execute(
+        select(func.count()).select_from(
+            pairs.group_by(DbCategoryRelation.ancestor_id, DbCategoryRelation.descendant_id)
+            .having(func.count() > 1)
+            .subquery()
+        )
+    ).scalar()
+    assert duplicates == 0
+
+
+def test_products_of_subtree_are_listed_once(client, db):
+    root, child = create_tree(client, db)
+
+    names = [product["name"] for product in client.get(f"/product/category/{root}").json()]
+    assert names == ["in root", "in child", "in grandchild"]
+
+    names = [product["name"] for product in client.get(f"/product/category/{child}").json()]
+    assert names == ["in child", "in grandchild"]
+
+
+def test_products_of_subtree_are_read_with_one_join_query(client, db, engine):
+    root, _ = create_tree(client, db)
+
+    with recorded_statements(engine) as statements:
+        assert client.get(f"/product/category/{root}", params={"limit": 50}).status_code == 200
+
+    assert len(statements) == 1
+    statement, parameters = statements[0]
+    # One join on the closure table, not a list of descendant IDs bound as parameters
+    assert "JOIN category_relations" in statement
+    assert " IN (" not in statement
+
+    with engine.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert "ix_category_relations_ancestor_id_descendant_id" in plan
@@ -0,0 +1,142 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from config import MAX_BATCH_ITEMS
+from src.db.models import DbProduct, DbReservation
+from src.db.sqlalchemy_db.db_reservation import SqlalchemyReservationDatabase
+from src.enums import ReservationStatus
+
+SWEEPERS = 2
+EXPIRED_PER_PRODUCT = 30
+
+
+def add_product(session_factory, stock: int = 10, price: float = 10) -> int:
+    with session_factory() as db:
+        db_product = DbProduct(name="lamp", price=price, effective_price=price, stock=stock)
+        db.add(db_product)
+        db.commit()
+        return db_product.id
+
+
+def test_reserve_product_moves_stock_to_reserved(pg_client, pg_session_factory):
+    product_id = add_product(pg_session_factory)
+
+    response = pg_client.post(f"/reservation/reserve_product/{product_id}", json={"quantity": 3})
+
+    assert response.status_code == 200, response.text
+    reservation = response.json()
+    assert (reservation["product_id"], reservation["quantity"], reservation["status"]) == (product_id, 3, "reserved")
+    with pg_session_factory() as db:
+        db_product = db.get(DbProduct, product_id)
+        assert (db_product.stock, db_product.reserved_stock) == (7, 3)
+        db_reservation = db.get(DbReservation, reservation["id"])
+        assert db_reservation.price == 10
+        assert db_reservation.expires_at is not None
+
+
+def test_reserve_product_rejects_more_than_stock(pg_client, pg_session_factory):
+    product_id = add_product(pg_session_factory, stock=2)
+
+    response = pg_client.post(f"/reservation/reserve_product/{product_id}", json={"quantity": 3})
+
+    assert response.status_code == 400
+    assert "2 units remain" in response.json()["detail"]
+    with pg_session_factory() as db:
+        assert db.get(DbProduct, product_id).stock == 2
+
+
+def test_reserve_products_rejects_too_many_items(client):
+    items = [{"product_id": 1, "quantity": 1}] * (MAX_BATCH_ITEMS + 1)
+
+    response = client.post("/reservation/reserve_products", json={"items": items})
+
+    assert response.status_code == 422
+
+
+def test_reserve_products_reserves_every_item(pg_client, pg_session_factory):
+    first, second = add_product(pg_session_factory), add_product(pg_session_factory, stock=5)
+
+    response = pg_client.post(
+        "/reservation/reserve_products",
+        json={"items": [{"product_id": first, "quantity": 2}, {"product_id": second, "quantity": 5}]},
+    )
+
+    assert response.status_code == 200, response.text
+    assert [(item["product_id"], item["quantity"]) for item in response.json()] == [(first, 2), (second, 5)]
+    with pg_session_factory() as db:
+        assert (db.get(DbProduct, first).stock, db.get(DbProduct, first).reserved_stock) == (8, 2)
+        assert (db.get(DbProduct, second).stock, db.get(DbProduct, second).reserved_stock) == (0, 5)
+
+
+def test_reserve_products_is_all_or_nothing(pg_client, pg_session_factory):
+    first, second = add_product(pg_session_factory), add_product(pg_session_factory, stock=1)
+
+    response = pg_client.post(
+        "/reservation/reserve_products",
+        json={"items": [{"product_id": first, "quantity": 2}, {"product_id": second, "quantity": 3}]},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Not enough stock, units remain per Product: {{{second}: 1}}"
+    with pg_session_factory() as db:
+        assert (db.get(DbProduct, first).stock, db.get(DbProduct, first).reserved_stock) == (10, 0)
+        assert (db.get(DbProduct, second).stock, db.get(DbProduct, second).reserved_stock) == (1, 0)
+        assert db.query(DbReservation).count() == 0
+
+
+def test_reserve_products_rejects_missing_product(pg_client, pg_session_factory):
+    product_id = add_product(pg_session_factory)
+
+    response = pg_client.post(
+        "/reservation/reserve_products",
+        json={"items": [{"product_id": product_id, "quantity": 1}, {"product_id": product_id + 1, "quantity": 1}]},
+    )
+
+    assert response.status_code == 404
+    with pg_session_factory() as db:
+        assert db.get(DbProduct, product_id).stock == 10
+        assert db.query(DbReservation).count() == 0
+
+
+def test_concurrent_sweepers_release_every_reservation_once(pg_session_factory):
+    """Sweepers running at once split the overdue Reservations, none is released twice or left behind."""
+    past, future = datetime.now(timezone.utc) - timedelta(minutes=1), datetime.now(timezone.utc) + timedelta(hours=1)
+    with pg_session_factory() as db:
+        db_products = [DbProduct(name=f"lamp {i}", price=10, effective_price=10, stock=0) for i in range(3)]
+        db.add_all(db_products)
+        db.flush()
+        for db_product in db_products:
+            # Stock left after the Reservations took their units, which the sweepers must give back
+            db_product.reserved_stock = EXPIRED_PER_PRODUCT * 2 + 5
+            db.add_all(
+                DbReservation(product_id=db_product.id, quantity=2, price=10, expires_at=past)
+                for _ in range(EXPIRED_PER_PRODUCT)
+            )
+            db.add(DbReservation(product_id=db_product.id, quantity=5, price=10, expires_at=future))
+        db.commit()
+        product_ids = [db_product.id for db_product in db_products]
+
+    reservation_db = SqlalchemyReservationDatabase()
+    barrier = threading.Barrier(SWEEPERS)
+
+    def sweep(_) -> int:
+        barrier.wait()
+        released = 0
+        with pg_session_factory() as db:
+            while count := reservation_db.release_expired_reservations(db, 7):
+                released += count
+        return released
+
+    with ThreadPoolExecutor(SWEEPERS) as executor:
+        released = list(executor.map(sweep, range(SWEEPERS)))
+
+    assert sum(released) == EXPIRED_PER_PRODUCT * len(product_ids)
+    with pg_session_factory() as db:
+        for product_id in product_ids:
+            db_product = db.get(DbProduct, product_id)
+            assert (db_product.stock, db_product.reserved_stock) == (EXPIRED_PER_PRODUCT * 2, 5)
+        statuses = db.query(DbReservation.status, DbReservation.expires_at > datetime.now(timezone.utc)).all()
+        assert sorted(set(statuses)) == [
+            (ReservationStatus.EXPIRED.value, False), (ReservationStatus.RESERVED.value, True)
+        ]
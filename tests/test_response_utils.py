@@ -0,0 +1,26 @@
+from fastapi import Response
+
+from src.main import app
+from src.response_utils import FastJSONResponse
+
+
+def test_openapi_schema_builds():
+    schema = app.openapi()
+    assert "/product/products" in schema["paths"]
+
+
+def test_docs_are_served(client):
+    assert client.get("/openapi.json").status_code == 200
+    assert client.get("/docs").status_code == 200
+
+
+def test_fast_json_response_keeps_headers_of_injected_response():
+    injected = Response()
+    injected.headers["X-Next-Cursor"] = "abc"
+
+    response = FastJSONResponse([1, 2], response=injected, status_code=201, headers={"ETag": '"v1"'})
+
+    assert response.status_code == 201
+    assert response.body == b"[1,2]"
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.headers["ETag"] == '"v1"'
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from config import MAX_BATCH_ITEMS
+from src.db.models import DbProduct, DbSale
+from src.db.sqlalchemy_db.db_sail import SqlalchemySaleDatabase
+
+STOCK = 50
+WORKERS = 16
+ATTEMPTS_PER_WORKER = 10
+
+
+@pytest.mark.parametrize("quantity", [0, -1])
+def test_sell_rejects_non_positive_quantity(client, quantity):
+    response = client.post("/sale/product_id/1", params={"quantity": quantity})
+    assert response.status_code == 422
+
+
+def test_sell_requires_quantity(client):
+    assert client.post("/sale/product_id/1").status_code == 422
+
+
+def test_sell_products_rejects_too_many_items(client):
+    items = [{"product_id": 1, "quantity": 1}] * (MAX_BATCH_ITEMS + 1)
+
+    assert client.post("/sale/products", json={"items": items}).status_code == 422
+
+
+def add_product(session_factory, stock: int = 10, price: float = 10) -> int:
+    with session_factory() as db:
+        db_product = DbProduct(name="lamp", price=price, effective_price=price, stock=stock)
+        db.add(db_product)
+        db.commit()
+        return db_product.id
+
+
+def test_sell_products_sells_every_item(pg_client, pg_session_factory):
+    first, second = add_product(pg_session_factory), add_product(pg_session_factory, stock=5, price=4)
+
+    response = pg_client.post(
+        "/sale/products",
+        json={"items": [{"product_id": first, "quantity": 2}, {"product_id": second, "quantity": 5}]},
+    )
+
+    assert response.status_code == 200, response.text
+    assert [(sale["product_id"], sale["quantity"], sale["sale_price"]) for sale in response.json()] == [
+        (first, 2, 10), (second, 5, 4)
+    ]
+    with pg_session_factory() as db:
+        assert (db.get(DbProduct, first).stock, db.get(DbProduct, second).stock) == (8, 0)
+
+
+def test_sell_products_is_all_or_nothing(pg_client, pg_session_factory):
+    first, second = add_product(pg_session_factory), add_product(pg_session_factory, stock=1)
+
+    response = pg_client.post(
+        "/sale/products",
+        json={"items": [{"product_id": first, "quantity": 2}, {"product_id": second, "quantity": 3}]},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Not enough stock, units remain per Product: {{{second}: 1}}"
+    with pg_session_factory() as db:
+        assert (db.get(DbProduct, first).stock, db.get(DbProduct, second).stock) == (10, 1)
+        assert db.query(DbSale).count() == 0
+
+
+def test_sell_products_rejects_missing_product(pg_client, pg_session_factory):
+    product_id = add_product(pg_session_factory)
+
+    response = pg_client.post(
+        "/sale/products",
+        json={"items": [{"product_id": product_id, "quantity": 1}, {"product_id": product_id + 1, "quantity": 1}]},
+    )
+
+    assert response.status_code == 404
+    with pg_session_factory() as db:
+        assert db.get(DbProduct, product_id).stock == 10
+        assert db.query(DbSale).count() == 0
+
+
+def test_concurrent_sales_never_oversell(pg_session_factory):
+    """Many threads selling the same Product at once sell exactly its stock and not a unit more."""
+    with pg_session_factory() as db:
+        db_product = DbProduct(name="hot item", price=10, effective_price=10, stock=STOCK)
+        db.add(db_product)
+        db.commit()
+        product_id = db_product.id
+
+    sale_db = SqlalchemySaleDatabase()
+
+    def sell_repeatedly(_) -> int:
+        sold = 0
+        for _ in range(ATTEMPTS_PER_WORKER):
+            with pg_session_factory() as db:
+                try:
+                    sale_db.sell_product(db, product_id, 1)
+                    sold += 1
+                except HTTPException as error:
+                    assert error.status_code == 400
+        return sold
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        sold = sum(executor.map(sell_repeatedly, range(WORKERS)))
+
+    assert WORKERS * ATTEMPTS_PER_WORKER > STOCK
+    assert sold == STOCK
+    with pg_session_factory() as db:
+        assert db.get(DbProduct, product_id).stock == 0
+        assert db.scalar(select(func.sum(DbSale.quantity)).where(DbSale.product_id == product_id)) == STOCK
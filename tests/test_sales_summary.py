@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+import pytest
+
+from src.db.models import DbCategoryRelation, DbProduct, DbSale
+from src.db.sqlalchemy_db.db_sail import SqlalchemySaleDatabase
+
+# Not a UTC midnight, so the report aggregates raw Sales instead of reading the daily rollup
+PARTIAL_DAY = "2000-01-01T00:00:01Z"
+
+
+@pytest.fixture
+def sold_tree(pg_client, pg_session_factory):
+    """Sell Products of a `root -> child -> grandchild` tree, a sibling tree and no Category through every path."""
+    root = pg_client.post("/category/", json={"name": "root"}).json()["id"]
+    child = pg_client.post("/category/", json={"name": "child", "parent_id": root}).json()["id"]
+    grandchild = pg_client.post("/category/", json={"name": "grandchild", "parent_id": child}).json()["id"]
+    other = pg_client.post("/category/", json={"name": "other"}).json()["id"]
+    with pg_session_factory() as db:
+        db_products = [
+            DbProduct(name=name, price=price, effective_price=price, stock=100, category_id=category_id)
+            for name, price, category_id in [
+                ("in root", 1.5, root),
+                ("in child", 2, child),
+                ("in grandchild", 3.25, grandchild),
+                ("elsewhere", 4, other),
+                ("uncategorized", 5, None),
+            ]
+        ]
+        db.add_all(db_products)
+        db.commit()
+        in_root, in_child, in_grandchild, elsewhere, uncategorized = [db_product.id for db_product in db_products]
+
+    for product_id, quantity in [(in_root, 1), (in_root, 2), (in_grandchild, 3), (uncategorized, 1)]:
+        assert pg_client.post(f"/sale/product_id/{product_id}", params={"quantity": quantity}).status_code == 200
+    items = [
+        {"product_id": in_child, "quantity": 4},
+        {"product_id": in_grandchild, "quantity": 1},
+        {"product_id": in_child, "quantity": 2},
+        {"product_id": elsewhere, "quantity": 5},
+    ]
+    assert pg_client.post("/sale/products", json={"items": items}).status_code == 200
+    reservation = pg_client.post(f"/reservation/reserve_product/{in_grandchild}", json={"quantity": 2}).json()
+    assert pg_client.post(f"/sale/reservation/{reservation['id']}").status_code == 200
+    return root, child, grandchild
+
+
+def summary(client, group_by, **params):
+    response = client.get("/sale/sales/report", params={"group_by": group_by, **params})
+    assert response.status_code == 200, response.text
+    return {row["group_id"]: (row["quantity"], row["revenue"], row["sale_count"]) for row in response.json()}
+
+
+def raw_totals(session_factory, group_by):
+    """Aggregate every Sale in Python, the reference the database reports are checked against."""
+    with session_factory() as db:
+        categories = {db_product.id: db_product.category_id for db_product in db.query(DbProduct)}
+        ancestors = defaultdict(list)
+        for relation in db.query(DbCategoryRelation):
+            ancestors[relation.descendant_id].append(relation.ancestor_id)
+        totals = defaultdict(lambda: [0, 0.0, 0])
+        for db_sale in db.query(DbSale):
+            category = categories[db_sale.product_id]
+            if group_by == "product":
+                groups = [db_sale.product_id]
+            elif group_by == "category":
+                groups = [category]
+            else:
+                groups = ancestors[category]
+            for group in groups:
+                totals[group][0] += db_sale.quantity
+                totals[group][1] += db_sale.quantity * db_sale.sale_price
+                totals[group][2] += 1
+    return {group: (quantity, pytest.approx(revenue), count) for group, (quantity, revenue, count) in totals.items()}
+
+
+def test_category_tree_totals_include_subcategories(pg_client, pg_session_factory, sold_tree):
+    root, child, _ = sold_tree
+
+    expected = raw_totals(pg_session_factory, "category_tree")
+
+    assert expected[root][0] == 1 + 2 + 3 + 4 + 1 + 2 + 2
+    assert expected[child][0] == 3 + 4 + 1 + 2 + 2
+    assert summary(pg_client, "category_tree", **{"from": PARTIAL_DAY}) == expected
+    assert summary(pg_client, "category_tree") == expected
+
+
+@pytest.mark.parametrize("from_", [None, PARTIAL_DAY])
+def test_category_tree_totals_of_subtree(pg_client, pg_session_factory, sold_tree, from_):
+    _, child, grandchild = sold_tree
+    params = {"category_id": child} if from_ is None else {"category_id": child, "from": from_}
+
+    expected = raw_totals(pg_session_factory, "category_tree")
+
+    assert summary(pg_client, "category_tree", **params) == {child: expected[child], grandchild: expected[grandchild]}
+
+
+@pytest.mark.parametrize("group_by", ["product", "category", "category_tree"])
+def test_rollup_matches_raw_sales(pg_client, pg_session_factory, sold_tree, group_by):
+    expected = raw_totals(pg_session_factory, group_by)
+
+    assert summary(pg_client, group_by) == expected
+    assert summary(pg_client, group_by, **{"from": PARTIAL_DAY}) == expected
+
+
+@pytest.mark.parametrize("group_by", ["product", "category", "category_tree"])
+def test_whole_days_read_rollup_and_partial_days_raw_sales(pg_client, pg_session_factory, sold_tree, group_by):
+    rolled_up = raw_totals(pg_session_factory, group_by)
+    with pg_session_factory() as db:
+        product_id = db.query(DbProduct.id).filter_by(name="in grandchild").scalar()
+        # Imported directly, so it isn't in the rollup until it's rebuilt
+        db.add(DbSale(product_id=product_id, quantity=7, sale_price=1))
+        db.commit()
+    imported = raw_totals(pg_session_factory, group_by)
+    assert imported != rolled_up
+
+    assert summary(pg_client, group_by) == rolled_up
+    assert summary(pg_client, group_by, **{"from": "2000-01-01T00:00:00Z", "to": "2100-01-01T00:00:00Z"}) == rolled_up
+    assert summary(pg_client, group_by, **{"from": PARTIAL_DAY}) == imported
+    assert summary(pg_client, group_by, **{"to": "2099-12-31T23:59:59Z"}) == imported
+
+    with pg_session_factory() as db:
+        SqlalchemySaleDatabase().rebuild_sales_rollup(db)
+
+    assert summary(pg_client, group_by) == imported
@@ -0,0 +1,54 @@
+from src.db.models import DbCategory, DbProduct
+from src.request_utils import NEXT_CURSOR_HEADER
+
+
+def add_products(session_factory, *names):
+    with session_factory() as db:
+        db_category = DbCategory(name="catalog")
+        db.add(db_category)
+        db.flush()
+        db_products = [
+            DbProduct(name=name, price=1, effective_price=1, stock=1, category_id=db_category.id) for name in names
+        ]
+        db.add_all(db_products)
+        db.commit()
+        return [db_product.id for db_product in db_products]
+
+
+def search(client, q, **params):
+    response = client.get("/product/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_like_wildcards_in_query_match_literally(pg_client, pg_session_factory):
+    add_products(pg_session_factory, "x%z lamp", "xyz lamp", "a_c cable", "abc cable", "m/n hub", "mn hub")
+
+    assert [product["name"] for product in search(pg_client, "x%z").json()] == ["x%z lamp"]
+    assert [product["name"] for product in search(pg_client, "a_c").json()] == ["a_c cable"]
+    assert [product["name"] for product in search(pg_client, "m/n").json()] == ["m/n hub"]
+
+
+def test_search_matches_prefix_case_insensitively_and_tolerates_typos(pg_client, pg_session_factory):
+    add_products(pg_session_factory, "Keyboard", "Monitor", "Mouse")
+
+    assert [product["name"] for product in search(pg_client, "keyb").json()] == ["Keyboard"]
+    assert [product["name"] for product in search(pg_client, "Keyboad").json()] == ["Keyboard"]
+
+
+def test_keyset_pages_continue_on_name_and_id(pg_client, pg_session_factory):
+    ids = add_products(pg_session_factory, "lamp b", "lamp a", "lamp b", "lamp a", "lamp c", "lamp b", "desk")
+    with pg_session_factory() as db:
+        lamps = db.query(DbProduct.id).filter(DbProduct.id.in_(ids[:-1])).order_by(DbProduct.name, DbProduct.id)
+        expected = [product_id for product_id, in lamps]
+
+    pages, cursor = [], None
+    while True:
+        response = search(pg_client, "lamp", limit=2, **({"cursor": cursor} if cursor else {}))
+        pages.append([product["id"] for product in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 2, 0]
+    assert [product_id for page in pages for product_id in page] == expected